@@ -54,14 +54,14 @@ class ProfileAdmin(admin.ModelAdmin):
     list_display = ('user', 'student_number', 'major', 'phone', 'created_at')
     list_filter = ('major', 'created_at', 'updated_at')
     search_fields = ('user__username', 'student_number', 'phone')
-    readonly_fields = ('created_at', 'updated_at')
+    readonly_fields = ('chart_schema', 'created_at', 'updated_at')
     
     fieldsets = (
         (_('User'), {
             'fields': ('user',)
         }),
         (_('Academic Information'), {
-            'fields': ('student_number', 'major', 'department')
+            'fields': ('student_number', 'major', 'chart_schema', 'department')
         }),
         (_('Personal Information'), {
             'fields': ('phone', 'bio', 'avatar')
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.11 on 2026-10-17 19:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0005_recommendationsnapshot'),
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='chart_schema',
+            field=models.ForeignKey(blank=True, help_text='Chart schema resolved from the student number', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='profiles', to='courses.chartschema'),
+        ),
+    ]
@@ -103,6 +103,15 @@ class Profile(models.Model):
         help_text=_("Student's major/degree program")
     )
     
+    chart_schema = models.ForeignKey(
+        'courses.ChartSchema',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='profiles',
+        help_text=_("Chart schema resolved from the student number")
+    )
+    
     # For professors
     department = models.CharField(
         max_length=100,
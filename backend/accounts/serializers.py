@@ -27,8 +27,8 @@ class ProfileSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Profile
-        fields = ('id', 'user', 'student_number', 'phone', 'bio', 'avatar', 'major', 'department')
-        read_only_fields = ('id',)
+        fields = ('id', 'user', 'student_number', 'phone', 'bio', 'avatar', 'major', 'chart_schema', 'department')
+        read_only_fields = ('id', 'chart_schema')
 
 
 class RegisterSerializer(serializers.ModelSerializer):
@@ -3,7 +3,7 @@ from django.utils.translation import gettext_lazy as _
 
 from .models import (
     DegreeChart, Course, ChartCourse, Prerequisite, CoRequisite, CourseRequirement,
-    ChartSchema, CourseGroup, ChartNode
+    ChartSchema, CourseGroup, ChartNode, RecommendationSnapshot, Section, SectionTime
 )
 
 
@@ -18,6 +18,15 @@ class ChartCourseInline(admin.TabularInline):
     readonly_fields = ()
 
 
+class SectionTimeInline(admin.TabularInline):
+    """
+    Inline admin for meeting times in Section admin.
+    """
+    model = SectionTime
+    extra = 0
+    fields = ('day_of_week', 'start_time', 'end_time', 'location')
+
+
 class PrerequisiteInline(admin.TabularInline):
     """
     Inline admin for Prerequisites in Course admin.
@@ -103,10 +112,11 @@ class ChartCourseAdmin(admin.ModelAdmin):
     Chart Course admin.
     """
     
-    list_display = ('degree_chart', 'course', 'is_mandatory', 'recommended_semester')
+    list_display = ('degree_chart', 'course', 'is_mandatory', 'recommended_semester',
+                    'importance_score', 'critical_path_depth')
     list_filter = ('degree_chart', 'is_mandatory', 'recommended_semester')
     search_fields = ('degree_chart__name', 'course__code', 'course__name')
-    readonly_fields = ('created_at', 'updated_at')
+    readonly_fields = ('importance_score', 'critical_path_depth', 'created_at', 'updated_at')
     
     fieldsets = (
         (_('Relationship'), {
@@ -115,6 +125,10 @@ class ChartCourseAdmin(admin.ModelAdmin):
         (_('Configuration'), {
             'fields': ('is_mandatory', 'recommended_semester')
         }),
+        (_('Computed'), {
+            'fields': ('importance_score', 'critical_path_depth'),
+            'description': _('Recomputed automatically when prerequisites change')
+        }),
         (_('Timestamps'), {
             'fields': ('created_at', 'updated_at'),
             'classes': ('collapse',)
@@ -280,7 +294,7 @@ class ChartNodeAdmin(admin.ModelAdmin):
     list_display = ('schema', 'semester', 'position', 'node_type', 'is_mandatory', 'created_at')
     list_filter = ('schema', 'semester', 'is_mandatory', 'created_at')
     search_fields = ('schema__name', 'course__code', 'course__name', 'course_group__name')
-    readonly_fields = ('created_at', 'updated_at')
+    readonly_fields = ('critical_path_depth', 'created_at', 'updated_at')
     
     fieldsets = (
         (_('Position'), {
@@ -292,7 +306,7 @@ class ChartNodeAdmin(admin.ModelAdmin):
             'description': _('Either a specific required course OR an elective group (not both)')
         }),
         (_('Status'), {
-            'fields': ('is_mandatory',)
+            'fields': ('is_mandatory', 'critical_path_depth')
         }),
         (_('Timestamps'), {
             'fields': ('created_at', 'updated_at'),
@@ -308,3 +322,29 @@ class ChartNodeAdmin(admin.ModelAdmin):
             return f"🎯 Elective: {obj.course_group.name}"
     node_type.short_description = _('Type')
 
+
+@admin.register(RecommendationSnapshot)
+class RecommendationSnapshotAdmin(admin.ModelAdmin):
+    """
+    Recommendation Snapshot admin - Precomputed degree-chart recommendations.
+    Rows are written by the precompute_recommendations command.
+    """
+    
+    list_display = ('student', 'chart_schema', 'semester', 'computed_at')
+    list_filter = ('chart_schema', 'semester')
+    search_fields = ('student__username', 'student__profile__student_number')
+    readonly_fields = ('student', 'chart_schema', 'semester', 'payload',
+                       'history_fingerprint', 'computed_at')
+
+
+@admin.register(Section)
+class SectionAdmin(admin.ModelAdmin):
+    """
+    Section admin - Offerings of a course in a semester with their weekly times.
+    """
+    
+    list_display = ('course', 'number', 'semester', 'instructor', 'capacity', 'is_offered')
+    list_filter = ('semester', 'is_offered')
+    search_fields = ('course__code', 'course__name', 'instructor')
+    readonly_fields = ('created_at', 'updated_at')
+    inlines = [SectionTimeInline]
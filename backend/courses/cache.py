@@ -0,0 +1,157 @@
+"""
+Recommendation result cache.
+
+Cached results are keyed by student, chart, semester and limit together with
+two version counters that live in the same cache:
+
+- a per-student history version, bumped when StudentCourseHistory or
+  StudentSelection rows change
+- a per-chart graph version, bumped when the chart's courses or prerequisites
+  change
+
+Serialized chart bodies for /api/courses/degrees/my_chart/ and the compact
+graph exports are cached per ChartSchema behind a schema-content version, bumped when the schema, its
+nodes, or the courses and requisites shown in it change. The same version
+guards the degree-chart recommendations cached per passed-course set.
+
+A catalog-wide version guards the cached prerequisite adjacency used for
+cycle checks (courses.graph.load_catalog_dependents), a schema version
+the in-process ChartSchema interval index (courses.chart_resolver), and a
+per-semester version the in-process section time index (courses.sections).
+
+Bumping a version makes every older key unreachable, so nothing has to be
+deleted explicitly; stale entries simply age out through the backend's
+culling once MAX_ENTRIES is reached. The versions only reach other worker
+processes through a shared backend, hence the file-based default; the
+local-memory backend suits a single process (and the test runner).
+"""
+
+import hashlib
+import time
+
+from django.core.cache import caches
+from django.core.cache.backends.base import InvalidCacheBackendError
+
+CACHE_ALIAS = 'recommendations'
+
+
+def get_cache():
+    """The dedicated recommendations cache, or the default one if not configured."""
+    try:
+        return caches[CACHE_ALIAS]
+    except InvalidCacheBackendError:
+        return caches['default']
+
+
+def _version_key(kind, object_id):
+    return f'rec:v:{kind}:{object_id}'
+
+
+def _get_version(kind, object_id):
+    cache = get_cache()
+    key = _version_key(kind, object_id)
+    version = cache.get(key)
+    if version is None:
+        # Seed from the clock so a version key that was evicted never comes
+        # back with a number an older cached result was stored under.
+        version = time.time_ns()
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key, version)
+    return version
+
+
+def _bump_version(kind, object_id):
+    cache = get_cache()
+    key = _version_key(kind, object_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+
+
+def history_version(student_id):
+    return _get_version('history', student_id)
+
+
+def graph_version(chart_id):
+    return _get_version('graph', chart_id)
+
+
+def catalog_version():
+    return _get_version('catalog', 'all')
+
+
+def chart_schema_version():
+    return _get_version('schemas', 'all')
+
+
+def chart_body_version(schema_id):
+    return _get_version('chart', schema_id)
+
+
+def section_times_version(semester):
+    return _get_version('sections', _semester_digest(semester))
+
+
+def bump_history_version(student_id):
+    """Invalidate cached recommendations of one student."""
+    _bump_version('history', student_id)
+
+
+def bump_graph_version(chart_id):
+    """Invalidate cached recommendations of every student on one chart."""
+    _bump_version('graph', chart_id)
+
+
+def bump_catalog_version():
+    """Invalidate the cached catalog-wide prerequisite adjacency."""
+    _bump_version('catalog', 'all')
+
+
+def bump_chart_schema_version():
+    """Make every process rebuild its ChartSchema interval index."""
+    _bump_version('schemas', 'all')
+
+
+def bump_chart_body_version(schema_id):
+    """Invalidate the cached my_chart body and graph export of one chart schema."""
+    _bump_version('chart', schema_id)
+
+
+def bump_section_times_version(semester):
+    """Make every process rebuild its section time index of one semester."""
+    _bump_version('sections', _semester_digest(semester))
+
+
+def _semester_digest(semester):
+    # Semester names contain spaces and Persian digits, which some backends reject in keys
+    return hashlib.md5(str(semester).encode('utf-8')).hexdigest()[:12]
+
+
+def chart_body_cache_key(schema_id):
+    """Cache key for a serialized chart body at the current schema version."""
+    return 'chart:body:{}:{}'.format(schema_id, chart_body_version(schema_id))
+
+
+def chart_graph_cache_key(schema_id):
+    """Cache key for a compact chart graph export at the current schema version."""
+    return 'chart:graph:{}:{}'.format(schema_id, chart_body_version(schema_id))
+
+
+def chart_recommendations_cache_key(schema_id, semester, passed_digest):
+    """Cache key for a chart's next-semester recommendations for one passed-course set."""
+    return 'chart:rec:{}:{}:{}:{}'.format(
+        schema_id, semester, passed_digest, chart_body_version(schema_id)
+    )
+
+
+def recommendation_cache_key(student_id, chart_id, semester, limit):
+    """Cache key for one get_recommendations() result at the current versions."""
+    return 'rec:{}:{}:{}:{}:{}:{}'.format(
+        student_id,
+        chart_id,
+        _semester_digest(semester),
+        limit,
+        history_version(student_id),
+        graph_version(chart_id),
+    )
@@ -0,0 +1,183 @@
+"""
+Catalog change feed for offline clients.
+
+Every save or delete of a Course, ChartNode, CourseGroup, Prerequisite or
+CoRequisite appends a CatalogChange row (see courses.signals). The id of the
+newest entry is the sync version: a client keeps the version of its last
+sync and asks for everything after it. Entries are collapsed to the last
+action per row, upserts are answered with the current row and deletes with
+a tombstone (just the id), so a client applies a page by overwriting rows by
+id and dropping the tombstoned ones.
+
+Rows are read live, so a row changed while a page is being built may be
+sent again on the next sync; applying a row twice is harmless.
+
+Log ids are assigned at insert, not at commit, so a concurrent transaction
+can commit id N+1 before id N. Pages therefore stop before the first entry
+younger than CATALOG_SYNC_SETTLE_SECONDS: a client never moves its version
+past an entry that may still be uncommitted, as long as catalog writes
+commit within the window (admin edits and the bulk endpoints do).
+
+The log is pruned to CATALOG_CHANGE_RETENTION_DAYS by the
+prune_catalog_changes command. A client whose version is older than the
+oldest kept entry gets a full snapshot with "expired" set and starts over.
+"""
+
+from collections import defaultdict
+from datetime import timedelta
+from typing import Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from courses.models import CatalogChange, ChartNode, CoRequisite, Course, CourseGroup, Prerequisite
+
+# Table name -> (model, fields of a synced row)
+SYNC_TABLES = {
+    CatalogChange.COURSE: (Course, (
+        'id', 'code', 'name', 'description', 'credits', 'unit_type',
+        'theoretical_units', 'practical_units', 'day_of_week', 'start_time',
+        'end_time', 'week_start_minute', 'week_end_minute', 'semester',
+        'is_mandatory', 'is_offered', 'instructor', 'capacity', 'updated_at',
+    )),
+    CatalogChange.CHART_NODE: (ChartNode, (
+        'id', 'schema_id', 'semester', 'position', 'course_id',
+        'course_group_id', 'is_mandatory', 'critical_path_depth', 'updated_at',
+    )),
+    CatalogChange.COURSE_GROUP: (CourseGroup, (
+        'id', 'code', 'name', 'description', 'updated_at',
+    )),
+    CatalogChange.PREREQUISITE: (Prerequisite, (
+        'id', 'course_id', 'prerequisite_course_id', 'is_corequisite',
+        'min_grade', 'created_at',
+    )),
+    CatalogChange.COREQUISITE: (CoRequisite, (
+        'id', 'course_id', 'corequisite_course_id', 'created_at',
+    )),
+}
+
+PAGE_SIZE = 1000
+
+
+def record_changes(table: str, object_ids: Iterable[int], action: str = CatalogChange.UPSERT) -> None:
+    """Append log entries for rows of one table."""
+    CatalogChange.objects.bulk_create([
+        CatalogChange(table=table, object_id=object_id, action=action)
+        for object_id in object_ids
+    ])
+
+
+def current_version() -> int:
+    """The id of the newest log entry, 0 while the log is empty."""
+    return CatalogChange.objects.aggregate(version=Max('id'))['version'] or 0
+
+
+def _unsettled_from(since: int) -> Optional[int]:
+    """The id of the first entry after `since` still inside the settle window."""
+    cutoff = timezone.now() - timedelta(seconds=settings.CATALOG_SYNC_SETTLE_SECONDS)
+    return CatalogChange.objects.filter(
+        id__gt=since, created_at__gt=cutoff
+    ).aggregate(first=Min('id'))['first']
+
+
+def prune_changes(older_than: timedelta) -> int:
+    """
+    Delete log entries older than the retention; the newest entry is always
+    kept, so ids keep growing past every version handed out.
+
+    Returns:
+        Number of entries deleted
+    """
+    newest = current_version()
+    deleted, _ = CatalogChange.objects.filter(
+        created_at__lt=timezone.now() - older_than, id__lt=newest
+    ).delete()
+    return deleted
+
+
+def _load_rows(table: str, ids: Optional[Iterable[int]] = None) -> List[dict]:
+    model, fields = SYNC_TABLES[table]
+    rows = model.objects.order_by('id')
+    if ids is not None:
+        rows = rows.filter(id__in=list(ids))
+    rows = list(rows.values(*fields))
+    if model is CourseGroup:
+        members = defaultdict(list)
+        memberships = CourseGroup.courses.through.objects.filter(
+            coursegroup_id__in=[row['id'] for row in rows]
+        ).order_by('course_id').values_list('coursegroup_id', 'course_id')
+        for group_id, course_id in memberships:
+            members[group_id].append(course_id)
+        for row in rows:
+            row['course_ids'] = members[row['id']]
+    return rows
+
+
+def catalog_snapshot() -> dict:
+    """Every synced row, for a first sync or a client that has to start over."""
+    # Read the version first: a change racing the snapshot is sent again
+    # next time, and so is everything not yet settled
+    unsettled = _unsettled_from(0)
+    if unsettled is None:
+        version = current_version()
+    else:
+        version = CatalogChange.objects.filter(id__lt=unsettled).aggregate(
+            version=Max('id')
+        )['version'] or 0
+    return {
+        'version': version,
+        'full': True,
+        'has_more': False,
+        'changes': {table: _load_rows(table) for table in SYNC_TABLES},
+        'deleted': {table: [] for table in SYNC_TABLES},
+    }
+
+
+def changes_since(since: int, limit: int = PAGE_SIZE) -> dict:
+    """
+    The rows changed after version `since`, at most `limit` log entries at a
+    time. With has_more set the client asks again from the returned version.
+    A version newer than the log (e.g. after a database restore) gets a full
+    snapshot instead, and so does one older than the pruned log, with
+    "expired" set.
+    """
+    if since <= 0 or since > current_version():
+        return catalog_snapshot()
+    oldest = CatalogChange.objects.aggregate(oldest=Min('id'))['oldest']
+    if oldest is not None and since < oldest - 1:
+        snapshot = catalog_snapshot()
+        snapshot['expired'] = True
+        return snapshot
+
+    entries = CatalogChange.objects.filter(id__gt=since)
+    unsettled = _unsettled_from(since)
+    if unsettled is not None:
+        entries = entries.filter(id__lt=unsettled)
+    entries = list(
+        entries.order_by('id').values_list('id', 'table', 'object_id', 'action')[:limit + 1]
+    )
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    last_action: Dict[str, Dict[int, str]] = {table: {} for table in SYNC_TABLES}
+    for _entry_id, table, object_id, action in entries:
+        last_action[table][object_id] = action
+
+    changes = {}
+    deleted = {}
+    for table, actions in last_action.items():
+        upserted = [object_id for object_id, action in actions.items() if action == CatalogChange.UPSERT]
+        rows = _load_rows(table, upserted) if upserted else []
+        live = {row['id'] for row in rows}
+        changes[table] = rows
+        # Rows deleted after an upsert entry in this page are tombstones too
+        deleted[table] = sorted(object_id for object_id in actions if object_id not in live)
+
+    return {
+        'version': entries[-1][0] if entries else since,
+        'full': False,
+        'has_more': has_more,
+        'changes': changes,
+        'deleted': deleted,
+    }
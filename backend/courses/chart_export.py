@@ -0,0 +1,137 @@
+"""
+Compact graph export of a ChartSchema for client-side computation (PRD 3.1).
+
+Instead of nested course objects the export is a set of column tables:
+every course appears once in the course table and nodes, elective groups
+and requisite edges refer to courses by their row index. Elective group
+members are stored CSR style (members of group g are
+group_courses[group_offsets[g]:group_offsets[g + 1]]), and prerequisite and
+co-requisite edges are pairs of parallel integer arrays. Courses that are
+only required by the chart (a prerequisite outside it) are appended to the
+course table so every edge resolves.
+
+The export carries a version hash of its content, which doubles as the
+ETag of the endpoint.
+"""
+
+import hashlib
+import json
+
+from courses.cache import chart_graph_cache_key, get_cache
+from courses.models import ChartNode, CoRequisite, Course, CourseGroup, Prerequisite
+
+
+def build_chart_graph(schema) -> dict:
+    """Build the column tables of a schema in at most five queries."""
+    nodes = list(
+        ChartNode.objects.filter(schema=schema).select_related(
+            'course', 'course_group'
+        ).order_by('semester', 'position')
+    )
+
+    courses = {}
+    groups = {}
+    for node in nodes:
+        if node.course_id:
+            courses[node.course_id] = node.course
+        elif node.course_group_id:
+            groups[node.course_group_id] = node.course_group
+
+    members = {group_id: [] for group_id in groups}
+    memberships = CourseGroup.courses.through.objects.filter(
+        coursegroup_id__in=list(groups)
+    ).select_related('course').order_by('course_id')
+    for membership in memberships:
+        members[membership.coursegroup_id].append(membership.course_id)
+        courses.setdefault(membership.course_id, membership.course)
+
+    chart_course_ids = list(courses)
+    prerequisite_edges = []
+    corequisite_edges = []
+    for course_id, other_id, is_corequisite in Prerequisite.objects.filter(
+        course_id__in=chart_course_ids
+    ).order_by('id').values_list('course_id', 'prerequisite_course_id', 'is_corequisite'):
+        (corequisite_edges if is_corequisite else prerequisite_edges).append((course_id, other_id))
+    corequisite_edges += CoRequisite.objects.filter(
+        course_id__in=chart_course_ids
+    ).order_by('id').values_list('course_id', 'corequisite_course_id')
+
+    external = {
+        other_id for _course_id, other_id in prerequisite_edges + corequisite_edges
+    } - set(courses)
+    for course in Course.objects.filter(id__in=external).order_by('id'):
+        courses[course.id] = course
+
+    course_rows = sorted(courses.values(), key=lambda course: (course.code, course.id))
+    row_of = {course.id: row for row, course in enumerate(course_rows)}
+    group_rows = sorted(groups.values(), key=lambda group: group.code)
+    group_row_of = {group.id: row for row, group in enumerate(group_rows)}
+
+    group_offsets = [0]
+    group_courses = []
+    for group in group_rows:
+        group_courses.extend(row_of[course_id] for course_id in members[group.id])
+        group_offsets.append(len(group_courses))
+
+    graph = {
+        'schema': {
+            'id': schema.id,
+            'code': schema.code,
+            'name': schema.name,
+            'major': schema.major,
+            'degree': schema.degree,
+            'entry_year_start': schema.entry_year_start,
+            'entry_year_end': schema.entry_year_end,
+            'total_credits': schema.total_credits,
+        },
+        'courses': {
+            'id': [course.id for course in course_rows],
+            'code': [course.code for course in course_rows],
+            'name': [course.name for course in course_rows],
+            'credits': [course.credits for course in course_rows],
+            'in_chart': [int(course.id not in external) for course in course_rows],
+        },
+        'nodes': {
+            'id': [node.id for node in nodes],
+            'semester': [node.semester for node in nodes],
+            'position': [node.position for node in nodes],
+            # Row in the course table, or -1 for an elective slot
+            'course': [row_of[node.course_id] if node.course_id else -1 for node in nodes],
+            # Row in the group table, or -1 for a specific course
+            'group': [
+                group_row_of[node.course_group_id] if node.course_group_id else -1
+                for node in nodes
+            ],
+            'is_mandatory': [int(node.is_mandatory) for node in nodes],
+            'critical_path_depth': [node.critical_path_depth for node in nodes],
+        },
+        'groups': {
+            'id': [group.id for group in group_rows],
+            'code': [group.code for group in group_rows],
+            'name': [group.name for group in group_rows],
+            'offsets': group_offsets,
+            'courses': group_courses,
+        },
+        'prerequisites': {
+            'course': [row_of[course_id] for course_id, _ in prerequisite_edges],
+            'prerequisite': [row_of[other_id] for _, other_id in prerequisite_edges],
+        },
+        'corequisites': {
+            'course': [row_of[course_id] for course_id, _ in corequisite_edges],
+            'corequisite': [row_of[other_id] for _, other_id in corequisite_edges],
+        },
+    }
+    content = json.dumps(graph, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    graph['version'] = hashlib.sha1(content.encode('utf-8')).hexdigest()[:16]
+    return graph
+
+
+def get_chart_graph(schema) -> dict:
+    """The export of a schema, cached until the schema's content changes."""
+    cache = get_cache()
+    key = chart_graph_cache_key(schema.id)
+    graph = cache.get(key)
+    if graph is None:
+        graph = build_chart_graph(schema)
+        cache.set(key, graph)
+    return graph
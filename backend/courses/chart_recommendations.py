@@ -0,0 +1,286 @@
+"""
+Next-semester course recommendations for a ChartSchema (PRD 3.1).
+
+Shared by DegreeChartViewSet.recommendations and the nightly
+precompute_recommendations command, which stores the result per student in
+RecommendationSnapshot (see courses.snapshots).
+
+A semester is scored in batch: the nodes, the members of their elective
+groups and the prerequisites of every candidate are loaded in three queries,
+and score_course works on the resulting maps and the process-wide
+UnlocksIndex (courses.unlocks) only. Elective slots
+are filled with the best-scoring group courses the student has not passed
+(resolve_electives), each scored with its own critical-path depth from the
+per-process schema depth map (courses.importance.schema_course_depths). Results are cached per chart, semester and passed set,
+so students with the same history share one computation.
+"""
+
+import hashlib
+from collections import defaultdict
+from typing import Dict, Iterable, List, Set
+
+from courses.cache import chart_recommendations_cache_key, get_cache
+from courses.importance import schema_course_depths
+from courses.models import ChartNode, CourseGroup, Prerequisite
+from courses.unlocks import get_unlocks_index
+
+PASSING_GRADES = ['A', 'A-', 'B+', 'B', 'B-', 'C+', 'C', 'D']
+
+LAST_SEMESTER = 8
+
+
+def load_prerequisite_map(course_ids: Iterable[int]) -> Dict[int, List[int]]:
+    """Hard prerequisite IDs of these courses, from one query."""
+    prerequisites = defaultdict(list)
+    edges = Prerequisite.objects.filter(
+        course_id__in=list(course_ids), is_corequisite=False
+    ).order_by('id').values_list('course_id', 'prerequisite_course_id')
+    for course_id, prerequisite_id in edges:
+        prerequisites[course_id].append(prerequisite_id)
+    return prerequisites
+
+
+def compute_chart_recommendations(chart, passed_courses: Iterable[int], next_semester: int) -> dict:
+    """
+    Recommend the chart courses of the student's next semester.
+
+    Args:
+        chart: The student's ChartSchema
+        passed_courses: IDs of the courses the student passed
+        next_semester: Number of completed semesters + 1
+
+    Returns:
+        The /api/degrees/recommendations/ response body
+    """
+    passed_courses = set(passed_courses)
+
+    if next_semester > LAST_SEMESTER:
+        return {
+            "next_semester": next_semester,
+            "recommendations": [],
+            "message": "دانشجو تمام ترم‌ها را تکمیل کرده است"
+        }
+
+    passed_digest = hashlib.sha1(
+        ','.join(map(str, sorted(passed_courses))).encode('ascii')
+    ).hexdigest()
+    cache = get_cache()
+    key = chart_recommendations_cache_key(chart.id, next_semester, passed_digest)
+    result = cache.get(key)
+    if result is None:
+        result = _recommend_semester(chart, passed_courses, next_semester)
+        cache.set(key, result)
+    return result
+
+
+def resolve_electives(slots, members, passed_courses: Set[int], chosen: Set[int],
+                      prerequisites, unlocks, depths: Dict[int, int]) -> Dict[int, object]:
+    """
+    Pick a course for every elective slot (PRD FR-BL-04).
+
+    Passed courses and courses already chosen (the semester's mandatory
+    courses and earlier slots) are skipped; the rest of each group is ranked
+    with score_course, ties going to the lower course code, so two slots of
+    one group get the two best distinct courses.
+
+    Args:
+        slots: Elective ChartNodes in position order
+        members: Group ID -> member Courses
+        depths: Course ID -> critical-path depth (schema_course_depths)
+
+    Returns:
+        Slot ID -> chosen Course, for the slots that could be filled
+    """
+    chosen = set(chosen)
+    picks = {}
+    for node in slots:
+        ranked = [
+            (score_course(
+                course.id, passed_courses, prerequisites, unlocks,
+                critical_depth=depths.get(course.id, 0), is_elective=True
+            )['total'], course)
+            for course in members.get(node.course_group_id, ())
+            if course.id not in passed_courses and course.id not in chosen
+        ]
+        if not ranked:
+            continue
+        _score, best = min(ranked, key=lambda item: (-item[0], item[1].code))
+        picks[node.id] = best
+        chosen.add(best.id)
+    return picks
+
+
+def _recommend_semester(chart, passed_courses: Set[int], next_semester: int) -> dict:
+    # Get courses in next semester
+    nodes = list(
+        ChartNode.objects.filter(
+            schema=chart,
+            semester=next_semester
+        ).select_related('course', 'course_group')
+    )
+
+    members = defaultdict(list)
+    memberships = CourseGroup.courses.through.objects.filter(
+        coursegroup_id__in={node.course_group_id for node in nodes if node.course_group_id}
+    ).select_related('course').order_by('course__code')
+    for membership in memberships:
+        members[membership.coursegroup_id].append(membership.course)
+
+    target_course_ids = {node.course_id for node in nodes if node.course_id}
+    candidate_ids = set(target_course_ids)
+    for courses in members.values():
+        candidate_ids.update(course.id for course in courses)
+    prerequisites = load_prerequisite_map(candidate_ids - passed_courses)
+    unlocks = get_unlocks_index()
+
+    slots = [node for node in nodes if node.course_group_id and not node.course_id]
+    depths = schema_course_depths(chart) if slots else {}
+    picks = resolve_electives(
+        slots, members, passed_courses, target_course_ids, prerequisites, unlocks, depths
+    )
+
+    candidates = []
+    for node in nodes:
+        if node.course:
+            course = node.course
+            is_elective = False
+        else:
+            course = picks.get(node.id)
+            is_elective = True
+
+        # Skip unfilled slots and passed courses
+        if course is None or course.id in passed_courses:
+            continue
+        candidates.append((node, course, is_elective))
+
+    recommendations = []
+    for node, course, is_elective in candidates:
+        score = score_course(
+            course.id,
+            passed_courses,
+            prerequisites,
+            unlocks,
+            in_target_semester=course.id in target_course_ids,
+            critical_depth=depths.get(course.id, 0) if is_elective else node.critical_path_depth,
+            is_elective=is_elective
+        )
+
+        recommendations.append({
+            'course_id': course.id,
+            'code': course.code,
+            'name': course.name,
+            'credits': course.credits,
+            'priority_score': score['total'],
+            'reason': score['reason'],
+            'unlocks': list(unlocks.direct(course.id)),
+            'prerequisites_met': score['prerequisites_met'],
+            'is_mandatory': not is_elective,
+            'is_elective': is_elective,
+        })
+
+    # Sort by priority score (descending)
+    recommendations.sort(key=lambda x: x['priority_score'], reverse=True)
+
+    return {
+        'next_semester': next_semester,
+        'recommendations': recommendations
+    }
+
+
+def score_course(course_id, passed_courses: Set[int], prerequisites, unlocks,
+                 in_target_semester=False, critical_depth=0, is_elective=False):
+    """
+    Calculate priority score for a course from a preloaded prerequisite map
+    (see load_prerequisite_map) and the UnlocksIndex.
+
+    Score = Base_Weight + Dependency_Weight + Semester_Alignment + Critical_Path
+
+    Base_Weight = 50 (all courses have base importance)
+    Dependency_Weight = (number of courses that require this) × 10
+    Semester_Alignment = (course is in target semester?) ? 25 : 0
+    Critical_Path = (stored ChartNode.critical_path_depth, or the elective
+                     course's own depth) × 5
+
+    If prerequisites not met: Score = 0 (blocked)
+    """
+
+    # Check prerequisites
+    prerequisites_met = all(
+        prerequisite_id in passed_courses
+        for prerequisite_id in prerequisites.get(course_id, ())
+    )
+
+    if not prerequisites_met:
+        return {
+            'total': 0,
+            'prerequisites_met': False,
+            'reason': 'پیشنیازهای درس تکمیل نشده است'
+        }
+
+    # Base weight
+    base_weight = 50
+
+    # Dependency weight: courses that need this course as prerequisite
+    dependent_count = len(unlocks.direct(course_id))
+    dependency_weight = dependent_count * 10
+
+    # Semester alignment: is this course in the target semester?
+    semester_weight = 25 if in_target_semester else 0
+
+    # Bonus for elective importance
+    elective_bonus = 0
+    if is_elective:
+        elective_bonus = 10
+
+    # Critical path: courses heading a long prerequisite chain delay graduation
+    # when postponed. Precomputed per chart node, so no graph walk here.
+    critical_weight = critical_depth * 5
+
+    total_score = base_weight + dependency_weight + semester_weight + elective_bonus + critical_weight
+
+    # Cap at 100
+    total_score = min(total_score, 100)
+
+    reason_parts = []
+    if dependent_count > 0:
+        reason_parts.append(f'پیشنیاز برای {dependent_count} درس')
+    if in_target_semester:
+        reason_parts.append('درس مقرر این ترم')
+    if critical_depth > 0:
+        reason_parts.append(f'روی مسیر بحرانی ({critical_depth} ترم وابسته)')
+
+    reason = ' | '.join(reason_parts) if reason_parts else 'درس مهم'
+
+    return {
+        'total': total_score,
+        'prerequisites_met': True,
+        'reason': reason,
+        'base': base_weight,
+        'dependency': dependency_weight,
+        'semester': semester_weight,
+        'elective_bonus': elective_bonus,
+        'critical_path': critical_weight,
+    }
+
+
+def calculate_priority_score(course, passed_courses, target_semester, chart,
+                             critical_depth=0, is_elective=False):
+    """
+    Score a single course; compute_chart_recommendations scores a whole
+    semester at once with score_course.
+    """
+    prerequisites = load_prerequisite_map([course.id])
+    in_target_semester = ChartNode.objects.filter(
+        schema=chart,
+        course=course,
+        semester=target_semester
+    ).exists()
+    return score_course(
+        course.id,
+        set(passed_courses),
+        prerequisites,
+        get_unlocks_index(),
+        in_target_semester=in_target_semester,
+        critical_depth=critical_depth,
+        is_elective=is_elective
+    )
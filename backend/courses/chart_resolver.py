@@ -0,0 +1,209 @@
+"""
+Map student numbers to ChartSchemas (PRD 3.1).
+
+Student numbers look like xxyyyzzzzz: xx is the entry year (92-99 for the
+1390s, 00-14 for the 1400s) and yyy the major code.
+
+Lookups go through an in-process interval index: per major, the schemas'
+entry-year ranges sorted by start year, so resolving a student is a binary
+search instead of a range query. The index is loaded with one query and
+rebuilt whenever the shared chart-schema version changes, which the
+ChartSchema signals bump once every save or delete commits (see
+courses.signals).
+
+The resolved schema is also persisted on Profile.chart_schema, kept current
+by the same signals and filled for existing rows by the
+backfill_chart_schemas command, so requests normally skip the parse too.
+"""
+
+import threading
+from bisect import bisect_right
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.db.models.functions import Substr
+
+from accounts.models import Profile
+from courses.cache import chart_schema_version
+from courses.models import ChartSchema
+
+# Map major code (digits 2-5 of the student ID) to ChartSchema major field
+MAJOR_MAPPING = {
+    '210': 'CS',   # کامپیوتر
+    '213': 'EE',   # برق
+    '201': 'CE',   # عمران
+    '211': 'ME',   # مکانیک
+    '220': 'SE',   # نرم‌افزار
+}
+
+
+def parse_student_number(student_number: str) -> Tuple[int, str]:
+    """
+    Split a student number into (entry_year, major_code).
+
+    Raises:
+        ValueError: if the number is too short or the year is not numeric
+    """
+    if not student_number or len(student_number) < 5:
+        raise ValueError(f'Invalid student number: {student_number!r}')
+
+    # Convert to full year (92 -> 1392, 99 -> 1399, 00 -> 1400, etc)
+    entry_year_int = int(student_number[:2])
+    if entry_year_int >= 92:
+        entry_year = 1300 + entry_year_int
+    else:
+        entry_year = 1400 + entry_year_int
+    return entry_year, student_number[2:5]
+
+
+class ChartSchemaIndex:
+    """
+    Sorted entry-year intervals per major.
+
+    Ranges may overlap (e.g. a revised chart for the last years of an older
+    one); like the ordering of ChartSchema, the range with the latest start
+    year wins. For every position the largest end year seen so far is kept,
+    so the backwards scan stops as soon as no earlier range can reach the
+    year being looked up.
+    """
+
+    def __init__(self, schemas: Iterable[ChartSchema]):
+        self._by_id: Dict[int, ChartSchema] = {}
+        by_major: Dict[str, List[ChartSchema]] = {}
+        for schema in schemas:
+            by_major.setdefault(schema.major, []).append(schema)
+            self._by_id[schema.id] = schema
+
+        self._starts: Dict[str, List[int]] = {}
+        self._reach: Dict[str, List[int]] = {}
+        self._schemas: Dict[str, List[ChartSchema]] = {}
+        for major, entries in by_major.items():
+            entries.sort(key=lambda schema: (schema.entry_year_start, -schema.id))
+            reach = []
+            furthest = -1
+            for schema in entries:
+                furthest = max(furthest, schema.entry_year_end)
+                reach.append(furthest)
+            self._starts[major] = [schema.entry_year_start for schema in entries]
+            self._reach[major] = reach
+            self._schemas[major] = entries
+
+    def get(self, schema_id: int) -> Optional[ChartSchema]:
+        """A schema by primary key, without a query."""
+        return self._by_id.get(schema_id)
+
+    def lookup(self, major: str, entry_year: int) -> Optional[ChartSchema]:
+        """The schema of a major whose entry-year range contains entry_year."""
+        starts = self._starts.get(major)
+        if not starts:
+            return None
+        reach = self._reach[major]
+        entries = self._schemas[major]
+        position = bisect_right(starts, entry_year) - 1
+        while position >= 0 and reach[position] >= entry_year:
+            if entries[position].entry_year_end >= entry_year:
+                return entries[position]
+            position -= 1
+        return None
+
+
+_index: Optional[ChartSchemaIndex] = None
+_index_version = None
+_index_lock = threading.Lock()
+
+
+def get_chart_index() -> ChartSchemaIndex:
+    """The process-wide index, rebuilt if a ChartSchema changed since it was built."""
+    global _index, _index_version
+    version = chart_schema_version()
+    index = _index
+    if index is not None and _index_version == version:
+        return index
+    with _index_lock:
+        if _index is None or _index_version != version:
+            _index = ChartSchemaIndex(ChartSchema.objects.all())
+            _index_version = version
+        return _index
+
+
+def invalidate_chart_index() -> None:
+    """Drop this process's index; the next lookup reloads it."""
+    global _index
+    _index = None
+
+
+def _resolve(index: ChartSchemaIndex, student_number: str) -> Optional[ChartSchema]:
+    try:
+        entry_year, major_code = parse_student_number(student_number)
+    except ValueError:
+        return None
+    major = MAJOR_MAPPING.get(major_code)
+    if not major:
+        return None
+    return index.lookup(major, entry_year)
+
+
+def resolve_chart_schema(student_number: str) -> Optional[ChartSchema]:
+    """The ChartSchema for a student number, or None if nothing matches."""
+    return _resolve(get_chart_index(), student_number)
+
+
+def resolve_many(student_numbers: Iterable[str]) -> Dict[str, Optional[ChartSchema]]:
+    """Resolve many student numbers against one index snapshot."""
+    index = get_chart_index()
+    return {
+        student_number: _resolve(index, student_number)
+        for student_number in student_numbers
+    }
+
+
+def schema_for_profile(profile) -> Optional[ChartSchema]:
+    """The persisted chart of a profile, resolved from its student number if unset."""
+    if profile.chart_schema_id:
+        schema = get_chart_index().get(profile.chart_schema_id)
+        if schema is not None:
+            return schema
+    return resolve_chart_schema(profile.student_number or '')
+
+
+def profiles_of_major(major: str):
+    """Profiles whose student number carries one of the major's codes."""
+    codes = [code for code, value in MAJOR_MAPPING.items() if value == major]
+    return Profile.objects.annotate(
+        major_code=Substr('student_number', 3, 3)
+    ).filter(major_code__in=codes)
+
+
+def refresh_profile_schemas(
+    profiles,
+    batch_size: int = 1000,
+    index: Optional[ChartSchemaIndex] = None,
+) -> int:
+    """
+    Re-resolve Profile.chart_schema for a queryset of profiles, in batches.
+    Only rows whose schema changed are written.
+
+    Args:
+        index: Index to resolve against; defaults to the process-wide one
+
+    Returns:
+        Number of profiles updated
+    """
+    if index is None:
+        index = get_chart_index()
+    updated = 0
+    batch = []
+    rows = profiles.only('id', 'student_number', 'chart_schema').order_by('id')
+    for profile in rows.iterator(chunk_size=batch_size):
+        schema = _resolve(index, profile.student_number)
+        schema_id = schema.id if schema else None
+        if profile.chart_schema_id != schema_id:
+            profile.chart_schema_id = schema_id
+            batch.append(profile)
+        if len(batch) >= batch_size:
+            Profile.objects.bulk_update(batch, ['chart_schema'])
+            updated += len(batch)
+            batch = []
+    if batch:
+        Profile.objects.bulk_update(batch, ['chart_schema'])
+        updated += len(batch)
+    return updated
@@ -0,0 +1,416 @@
+"""
+In-memory prerequisite graph snapshots.
+
+A snapshot holds the hard (non co-requisite) prerequisite edges around one
+DegreeChart in compact integer-indexed adjacency arrays (CSR layout), so the
+recommendation engine can answer prerequisite and dependent questions without
+touching the database once the snapshot is loaded.
+"""
+
+from array import array
+from collections import deque
+from typing import Dict, Iterable, List, Sequence
+
+from django.db.models import Q
+
+from courses.cache import catalog_version, get_cache
+from courses.models import ChartCourse, ChartNode, Course, Prerequisite
+
+
+def iter_bits(mask: int) -> Iterable[int]:
+    """Yield the positions of the set bits of a bitset, lowest first."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def _build_csr(size: int, pairs: Sequence[tuple]) -> tuple:
+    """
+    Build (offsets, targets) arrays from (source, target) index pairs.
+    Neighbours of node i are targets[offsets[i]:offsets[i + 1]].
+    """
+    counts = [0] * (size + 1)
+    for source, _target in pairs:
+        counts[source + 1] += 1
+    for i in range(size):
+        counts[i + 1] += counts[i]
+
+    offsets = array('i', counts)
+    targets = array('i', [0] * len(pairs))
+    cursor = list(counts[:size])
+    for source, target in pairs:
+        targets[cursor[source]] = target
+        cursor[source] += 1
+
+    return offsets, targets
+
+
+class PrerequisiteGraph:
+    """
+    Snapshot of the prerequisite graph for a single DegreeChart (or the
+    course set of a ChartSchema, see load_for_schema).
+
+    Nodes are integer indices: chart courses occupy 0..chart_size-1 (in
+    ChartCourse order) and courses that only appear on the other end of a
+    prerequisite edge follow after them. Two CSR adjacency lists are kept:
+
+    - prerequisites: node -> courses that must be passed first
+    - dependents:    node -> courses that list this node as a prerequisite
+    """
+
+    def __init__(
+        self,
+        chart_id: int,
+        course_ids: List[int],
+        chart_courses: List,
+        importance: List[float],
+        edges: Iterable[tuple],
+        critical_depth: List[int] = None,
+    ):
+        self.chart_id = chart_id
+        self.course_ids = course_ids
+        self.index: Dict[int, int] = {cid: i for i, cid in enumerate(course_ids)}
+        self.chart_size = len(chart_courses)
+        self.courses = chart_courses
+        self.importance = importance
+        self.critical_depth = critical_depth or [0] * self.chart_size
+
+        size = len(course_ids)
+        forward = []
+        for course_id, prereq_id in edges:
+            forward.append((self.index[course_id], self.index[prereq_id]))
+        reverse = [(prereq, course) for course, prereq in forward]
+
+        self._prereq_offsets, self._prereq_targets = _build_csr(size, forward)
+        self._dep_offsets, self._dep_targets = _build_csr(size, reverse)
+
+        # Bitset views of the same edges: bit j of prerequisite_masks[i] is set
+        # when j is a prerequisite of i, and dependent_masks is the transpose.
+        self.prerequisite_masks = [0] * size
+        self.dependent_masks = [0] * size
+        for course, prereq in forward:
+            self.prerequisite_masks[course] |= 1 << prereq
+            self.dependent_masks[prereq] |= 1 << course
+        self._gating_nodes = [node for node in range(size) if self.dependent_masks[node]]
+        self.chart_mask = (1 << self.chart_size) - 1
+
+    @classmethod
+    def load(cls, degree_chart) -> 'PrerequisiteGraph':
+        """
+        Load a snapshot with two queries: chart courses (joined with Course)
+        and every hard prerequisite edge touching a course in the chart.
+        """
+        chart_rows = list(
+            ChartCourse.objects.filter(degree_chart=degree_chart)
+            .select_related('course')
+            .order_by('id')
+        )
+        chart_courses = [row.course for row in chart_rows]
+        return cls._with_edges(
+            degree_chart.id,
+            chart_courses,
+            importance=[row.importance_score for row in chart_rows],
+            critical_depth=[row.critical_path_depth for row in chart_rows],
+        )
+
+    @classmethod
+    def load_for_schema(cls, schema) -> 'PrerequisiteGraph':
+        """
+        Snapshot over the courses of a ChartSchema: specific node courses
+        plus every member of its elective groups.
+        """
+        courses = {}
+        nodes = ChartNode.objects.filter(schema=schema).select_related('course')
+        group_ids = set()
+        for node in nodes:
+            if node.course_id:
+                courses[node.course_id] = node.course
+            elif node.course_group_id:
+                group_ids.add(node.course_group_id)
+        if group_ids:
+            members = Course.objects.filter(course_groups__in=group_ids).distinct()
+            for course in members:
+                courses.setdefault(course.id, course)
+
+        chart_courses = sorted(courses.values(), key=lambda course: course.id)
+        return cls._with_edges(
+            schema.id, chart_courses, importance=[0.0] * len(chart_courses)
+        )
+
+    @classmethod
+    def _with_edges(cls, chart_id, chart_courses, importance, critical_depth=None):
+        course_ids = [course.id for course in chart_courses]
+        edges = list(
+            Prerequisite.objects.filter(is_corequisite=False)
+            .filter(
+                Q(course_id__in=course_ids) | Q(prerequisite_course_id__in=course_ids)
+            )
+            .values_list('course_id', 'prerequisite_course_id')
+        )
+
+        known = set(course_ids)
+        for pair in edges:
+            for course_id in pair:
+                if course_id not in known:
+                    known.add(course_id)
+                    course_ids.append(course_id)
+
+        return cls(chart_id, course_ids, chart_courses, importance, edges, critical_depth)
+
+    def __len__(self) -> int:
+        return len(self.course_ids)
+
+    def prerequisites_of(self, node: int) -> array:
+        """Indices of the direct prerequisites of a node."""
+        return self._prereq_targets[self._prereq_offsets[node]:self._prereq_offsets[node + 1]]
+
+    def dependents_of(self, node: int) -> array:
+        """Indices of the courses that directly require a node."""
+        return self._dep_targets[self._dep_offsets[node]:self._dep_offsets[node + 1]]
+
+    def dependent_count(self, node: int) -> int:
+        """Number of courses that directly require a node."""
+        return self._dep_offsets[node + 1] - self._dep_offsets[node]
+
+    def encode(self, course_ids: Iterable[int]) -> int:
+        """Bitset of the given course ids; ids outside the graph are ignored."""
+        mask = 0
+        index = self.index
+        for course_id in course_ids:
+            node = index.get(course_id)
+            if node is not None:
+                mask |= 1 << node
+        return mask
+
+    def prerequisites_met(self, node: int, passed_mask: int) -> bool:
+        """True when every hard prerequisite of a node is in passed_mask."""
+        return self.prerequisite_masks[node] & ~passed_mask == 0
+
+    def eligible_mask(self, passed_mask: int, excluded_mask: int = 0) -> int:
+        """
+        Chart courses whose prerequisites are all passed, as one bitset.
+
+        Equivalent to evaluating (prerequisite_masks[i] & ~passed) == 0 for
+        every chart course, but done column-wise: each unpassed course that
+        gates something blocks all of its dependents in a single OR.
+        """
+        blocked = 0
+        dependent_masks = self.dependent_masks
+        for node in self._gating_nodes:
+            if not passed_mask >> node & 1:
+                blocked |= dependent_masks[node]
+        return self.chart_mask & ~blocked & ~excluded_mask
+
+    def topological_order(self) -> List[int]:
+        """
+        Kahn ordering from roots (no prerequisites) towards dependents.
+        Nodes that sit on a cycle are left out of the result.
+        """
+        size = len(self.course_ids)
+        indegree = [
+            self._prereq_offsets[i + 1] - self._prereq_offsets[i] for i in range(size)
+        ]
+        queue = deque(i for i in range(size) if indegree[i] == 0)
+        order = []
+        while queue:
+            node = queue.popleft()
+            order.append(node)
+            for dependent in self.dependents_of(node):
+                indegree[dependent] -= 1
+                if indegree[dependent] == 0:
+                    queue.append(dependent)
+        return order
+
+    def descendant_masks(self) -> List[int]:
+        """
+        Bitset of all transitive dependents for every node, computed in a
+        single pass over the reverse topological order. Nodes on a cycle
+        (absent from the order) fall back to an explicit traversal.
+        """
+        size = len(self.course_ids)
+        masks = [0] * size
+        order = self.topological_order()
+        for node in reversed(order):
+            mask = 0
+            for dependent in self.dependents_of(node):
+                mask |= masks[dependent] | (1 << dependent)
+            masks[node] = mask
+
+        if len(order) < size:
+            ordered = set(order)
+            for node in range(size):
+                if node in ordered:
+                    continue
+                mask = 0
+                stack = list(self.dependents_of(node))
+                while stack:
+                    current = stack.pop()
+                    if mask >> current & 1:
+                        continue
+                    mask |= 1 << current
+                    stack.extend(self.dependents_of(current))
+                masks[node] = mask
+            # Acyclic ancestors of a cycle were computed before their cyclic
+            # dependents were filled in, so fold those in once more.
+            for node in reversed(order):
+                mask = 0
+                for dependent in self.dependents_of(node):
+                    mask |= masks[dependent] | (1 << dependent)
+                masks[node] = mask
+
+        return masks
+
+    def transitive_dependent_counts(self) -> List[int]:
+        """
+        Number of chart courses that transitively depend on each chart course.
+        Paths may pass through courses outside the chart, but only chart
+        courses are counted.
+        """
+        masks = self.descendant_masks()
+        return [
+            bin(masks[node] & self.chart_mask & ~(1 << node)).count('1')
+            for node in range(self.chart_size)
+        ]
+
+    def longest_path_depths(self) -> List[int]:
+        """
+        Length of the longest prerequisite chain that starts after each chart
+        course, i.e. how many semesters of dependents still hang off it.
+        Sinks have depth 0. One pass over the reverse topological order;
+        courses on or behind a cycle (no longest path exists) keep depth 0.
+        """
+        depth = [0] * len(self.course_ids)
+        for node in reversed(self.topological_order()):
+            best = -1
+            for dependent in self.dependents_of(node):
+                if depth[dependent] > best:
+                    best = depth[dependent]
+            depth[node] = best + 1
+        return depth[:self.chart_size]
+
+
+def strongly_connected_components(adjacency: Dict[int, Sequence[int]]) -> List[List[int]]:
+    """
+    Tarjan's algorithm, iterative so deep prerequisite chains cannot hit the
+    recursion limit. Runs in O(V + E) and returns every component, including
+    single nodes; callers decide which components count as cycles.
+    """
+    index_of: Dict[int, int] = {}
+    lowlink: Dict[int, int] = {}
+    on_stack = set()
+    stack: List[int] = []
+    components: List[List[int]] = []
+    counter = 0
+
+    for root in adjacency:
+        if root in index_of:
+            continue
+        index_of[root] = lowlink[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack.add(root)
+        work = [(root, iter(adjacency.get(root, ())))]
+
+        while work:
+            node, neighbours = work[-1]
+            advanced = False
+            for neighbour in neighbours:
+                if neighbour not in index_of:
+                    index_of[neighbour] = lowlink[neighbour] = counter
+                    counter += 1
+                    stack.append(neighbour)
+                    on_stack.add(neighbour)
+                    work.append((neighbour, iter(adjacency.get(neighbour, ()))))
+                    advanced = True
+                    break
+                if neighbour in on_stack:
+                    lowlink[node] = min(lowlink[node], index_of[neighbour])
+            if advanced:
+                continue
+
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                lowlink[parent] = min(lowlink[parent], lowlink[node])
+            if lowlink[node] == index_of[node]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component.append(member)
+                    if member == node:
+                        break
+                components.append(component)
+
+    return components
+
+
+def load_catalog_dependents() -> Dict[int, List[int]]:
+    """
+    Catalog-wide hard prerequisite adjacency (prerequisite -> dependents).
+
+    Loaded with one query and kept in the recommendations cache until the
+    catalog version is bumped by a prerequisite change.
+    """
+    cache = get_cache()
+    key = f'graph:catalog:{catalog_version()}'
+    adjacency = cache.get(key)
+    if adjacency is None:
+        adjacency = {}
+        edges = Prerequisite.objects.filter(is_corequisite=False).values_list(
+            'prerequisite_course_id', 'course_id'
+        )
+        for prereq_id, course_id in edges:
+            adjacency.setdefault(prereq_id, []).append(course_id)
+        cache.set(key, adjacency)
+    return adjacency
+
+
+def reachable_dependents(adjacency: Dict[int, Sequence[int]], start: int) -> set:
+    """Every course that transitively depends on start (start excluded unless on a cycle)."""
+    seen = set()
+    stack = list(adjacency.get(start, ()))
+    while stack:
+        node = stack.pop()
+        if node in seen:
+            continue
+        seen.add(node)
+        stack.extend(adjacency.get(node, ()))
+    return seen
+
+
+def find_prerequisite_cycles() -> List[List[Dict]]:
+    """
+    Every group of courses that require each other, across the whole catalog.
+
+    All hard prerequisite edges are read in one query and grouped into
+    strongly connected components; a component is reported when it has more
+    than one course or a course that lists itself as a prerequisite.
+
+    Returns:
+        One list of {'id', 'code'} dicts per cycle group, sorted by code
+    """
+    adjacency: Dict[int, List[int]] = {}
+    codes: Dict[int, str] = {}
+    self_loops = set()
+    edges = Prerequisite.objects.filter(is_corequisite=False).values_list(
+        'prerequisite_course_id', 'prerequisite_course__code', 'course_id', 'course__code'
+    )
+    for prereq_id, prereq_code, course_id, course_code in edges:
+        adjacency.setdefault(prereq_id, []).append(course_id)
+        adjacency.setdefault(course_id, [])
+        codes[prereq_id] = prereq_code
+        codes[course_id] = course_code
+        if prereq_id == course_id:
+            self_loops.add(course_id)
+
+    cycles = []
+    for component in strongly_connected_components(adjacency):
+        if len(component) > 1 or component[0] in self_loops:
+            cycles.append(sorted(
+                ({'id': course_id, 'code': codes[course_id]} for course_id in component),
+                key=lambda item: item['code'],
+            ))
+    cycles.sort(key=lambda group: group[0]['code'])
+    return cycles
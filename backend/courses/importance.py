@@ -0,0 +1,153 @@
+"""
+Materialized importance scores and critical-path depths for chart courses.
+
+ChartCourse.importance_score stores the number of chart courses that
+transitively depend on a course, and ChartCourse/ChartNode
+.critical_path_depth the length of the longest prerequisite chain after it.
+Both are recomputed per DegreeChart or ChartSchema in topological passes over
+a PrerequisiteGraph snapshot, and only rows whose value changed are written
+back.
+"""
+
+import threading
+from typing import Dict, Iterable, Tuple
+
+from django.db import transaction
+from django.db.models import Q
+
+from courses.cache import bump_chart_body_version, bump_graph_version, chart_body_version
+from courses.changes import record_changes
+from courses.graph import PrerequisiteGraph
+from courses.models import (
+    CatalogChange, ChartCourse, ChartNode, ChartSchema, DegreeChart, RecommendationSnapshot,
+)
+
+
+def recompute_importance_scores(degree_chart) -> int:
+    """
+    Recompute importance scores and critical-path depths for every course
+    in a degree chart. When any changed, the chart's cached recommendations
+    are invalidated once the change commits.
+
+    Returns:
+        Number of ChartCourse rows that were updated
+    """
+    graph = PrerequisiteGraph.load(degree_chart)
+    counts = graph.transitive_dependent_counts()
+    depths = graph.longest_path_depths()
+
+    changed = {
+        graph.course_ids[node]: (float(counts[node]), depths[node])
+        for node in range(graph.chart_size)
+        if graph.importance[node] != counts[node]
+        or graph.critical_depth[node] != depths[node]
+    }
+    if not changed:
+        return 0
+
+    rows = list(
+        ChartCourse.objects.filter(
+            degree_chart=degree_chart,
+            course_id__in=changed,
+        )
+    )
+    for row in rows:
+        row.importance_score, row.critical_path_depth = changed[row.course_id]
+    ChartCourse.objects.bulk_update(rows, ['importance_score', 'critical_path_depth'])
+    chart_id = degree_chart.id
+    transaction.on_commit(lambda: bump_graph_version(chart_id))
+    return len(rows)
+
+
+def recompute_schema_depths(schema) -> int:
+    """
+    Recompute ChartNode.critical_path_depth for every node of a chart schema.
+    Elective slots take the deepest chain among their group's courses. When
+    any depth changed, the schema's recommendation snapshots are deleted and
+    its cached bodies, graph export and scores invalidated once the change
+    commits.
+
+    Returns:
+        Number of ChartNode rows that were updated
+    """
+    graph = PrerequisiteGraph.load_for_schema(schema)
+    depths = graph.longest_path_depths()
+    depth_of = {graph.course_ids[node]: depths[node] for node in range(graph.chart_size)}
+
+    nodes = list(
+        ChartNode.objects.filter(schema=schema).prefetch_related('course_group__courses')
+    )
+    changed = []
+    for node in nodes:
+        if node.course_id:
+            depth = depth_of.get(node.course_id, 0)
+        elif node.course_group_id:
+            depth = max(
+                (depth_of.get(course.id, 0) for course in node.course_group.courses.all()),
+                default=0,
+            )
+        else:
+            depth = 0
+        if node.critical_path_depth != depth:
+            node.critical_path_depth = depth
+            changed.append(node)
+
+    if not changed:
+        return 0
+
+    ChartNode.objects.bulk_update(changed, ['critical_path_depth'])
+    # bulk_update sends no signals; depths are part of the synced node rows
+    record_changes(CatalogChange.CHART_NODE, [node.id for node in changed])
+    RecommendationSnapshot.objects.filter(chart_schema=schema).delete()
+    schema_id = schema.id
+    transaction.on_commit(lambda: bump_chart_body_version(schema_id))
+    return len(changed)
+
+
+_schema_depths: Dict[int, Tuple[object, Dict[int, int]]] = {}
+_schema_depths_lock = threading.Lock()
+
+
+def schema_course_depths(schema) -> Dict[int, int]:
+    """
+    Critical-path depth of every course of a chart schema, elective group
+    members included, by course ID. ChartNode.critical_path_depth of an
+    elective slot is the deepest of its group; this tells the members
+    apart. Cached per process until the schema's chart_body_version changes.
+    """
+    version = chart_body_version(schema.id)
+    cached = _schema_depths.get(schema.id)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    with _schema_depths_lock:
+        cached = _schema_depths.get(schema.id)
+        if cached is None or cached[0] != version:
+            graph = PrerequisiteGraph.load_for_schema(schema)
+            depths = graph.longest_path_depths()
+            cached = (
+                version,
+                {graph.course_ids[node]: depths[node] for node in range(graph.chart_size)},
+            )
+            _schema_depths[schema.id] = cached
+        return cached[1]
+
+
+def refresh_importance_for_courses(course_ids: Iterable[int]) -> int:
+    """
+    Recompute stored values for the charts affected by a prerequisite change.
+
+    Only charts and schemas that contain one of the given courses can see
+    their values change, so others are left alone.
+    """
+    course_ids = list(course_ids)
+    charts = DegreeChart.objects.filter(
+        chart_courses__course_id__in=course_ids
+    ).distinct()
+    updated = sum(recompute_importance_scores(chart) for chart in charts)
+
+    schemas = ChartSchema.objects.filter(
+        Q(nodes__course_id__in=course_ids)
+        | Q(nodes__course_group__courses__id__in=course_ids)
+    ).distinct()
+    updated += sum(recompute_schema_depths(schema) for schema in schemas)
+    return updated
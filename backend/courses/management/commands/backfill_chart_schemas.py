@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import Profile
+from courses.chart_resolver import MAJOR_MAPPING, profiles_of_major, refresh_profile_schemas
+
+
+class Command(BaseCommand):
+    help = 'Resolve and store Profile.chart_schema from student numbers for existing profiles'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--major',
+            choices=sorted(set(MAJOR_MAPPING.values())),
+            help='Only profiles of this major. Defaults to every profile.',
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+
+        if options['major']:
+            profiles = profiles_of_major(options['major'])
+        else:
+            profiles = Profile.objects.all()
+
+        updated = refresh_profile_schemas(profiles, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Done. {updated} profile(s) updated.'))
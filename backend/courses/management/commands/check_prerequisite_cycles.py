@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from courses.graph import find_prerequisite_cycles
+
+
+class Command(BaseCommand):
+    help = 'Validate the course catalog and list every circular prerequisite group'
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        cycles = find_prerequisite_cycles()
+        elapsed = (time.perf_counter() - started) * 1000
+
+        if not cycles:
+            self.stdout.write(self.style.SUCCESS(f'No prerequisite cycles found ({elapsed:.1f} ms)'))
+            return
+
+        for number, group in enumerate(cycles, start=1):
+            codes = ' <-> '.join(course['code'] for course in group)
+            self.stdout.write(f'{number}. {codes}')
+
+        raise CommandError(f'{len(cycles)} prerequisite cycle group(s) found ({elapsed:.1f} ms)')
@@ -0,0 +1,107 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+
+def _init_worker():
+    # Workers started with "spawn" have no app registry yet; forked ones
+    # must not reuse the parent's database connections.
+    import django
+    django.setup()
+    connections.close_all()
+
+
+def _run_chunk(student_ids, recompute_before):
+    from courses.snapshots import precompute_chunk
+    return precompute_chunk(student_ids, recompute_before)
+
+
+class Command(BaseCommand):
+    help = (
+        'Precompute degree-chart recommendations of every active student into '
+        'RecommendationSnapshot. Students with a fresh snapshot are skipped, so an '
+        'interrupted run resumes where it stopped when started again.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=min(4, os.cpu_count() or 1),
+            help='Worker processes; 1 runs in this process',
+        )
+        parser.add_argument('--chunk-size', type=int, default=200, help='Students per work unit')
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Recompute snapshots that are still fresh',
+        )
+        parser.add_argument(
+            '--recompute-before',
+            help='Recompute snapshots computed before this ISO timestamp (resumes a --force run)',
+        )
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1 or options['chunk_size'] < 1:
+            raise CommandError('--workers and --chunk-size must be positive')
+
+        recompute_before = None
+        if options['recompute_before']:
+            recompute_before = parse_datetime(options['recompute_before'])
+            if recompute_before is None:
+                raise CommandError('--recompute-before must be an ISO timestamp')
+            if timezone.is_naive(recompute_before):
+                recompute_before = timezone.make_aware(recompute_before)
+        elif options['force']:
+            recompute_before = timezone.now()
+            self.stdout.write(
+                f'Resume an interrupted run with --recompute-before {recompute_before.isoformat()}'
+            )
+
+        User = get_user_model()
+        student_ids = list(
+            User.objects.filter(
+                role='student',
+                is_active=True,
+                profile__student_number__isnull=False,
+            ).order_by('id').values_list('id', flat=True)
+        )
+        size = options['chunk_size']
+        chunks = [student_ids[i:i + size] for i in range(0, len(student_ids), size)]
+
+        started = time.perf_counter()
+        computed = skipped = 0
+        if options['workers'] == 1:
+            results = (_run_chunk(chunk, recompute_before) for chunk in chunks)
+            for done, (chunk_computed, chunk_skipped) in enumerate(results, start=1):
+                computed += chunk_computed
+                skipped += chunk_skipped
+                self._report(done, len(chunks), chunk_computed, chunk_skipped)
+        else:
+            connections.close_all()
+            with ProcessPoolExecutor(
+                max_workers=options['workers'], initializer=_init_worker
+            ) as pool:
+                futures = [
+                    pool.submit(_run_chunk, chunk, recompute_before) for chunk in chunks
+                ]
+                for done, future in enumerate(as_completed(futures), start=1):
+                    chunk_computed, chunk_skipped = future.result()
+                    computed += chunk_computed
+                    skipped += chunk_skipped
+                    self._report(done, len(chunks), chunk_computed, chunk_skipped)
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Done. {computed} snapshot(s) computed, {skipped} skipped, '
+            f'{len(student_ids)} student(s) in {elapsed:.1f}s.'
+        ))
+
+    def _report(self, done, total, computed, skipped):
+        self.stdout.write(f'chunk {done}/{total}: {computed} computed, {skipped} skipped')
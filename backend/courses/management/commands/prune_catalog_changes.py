@@ -0,0 +1,25 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from courses.changes import prune_changes
+
+
+class Command(BaseCommand):
+    help = 'Delete catalog change log entries older than the retention period'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.CATALOG_CHANGE_RETENTION_DAYS,
+            help='Keep entries from the last N days (default: CATALOG_CHANGE_RETENTION_DAYS)',
+        )
+
+    def handle(self, *args, **options):
+        if options['days'] < 0:
+            raise CommandError('--days must not be negative')
+
+        deleted = prune_changes(timedelta(days=options['days']))
+        self.stdout.write(self.style.SUCCESS(
+            f"Pruned {deleted} catalog change(s) older than {options['days']} day(s)"
+        ))
@@ -0,0 +1,81 @@
+import csv
+import json
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from courses.models import DegreeChart
+from courses.recommendations import MAX_COHORT_LIMIT, recommend_for_cohort
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Compute course recommendations for every student in an entry cohort'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chart', required=True, help='DegreeChart code')
+        parser.add_argument(
+            '--prefix',
+            required=True,
+            help='Student number prefix that identifies the cohort (e.g. 02210)',
+        )
+        parser.add_argument('--semester', default='Spring 1403')
+        parser.add_argument(
+            '--limit', type=int, default=10,
+            help=f'Recommendations per student, at most {MAX_COHORT_LIMIT}',
+        )
+        parser.add_argument(
+            '--output',
+            required=True,
+            help='Output file; .csv writes one row per recommendation, anything else writes JSON',
+        )
+
+    def handle(self, *args, **options):
+        if options['limit'] < 1:
+            raise CommandError('--limit must be positive')
+        limit = min(options['limit'], MAX_COHORT_LIMIT)
+
+        try:
+            degree_chart = DegreeChart.objects.get(code=options['chart'])
+        except DegreeChart.DoesNotExist:
+            raise CommandError(f"Degree chart {options['chart']} not found")
+
+        students = User.objects.filter(
+            role='student',
+            profile__student_number__startswith=options['prefix'],
+        )
+        student_numbers = dict(students.values_list('id', 'profile__student_number'))
+
+        started = time.perf_counter()
+        results = recommend_for_cohort(
+            degree_chart, students, options['semester'], limit
+        )
+        elapsed = time.perf_counter() - started
+
+        output = options['output']
+        if output.endswith('.csv'):
+            with open(output, 'w', newline='', encoding='utf-8') as handle:
+                writer = csv.writer(handle)
+                writer.writerow(['student_number', 'rank', 'course_code', 'importance_score'])
+                for student_id, recommendations in results.items():
+                    for rank, item in enumerate(recommendations, start=1):
+                        writer.writerow([
+                            student_numbers.get(student_id),
+                            rank,
+                            item['code'],
+                            item['importance_score'],
+                        ])
+        else:
+            payload = {
+                student_numbers.get(student_id): [item['code'] for item in recommendations]
+                for student_id, recommendations in results.items()
+            }
+            with open(output, 'w', encoding='utf-8') as handle:
+                json.dump(payload, handle, ensure_ascii=False, indent=2)
+
+        rate = len(results) / elapsed if elapsed > 0 else float('inf')
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(results)} student(s) in {elapsed:.3f}s ({rate:.1f} students/s) -> {output}'
+        ))
@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from courses.importance import recompute_importance_scores, recompute_schema_depths
+from courses.models import ChartSchema, DegreeChart
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute ChartCourse.importance_score (transitive dependent counts) for degree charts '
+        'and ChartNode.critical_path_depth for chart schemas'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chart',
+            dest='chart_codes',
+            action='append',
+            default=[],
+            help='DegreeChart code to recompute (repeatable). Defaults to all charts.',
+        )
+        parser.add_argument(
+            '--schema',
+            dest='schema_codes',
+            action='append',
+            default=[],
+            help='ChartSchema code to recompute (repeatable). Defaults to all schemas.',
+        )
+
+    def handle(self, *args, **options):
+        charts = DegreeChart.objects.all()
+        if options['chart_codes']:
+            charts = charts.filter(code__in=options['chart_codes'])
+            if not charts.exists():
+                raise CommandError('No degree chart matched the given codes')
+        elif options['schema_codes']:
+            charts = charts.none()
+
+        schemas = ChartSchema.objects.all()
+        if options['schema_codes']:
+            schemas = schemas.filter(code__in=options['schema_codes'])
+            if not schemas.exists():
+                raise CommandError('No chart schema matched the given codes')
+        elif options['chart_codes']:
+            schemas = schemas.none()
+
+        total = 0
+        for chart in charts:
+            updated = recompute_importance_scores(chart)
+            total += updated
+            self.stdout.write(f'{chart.code}: {updated} course(s) updated')
+
+        total_nodes = 0
+        for schema in schemas:
+            updated = recompute_schema_depths(schema)
+            total_nodes += updated
+            self.stdout.write(f'{schema.code}: {updated} chart node(s) updated')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Done. {total} chart course(s) and {total_nodes} chart node(s) updated.'
+        ))
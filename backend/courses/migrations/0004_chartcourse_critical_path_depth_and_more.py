@@ -0,0 +1,23 @@
+# Generated by Django 4.2.11 on 2026-10-17 18:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0003_coursegroup_chartschema_chartnode'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chartcourse',
+            name='critical_path_depth',
+            field=models.IntegerField(default=0, help_text='Length of the longest prerequisite chain after this course'),
+        ),
+        migrations.AddField(
+            model_name='chartnode',
+            name='critical_path_depth',
+            field=models.IntegerField(default=0, help_text="Length of the longest prerequisite chain after this node's course(s)"),
+        ),
+    ]
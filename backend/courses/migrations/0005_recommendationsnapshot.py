@@ -0,0 +1,33 @@
+# Generated by Django 4.2.11 on 2026-10-17 18:56
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('courses', '0004_chartcourse_critical_path_depth_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecommendationSnapshot',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('semester', models.IntegerField(help_text='Semester number the recommendations are for')),
+                ('payload', models.JSONField(help_text='Recommendations response body')),
+                ('history_fingerprint', models.CharField(help_text="Row count and latest update of the student's course history when computed", max_length=64)),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+                ('chart_schema', models.ForeignKey(help_text='Chart schema the recommendations were computed on', on_delete=django.db.models.deletion.CASCADE, related_name='recommendation_snapshots', to='courses.chartschema')),
+                ('student', models.ForeignKey(help_text='Student user', on_delete=django.db.models.deletion.CASCADE, related_name='recommendation_snapshots', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'recommendation snapshot',
+                'verbose_name_plural': 'recommendation snapshots',
+                'unique_together': {('student', 'semester')},
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.11 on 2026-10-17 19:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0005_recommendationsnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogChange',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('table', models.CharField(choices=[('courses', 'Course'), ('chart_nodes', 'Chart node'), ('course_groups', 'Course group'), ('prerequisites', 'Prerequisite'), ('corequisites', 'Co-requisite')], help_text='Kind of row that changed', max_length=20)),
+                ('object_id', models.IntegerField(help_text='Primary key of the row that changed')),
+                ('action', models.CharField(choices=[('upsert', 'Created or updated'), ('delete', 'Deleted')], help_text='Whether the row was saved or deleted', max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'catalog change',
+                'verbose_name_plural': 'catalog changes',
+                'ordering': ['id'],
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.11 on 2026-10-17 19:18
+
+from django.db import migrations, models
+
+from courses.weektime import week_interval
+
+
+def backfill_week_minutes(apps, schema_editor):
+    Course = apps.get_model('courses', 'Course')
+    rows = []
+    for course in Course.objects.only('id', 'day_of_week', 'start_time', 'end_time').iterator():
+        course.week_start_minute, course.week_end_minute = week_interval(
+            course.day_of_week, course.start_time, course.end_time
+        )
+        rows.append(course)
+    Course.objects.bulk_update(rows, ['week_start_minute', 'week_end_minute'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0006_catalogchange'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='week_end_minute',
+            field=models.IntegerField(blank=True, editable=False, help_text='End of the weekly slot in minutes since Saturday 00:00', null=True),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='week_start_minute',
+            field=models.IntegerField(blank=True, editable=False, help_text='Start of the weekly slot in minutes since Saturday 00:00', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['instructor', 'week_start_minute'], name='courses_cou_instruc_ad6654_idx'),
+        ),
+        migrations.RunPython(backfill_week_minutes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 4.2.11 on 2026-10-17 19:21
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0007_week_minutes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Section',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('semester', models.CharField(help_text='Semester of the offering (e.g., Spring 1403)', max_length=10)),
+                ('number', models.CharField(help_text='Section number within the course (e.g., 01)', max_length=10)),
+                ('instructor', models.CharField(blank=True, help_text='Instructor name', max_length=255)),
+                ('capacity', models.IntegerField(blank=True, help_text='Maximum student capacity', null=True)),
+                ('is_offered', models.BooleanField(default=True, help_text='Is this section open for selection?')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('course', models.ForeignKey(help_text='Course this section offers', on_delete=django.db.models.deletion.CASCADE, related_name='sections', to='courses.course')),
+            ],
+            options={
+                'verbose_name': 'section',
+                'verbose_name_plural': 'sections',
+                'ordering': ['course__code', 'number'],
+                'unique_together': {('course', 'semester', 'number')},
+            },
+        ),
+        migrations.CreateModel(
+            name='SectionTime',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day_of_week', models.CharField(help_text='Day of week (Sat, Sun, Mon, Tue, Wed, Thu)', max_length=20)),
+                ('start_time', models.TimeField(help_text='Start time')),
+                ('end_time', models.TimeField(help_text='End time')),
+                ('location', models.CharField(blank=True, help_text='Class location/room', max_length=255)),
+                ('week_start_minute', models.IntegerField(blank=True, editable=False, help_text='Start of the weekly slot in minutes since Saturday 00:00', null=True)),
+                ('week_end_minute', models.IntegerField(blank=True, editable=False, help_text='End of the weekly slot in minutes since Saturday 00:00', null=True)),
+                ('section', models.ForeignKey(help_text='Section that meets at this time', on_delete=django.db.models.deletion.CASCADE, related_name='times', to='courses.section')),
+            ],
+            options={
+                'verbose_name': 'section time',
+                'verbose_name_plural': 'section times',
+                'ordering': ['week_start_minute'],
+                'indexes': [models.Index(fields=['location', 'week_start_minute'], name='courses_sec_locatio_42cb5b_idx')],
+            },
+        ),
+    ]
@@ -1,7 +1,10 @@
 from django.db import models
+from django.conf import settings
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import MinValueValidator, MaxValueValidator
 
+from .weektime import week_interval
+
 
 class DegreeChart(models.Model):
     """
@@ -158,6 +161,22 @@ class Course(models.Model):
         help_text=_("End time of the course")
     )
     
+    # day_of_week/start_time/end_time as minutes since Saturday 00:00,
+    # maintained by save() (see courses.weektime)
+    week_start_minute = models.IntegerField(
+        null=True,
+        blank=True,
+        editable=False,
+        help_text=_("Start of the weekly slot in minutes since Saturday 00:00")
+    )
+    
+    week_end_minute = models.IntegerField(
+        null=True,
+        blank=True,
+        editable=False,
+        help_text=_("End of the weekly slot in minutes since Saturday 00:00")
+    )
+    
     semester = models.IntegerField(
         null=True,
         blank=True,
@@ -193,9 +212,22 @@ class Course(models.Model):
         verbose_name = _("course")
         verbose_name_plural = _("courses")
         ordering = ['code']
+        indexes = [
+            # Instructor clashes: same instructor, overlapping weekly slot
+            models.Index(fields=['instructor', 'week_start_minute']),
+        ]
     
     def __str__(self):
         return f"{self.code} - {self.name}"
+    
+    def save(self, *args, **kwargs):
+        self.week_start_minute, self.week_end_minute = week_interval(
+            self.day_of_week, self.start_time, self.end_time
+        )
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'day_of_week', 'start_time', 'end_time'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'week_start_minute', 'week_end_minute'}
+        super().save(*args, **kwargs)
 
 
 class ChartCourse(models.Model):
@@ -235,6 +267,11 @@ class ChartCourse(models.Model):
         help_text=_("Calculated importance score (# of dependent courses)")
     )
     
+    critical_path_depth = models.IntegerField(
+        default=0,
+        help_text=_("Length of the longest prerequisite chain after this course")
+    )
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -557,6 +594,11 @@ class ChartNode(models.Model):
         help_text=_("Is this course/group mandatory?")
     )
     
+    critical_path_depth = models.IntegerField(
+        default=0,
+        help_text=_("Length of the longest prerequisite chain after this node's course(s)")
+    )
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -597,3 +639,230 @@ class ChartNode(models.Model):
         return self.course is not None
 
 
+
+
+class RecommendationSnapshot(models.Model):
+    """
+    Precomputed degree-chart recommendations of one student for one semester.
+    
+    Written nightly by the precompute_recommendations command and on demand
+    by DegreeChartViewSet.recommendations. A snapshot is served while its
+    history_fingerprint still matches the student's StudentCourseHistory.
+    """
+    
+    student = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='recommendation_snapshots',
+        help_text=_("Student user")
+    )
+    
+    chart_schema = models.ForeignKey(
+        'ChartSchema',
+        on_delete=models.CASCADE,
+        related_name='recommendation_snapshots',
+        help_text=_("Chart schema the recommendations were computed on")
+    )
+    
+    semester = models.IntegerField(
+        help_text=_("Semester number the recommendations are for")
+    )
+    
+    payload = models.JSONField(
+        help_text=_("Recommendations response body")
+    )
+    
+    history_fingerprint = models.CharField(
+        max_length=64,
+        help_text=_("Row count and latest update of the student's course history when computed")
+    )
+    
+    computed_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = _("recommendation snapshot")
+        verbose_name_plural = _("recommendation snapshots")
+        unique_together = [('student', 'semester')]
+    
+    def __str__(self):
+        return f"{self.student} - Sem {self.semester}"
+
+
+class CatalogChange(models.Model):
+    """
+    Append-only log of catalog rows that were saved or deleted.
+    
+    Written by the courses signals (and after bulk operations, which send
+    none) for Course, ChartNode, CourseGroup, Prerequisite and CoRequisite.
+    The id of the latest entry a client has seen is its sync version; see
+    courses.changes.
+    """
+    
+    COURSE = 'courses'
+    CHART_NODE = 'chart_nodes'
+    COURSE_GROUP = 'course_groups'
+    PREREQUISITE = 'prerequisites'
+    COREQUISITE = 'corequisites'
+    TABLE_CHOICES = [
+        (COURSE, _('Course')),
+        (CHART_NODE, _('Chart node')),
+        (COURSE_GROUP, _('Course group')),
+        (PREREQUISITE, _('Prerequisite')),
+        (COREQUISITE, _('Co-requisite')),
+    ]
+    
+    UPSERT = 'upsert'
+    DELETE = 'delete'
+    ACTION_CHOICES = [
+        (UPSERT, _('Created or updated')),
+        (DELETE, _('Deleted')),
+    ]
+    
+    table = models.CharField(
+        max_length=20,
+        choices=TABLE_CHOICES,
+        help_text=_("Kind of row that changed")
+    )
+    
+    object_id = models.IntegerField(
+        help_text=_("Primary key of the row that changed")
+    )
+    
+    action = models.CharField(
+        max_length=10,
+        choices=ACTION_CHOICES,
+        help_text=_("Whether the row was saved or deleted")
+    )
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = _("catalog change")
+        verbose_name_plural = _("catalog changes")
+        ordering = ['id']
+    
+    def __str__(self):
+        return f"#{self.id} {self.action} {self.table}:{self.object_id}"
+
+
+class Section(models.Model):
+    """
+    One offering (group) of a course in a semester (PRD 2.2 §2.4).
+    
+    A course may be offered in several sections, each with its own
+    instructor, capacity and weekly meeting times (SectionTime).
+    """
+    
+    course = models.ForeignKey(
+        Course,
+        on_delete=models.CASCADE,
+        related_name='sections',
+        help_text=_("Course this section offers")
+    )
+    
+    semester = models.CharField(
+        max_length=10,
+        help_text=_("Semester of the offering (e.g., Spring 1403)")
+    )
+    
+    number = models.CharField(
+        max_length=10,
+        help_text=_("Section number within the course (e.g., 01)")
+    )
+    
+    instructor = models.CharField(
+        max_length=255,
+        blank=True,
+        help_text=_("Instructor name")
+    )
+    
+    capacity = models.IntegerField(
+        null=True,
+        blank=True,
+        help_text=_("Maximum student capacity")
+    )
+    
+    is_offered = models.BooleanField(
+        default=True,
+        help_text=_("Is this section open for selection?")
+    )
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = _("section")
+        verbose_name_plural = _("sections")
+        unique_together = [('course', 'semester', 'number')]
+        ordering = ['course__code', 'number']
+    
+    def __str__(self):
+        return f"{self.course.code}-{self.number} ({self.semester})"
+
+
+class SectionTime(models.Model):
+    """
+    One weekly meeting of a section.
+    """
+    
+    section = models.ForeignKey(
+        Section,
+        on_delete=models.CASCADE,
+        related_name='times',
+        help_text=_("Section that meets at this time")
+    )
+    
+    day_of_week = models.CharField(
+        max_length=20,
+        help_text=_("Day of week (Sat, Sun, Mon, Tue, Wed, Thu)")
+    )
+    
+    start_time = models.TimeField(
+        help_text=_("Start time")
+    )
+    
+    end_time = models.TimeField(
+        help_text=_("End time")
+    )
+    
+    location = models.CharField(
+        max_length=255,
+        blank=True,
+        help_text=_("Class location/room")
+    )
+    
+    # day_of_week/start_time/end_time as minutes since Saturday 00:00,
+    # maintained by save() (see courses.weektime)
+    week_start_minute = models.IntegerField(
+        null=True,
+        blank=True,
+        editable=False,
+        help_text=_("Start of the weekly slot in minutes since Saturday 00:00")
+    )
+    
+    week_end_minute = models.IntegerField(
+        null=True,
+        blank=True,
+        editable=False,
+        help_text=_("End of the weekly slot in minutes since Saturday 00:00")
+    )
+    
+    class Meta:
+        verbose_name = _("section time")
+        verbose_name_plural = _("section times")
+        ordering = ['week_start_minute']
+        indexes = [
+            models.Index(fields=['location', 'week_start_minute']),
+        ]
+    
+    def __str__(self):
+        return f"{self.section} {self.day_of_week} {self.start_time}-{self.end_time}"
+    
+    def save(self, *args, **kwargs):
+        self.week_start_minute, self.week_end_minute = week_interval(
+            self.day_of_week, self.start_time, self.end_time
+        )
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'day_of_week', 'start_time', 'end_time'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'week_start_minute', 'week_end_minute'}
+        super().save(*args, **kwargs)
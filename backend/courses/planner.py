@@ -0,0 +1,362 @@
+"""
+Multi-semester graduation planner.
+
+Builds a semester-by-semester plan from a student's passed courses to the end
+of a ChartSchema. Every mandatory course node has to be taken, and every
+mandatory elective slot needs one course of its group. A course can be
+planned in a semester once its hard prerequisites were passed in earlier
+semesters and the units passed so far reach its
+CourseRequirement.min_passed_units; each semester is capped at a number of
+credits.
+
+The search is a depth-first branch and bound over bitsets of planned items.
+The first descent is the greedy plan (deepest prerequisite chains first), so
+there is always a best-so-far answer; alternative fillings of each semester
+are then explored while a lower bound (remaining credits over the cap, the
+longest remaining chain) can still beat it. States already reached in as few
+semesters are memoized and skipped. When the wall-clock budget runs out the
+best plan found so far is returned.
+"""
+
+import time
+from collections import deque
+from typing import Dict, Iterable, List, Optional
+
+from courses.graph import PrerequisiteGraph, iter_bits
+from courses.models import ChartNode, CourseRequirement
+
+DEFAULT_CREDIT_CAP = 20
+DEFAULT_BUDGET_SECONDS = 0.5
+
+# Alternative fillings tried per semester besides the greedy one.
+BRANCH_WIDTH = 3
+
+
+class GraduationPlanner:
+    """
+    Plans the remaining semesters of a chart schema for one student.
+
+    Usage:
+        planner = GraduationPlanner(schema, passed_course_ids, passed_units=42)
+        result = planner.plan(start_semester=4)
+    """
+
+    def __init__(
+        self,
+        schema,
+        passed_course_ids: Iterable[int],
+        passed_units: Optional[int] = None,
+        credit_cap: int = DEFAULT_CREDIT_CAP,
+    ):
+        self.schema = schema
+        self.passed = set(passed_course_ids)
+        self.credit_cap = credit_cap
+
+        self.graph = PrerequisiteGraph.load_for_schema(schema)
+        self._passed_mask = self.graph.encode(self.passed)
+        nodes = list(
+            ChartNode.objects.filter(schema=schema, is_mandatory=True)
+            .select_related('course', 'course_group')
+            .prefetch_related('course_group__courses')
+            .order_by('semester', 'position')
+        )
+        courses, elective_ids, unsatisfied_groups = self._select_courses(nodes)
+
+        if passed_units is None:
+            passed_units = sum(
+                course.credits for course in self.graph.courses if course.id in self.passed
+            )
+        self.passed_units = passed_units
+
+        min_units: Dict[int, int] = {}
+        for course_id, units in CourseRequirement.objects.filter(
+            course_id__in=list(courses)
+        ).values_list('course_id', 'min_passed_units'):
+            min_units[course_id] = max(units, min_units.get(course_id, 0))
+
+        self._build_items(courses, elective_ids, min_units)
+        self.unschedulable += [
+            {'course_group': group.code, 'name': group.name} for group in unsatisfied_groups
+        ]
+
+    # ------------------------------------------------------------------
+    # Item selection
+    # ------------------------------------------------------------------
+
+    def _missing_prerequisites(self, course_id: int) -> int:
+        node = self.graph.index[course_id]
+        return bin(self.graph.prerequisite_masks[node] & ~self._passed_mask).count('1')
+
+    def _select_courses(self, nodes: List[ChartNode]) -> tuple:
+        """
+        Pick the courses still to be taken: unpassed course nodes, one course
+        per unfilled elective slot (the member closest to being eligible) and
+        any unpassed prerequisite of those that belongs to the schema.
+        """
+        graph = self.graph
+        known = {course.id: course for course in graph.courses}
+        planned: Dict[int, object] = {}
+        for node in nodes:
+            if node.course_id and node.course_id not in self.passed:
+                planned.setdefault(node.course_id, node.course)
+
+        elective_ids = set()
+        used_passed = set()
+        unsatisfied = []
+        for node in nodes:
+            if node.course_id or not node.course_group_id:
+                continue
+            members = sorted(node.course_group.courses.all(), key=lambda course: course.id)
+            done = next(
+                (m for m in members if m.id in self.passed and m.id not in used_passed),
+                None,
+            )
+            if done is not None:
+                used_passed.add(done.id)
+                continue
+            candidates = [
+                m for m in members if m.id not in self.passed and m.id not in planned
+            ]
+            if not candidates:
+                unsatisfied.append(node.course_group)
+                continue
+            choice = min(
+                candidates,
+                key=lambda m: (self._missing_prerequisites(m.id), m.credits, m.id),
+            )
+            planned[choice.id] = choice
+            elective_ids.add(choice.id)
+
+        stack = list(planned)
+        while stack:
+            course_id = stack.pop()
+            for prereq in graph.prerequisites_of(graph.index[course_id]):
+                prereq_id = graph.course_ids[prereq]
+                if prereq_id in self.passed or prereq_id in planned or prereq_id not in known:
+                    continue
+                planned[prereq_id] = known[prereq_id]
+                stack.append(prereq_id)
+
+        return planned, elective_ids, unsatisfied
+
+    def _build_items(self, courses: Dict[int, object], elective_ids, min_units) -> None:
+        """
+        Index the selected courses as bits and drop the ones that can never be
+        planned: prerequisites outside the schema, unreachable unit
+        requirements, prerequisite cycles, and everything behind those.
+        """
+        graph = self.graph
+        prereq_ids = {
+            course_id: [
+                graph.course_ids[p]
+                for p in graph.prerequisites_of(graph.index[course_id])
+                if graph.course_ids[p] not in self.passed
+            ]
+            for course_id in courses
+        }
+
+        blocked = set()
+        while True:
+            alive = [cid for cid in courses if cid not in blocked]
+            reachable_units = self.passed_units + sum(courses[cid].credits for cid in alive)
+            newly = {
+                cid for cid in alive
+                if any(p not in courses or p in blocked for p in prereq_ids[cid])
+                or min_units.get(cid, 0) > reachable_units - courses[cid].credits
+            }
+            if newly:
+                blocked |= newly
+                continue
+
+            index = {cid: i for i, cid in enumerate(alive)}
+            prereq_masks = [0] * len(alive)
+            dependents: List[List[int]] = [[] for _ in alive]
+            for cid in alive:
+                for prereq_id in prereq_ids[cid]:
+                    prereq_masks[index[cid]] |= 1 << index[prereq_id]
+                    dependents[index[prereq_id]].append(index[cid])
+
+            # Kahn order over the planned items; items left out of it sit on
+            # a prerequisite cycle and are dropped with their dependents.
+            indegree = [bin(mask).count('1') for mask in prereq_masks]
+            queue = deque(i for i, degree in enumerate(indegree) if degree == 0)
+            order = []
+            while queue:
+                item = queue.popleft()
+                order.append(item)
+                for dependent in dependents[item]:
+                    indegree[dependent] -= 1
+                    if indegree[dependent] == 0:
+                        queue.append(dependent)
+            if len(order) == len(alive):
+                break
+            ordered = set(order)
+            blocked.update(cid for i, cid in enumerate(alive) if i not in ordered)
+
+        # Longest chain of planned dependents hanging off each item.
+        depth = [0] * len(alive)
+        for item in reversed(order):
+            depth[item] = max((depth[d] + 1 for d in dependents[item]), default=0)
+
+        self.items = [courses[cid] for cid in alive]
+        self.item_elective = [cid in elective_ids for cid in alive]
+        self.item_credits = [course.credits for course in self.items]
+        self.item_min_units = [min_units.get(cid, 0) for cid in alive]
+        self.item_prereqs = prereq_masks
+        self.item_depth = depth
+        self.item_dependents = [len(d) for d in dependents]
+        self.goal = (1 << len(alive)) - 1
+        self.unschedulable = [self._describe(courses[cid]) for cid in courses if cid in blocked]
+
+    @staticmethod
+    def _describe(course) -> dict:
+        return {'id': course.id, 'code': course.code, 'name': course.name}
+
+    # ------------------------------------------------------------------
+    # Search
+    # ------------------------------------------------------------------
+
+    def _credits_of(self, mask: int) -> int:
+        return sum(self.item_credits[i] for i in iter_bits(mask))
+
+    def lower_bound(self, done: int) -> int:
+        """Semesters still needed from a state, never an overestimate."""
+        remaining = self.goal & ~done
+        if not remaining:
+            return 0
+        credits = self._credits_of(remaining)
+        by_credits = -(-credits // self.credit_cap)
+        by_chain = max(self.item_depth[i] for i in iter_bits(remaining)) + 1
+        return max(by_credits, by_chain)
+
+    def _available(self, done: int, units: int) -> List[int]:
+        prereqs = self.item_prereqs
+        min_units = self.item_min_units
+        return [
+            i for i in iter_bits(self.goal & ~done)
+            if prereqs[i] & ~done == 0 and min_units[i] <= units
+        ]
+
+    def _fill(self, ordered: List[int], excluded: int = 0) -> int:
+        """First-fit packing of items in priority order under the credit cap."""
+        taken = 0
+        used = 0
+        for i in ordered:
+            if excluded >> i & 1:
+                continue
+            credits = self.item_credits[i]
+            # A course heavier than the cap is allowed alone in a semester.
+            if used + credits <= self.credit_cap or used == 0:
+                taken |= 1 << i
+                used += credits
+        return taken
+
+    def _fillings(self, available: List[int]) -> List[int]:
+        """
+        The greedy semester (longest remaining chain, most dependents, most
+        credits first) followed by variants that leave out one of its
+        lowest-priority picks so something else can take the room.
+        """
+        ordered = sorted(
+            available,
+            key=lambda i: (-self.item_depth[i], -self.item_dependents[i], -self.item_credits[i], i),
+        )
+        greedy = self._fill(ordered)
+        fillings = [greedy]
+        picks = [i for i in ordered if greedy >> i & 1]
+        for i in reversed(picks):
+            if len(fillings) > BRANCH_WIDTH:
+                break
+            variant = self._fill(ordered, excluded=1 << i)
+            if variant and variant not in fillings:
+                fillings.append(variant)
+        return fillings
+
+    def plan(
+        self,
+        start_semester: int = 1,
+        budget_seconds: float = DEFAULT_BUDGET_SECONDS,
+    ) -> dict:
+        """
+        Search for the plan with the fewest semesters.
+
+        Returns:
+            Dictionary with the semesters (courses and credits each), the
+            number of semesters, the initial lower bound, whether the plan is
+            proven optimal and whether the budget ran out.
+        """
+        started = time.perf_counter()
+        deadline = started + budget_seconds
+        bound = self.lower_bound(0)
+        best: List[int] = []
+        best_length = [None]
+        seen: Dict[int, int] = {}
+        timed_out = [False]
+        descended = [False]
+
+        def visit(done: int, units: int, semesters: List[int]) -> None:
+            if done == self.goal:
+                descended[0] = True
+                if best_length[0] is None or len(semesters) < best_length[0]:
+                    best[:] = semesters
+                    best_length[0] = len(semesters)
+                return
+            if (
+                best_length[0] is not None
+                and len(semesters) + self.lower_bound(done) >= best_length[0]
+            ):
+                return
+            if seen.get(done, len(semesters) + 1) <= len(semesters):
+                return
+            seen[done] = len(semesters)
+            # The greedy descent always runs to completion so that there is
+            # a plan to fall back on.
+            if descended[0] and time.perf_counter() > deadline:
+                timed_out[0] = True
+                return
+
+            available = self._available(done, units)
+            if not available:
+                # Unit requirements that can only be met by passing the
+                # course's own dependents first.
+                descended[0] = True
+                return
+            for taken in self._fillings(available):
+                semesters.append(taken)
+                visit(done | taken, units + self._credits_of(taken), semesters)
+                semesters.pop()
+                if timed_out[0] or best_length[0] == bound:
+                    return
+
+        visit(0, self.passed_units, [])
+        unschedulable = list(self.unschedulable)
+        if best_length[0] is None:
+            unschedulable += [self._describe(course) for course in self.items]
+
+        schedule = []
+        for offset, taken in enumerate(best):
+            courses = [
+                dict(self._describe(self.items[i]),
+                     credits=self.item_credits[i],
+                     is_elective=self.item_elective[i])
+                for i in iter_bits(taken)
+            ]
+            courses.sort(key=lambda course: course['code'])
+            schedule.append({
+                'semester': start_semester + offset,
+                'credits': sum(course['credits'] for course in courses),
+                'courses': courses,
+            })
+
+        return {
+            'schema_id': self.schema.id,
+            'credit_cap': self.credit_cap,
+            'total_semesters': len(schedule),
+            'remaining_credits': sum(self.item_credits),
+            'lower_bound': bound,
+            'optimal': best_length[0] is not None and len(schedule) == bound,
+            'timed_out': timed_out[0],
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 2),
+            'semesters': schedule,
+            'unschedulable': unschedulable,
+        }
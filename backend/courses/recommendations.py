@@ -8,11 +8,17 @@ Course Recommendation Engine
 4. بررسی دورهای وابستگی (Cycle Detection)
 """
 
-from typing import List, Dict, Set, Tuple
-from django.db.models import Count, Q
-from courses.models import Course, Prerequisite, ChartCourse
+import heapq
+import itertools
+from typing import List, Dict, Tuple
+from courses.models import Course, Prerequisite
+from courses.graph import PrerequisiteGraph, find_prerequisite_cycles, iter_bits
+from courses.cache import get_cache, recommendation_cache_key
 from students.models import StudentCourseHistory, StudentSelection
 
+# بیشترین تعداد توصیه برای هر دانشجو در محاسبه گروهی
+MAX_COHORT_LIMIT = 50
+
 
 class RecommendationEngine:
     """
@@ -29,8 +35,15 @@ class RecommendationEngine:
     def __init__(self, student, degree_chart):
         self.student = student
         self.degree_chart = degree_chart
-        self._dependency_cache = {}
-        self._visited = set()
+        self._graph = None
+        self._payloads = {}
+    
+    @property
+    def graph(self) -> PrerequisiteGraph:
+        """گراف پیش‌نیازهای نمودار درجات (یک بار برای هر موتور بارگذاری می‌شود)"""
+        if self._graph is None:
+            self._graph = PrerequisiteGraph.load(self.degree_chart)
+        return self._graph
     
     def get_recommendations(self, semester: str, limit: int = 10) -> List[Dict]:
         """
@@ -42,122 +55,140 @@ class RecommendationEngine:
         
         Returns:
             لیستی از دروس توصیه‌شده با امتیازات
-        """
         
-        # 1. دریافت دروسی که دانشجو قبلاً پاس کرده است
-        passed_courses = self._get_passed_courses()
-        
-        # 2. دریافت دروسی که انتخاب کرده است
-        selected_courses = self._get_selected_courses(semester)
+        نتیجه تا زمانی که سابقه/انتخاب‌های دانشجو یا گراف نمودار تغییر
+        نکرده از cache خوانده می‌شود (courses.cache).
+        """
         
-        # 3. دریافت دروس شروع (بدون پیش‌نیاز)
-        available_courses = self._get_available_courses(
-            passed_courses,
-            selected_courses
+        cache = get_cache()
+        cache_key = recommendation_cache_key(
+            self.student.id, self.degree_chart.id, semester, limit
         )
+        recommendations = cache.get(cache_key)
+        if recommendations is not None:
+            return recommendations
         
-        # 4. محاسبه امتیاز برای هر درس
-        scored_courses = []
-        for course in available_courses:
-            score = self._calculate_importance_score(course, available_courses)
-            scored_courses.append({
-                'course': course,
-                'score': score,
-                'importance': course.chartcourse_set.filter(
-                    degree_chart=self.degree_chart
-                ).first().importance_score if hasattr(course, 'chartcourse_set') else 0
-            })
+        # 1. دریافت دروسی که دانشجو قبلاً پاس کرده است (به صورت bitset)
+        passed_mask = self._get_passed_courses()
         
-        # 5. مرتب‌سازی بر اساس امتیاز
-        scored_courses.sort(
-            key=lambda x: (-x['score'], -x['importance']),
-            reverse=False
-        )
-        
-        # 6. برگرداندن نتایج محدود
-        recommendations = []
-        for item in scored_courses[:limit]:
-            recommendations.append({
-                'id': item['course'].id,
-                'code': item['course'].code,
-                'name': item['course'].name,
-                'credits': item['course'].credits,
-                'unit_type': item['course'].unit_type,
-                'instructor': item['course'].instructor,
-                'importance_score': item['score'],
-                'description': item['course'].description,
-                'start_time': str(item['course'].start_time) if item['course'].start_time else None,
-                'end_time': str(item['course'].end_time) if item['course'].end_time else None,
-            })
+        # 2. دریافت دروسی که انتخاب کرده است (به صورت bitset)
+        selected_mask = self._get_selected_courses(semester)
         
+        recommendations = self.recommend_from_masks(passed_mask, selected_mask, limit)
+        cache.set(cache_key, recommendations)
         return recommendations
     
-    def _get_passed_courses(self) -> Set[int]:
-        """دریافت شناسه‌های دروسی که دانشجو پاس کرده است"""
-        passed = StudentCourseHistory.objects.filter(
-            student=self.student,
-            is_passed=True
-        ).values_list('course_id', flat=True)
-        return set(passed)
-    
-    def _get_selected_courses(self, semester: str) -> Set[int]:
-        """دریافت شناسه‌های دروسی که دانشجو برای ترم انتخاب کرده است"""
-        selected = StudentSelection.objects.filter(
-            student=self.student,
-            semester=semester
-        ).values_list('course_id', flat=True)
-        return set(selected)
-    
-    def _get_available_courses(
+    def recommend_from_masks(
         self,
-        passed_courses: Set[int],
-        selected_courses: Set[int]
-    ) -> List[Course]:
+        passed_mask: int,
+        selected_mask: int,
+        limit: int = 10
+    ) -> List[Dict]:
         """
-        دریافت دروسی که دانشجو می‌تواند انتخاب کند
-        (پیش‌نیازهای آن پاس شده‌اند و انتخاب نشده‌اند)
+        رتبه‌بندی دروس از روی bitset دروس پاس‌شده و انتخاب‌شده.
+        
+        هیچ کوئری‌ای اجرا نمی‌شود (به جز بارگذاری اولیه گراف)، بنابراین
+        برای محاسبه دسته‌ای توصیه‌ها (recommend_for_cohort) هم استفاده می‌شود.
         """
         
-        # دریافت تمام دروسی که در این نمودار درجات هستند
-        chart_courses = ChartCourse.objects.filter(
-            degree_chart=self.degree_chart
-        ).values_list('course_id', flat=True)
+        # 3-5. دروس قابل انتخاب و انتخاب k درس برتر با heap محدود
+        # (بدون مرتب‌سازی کامل و بدون ساخت خروجی برای دروس حذف‌شده)
+        keys = self._ranking_keys(passed_mask, selected_mask)
+        winners = heapq.nsmallest(limit, keys)
         
-        available = []
+        # 6. ساخت خروجی فقط برای دروس برنده
+        return [
+            self._course_payload(node)
+            for *_key, node in winners
+        ]
+    
+    def iter_recommendations(self, passed_mask: int, selected_mask: int):
+        """
+        تولید تدریجی دروس به ترتیب رتبه (برای خروجی stream).
         
-        for course_id in chart_courses:
-            # اگر قبلاً انتخاب شده، نادیده بگیر
-            if course_id in selected_courses:
-                continue
-            
-            course = Course.objects.get(id=course_id)
-            
-            # بررسی پیش‌نیازها
-            if self._check_prerequisites(course, passed_courses):
-                available.append(course)
+        heap یک بار ساخته می‌شود و هر درس فقط هنگام مصرف pop و ساخته می‌شود،
+        بنابراین کلاینتی که فقط چند صفحه اول را می‌خواند هزینه مرتب‌سازی
+        کامل را نمی‌پردازد.
+        """
+        keys = self._ranking_keys(passed_mask, selected_mask)
+        heapq.heapify(keys)
+        while keys:
+            *_key, node = heapq.heappop(keys)
+            yield self._course_payload(node)
+    
+    def _ranking_keys(self, passed_mask: int, selected_mask: int) -> List[Tuple]:
+        """
+        کلید رتبه‌بندی هر درس قابل انتخاب:
+        (-امتیاز، -عمق مسیر بحرانی، -وابسته‌های مستقیم، اندیس)
         
-        return available
+        عمق مسیر بحرانی طول طولانی‌ترین زنجیره پیش‌نیازی بعد از درس است؛
+        تأخیر در چنین درسی فارغ‌التحصیلی را عقب می‌اندازد.
+        اندیس گره ترتیب نمودار را در حالت تساوی حفظ می‌کند.
+        """
+        graph = self.graph
+        importance = graph.importance
+        critical_depth = graph.critical_depth
+        eligible = graph.eligible_mask(passed_mask, excluded_mask=selected_mask)
+        return [
+            (-importance[node], -critical_depth[node], -graph.dependent_count(node), node)
+            for node in iter_bits(eligible)
+        ]
     
-    def _check_prerequisites(
-        self,
-        course: Course,
-        passed_courses: Set[int]
-    ) -> bool:
+    def stream_recommendations(self, semester: str, limit: int = None):
         """
-        بررسی اینکه دانشجو پیش‌نیازهای یک درس را پاس کرده است
+        توصیه‌ها به ترتیب رتبه به صورت generator (بدون cache).
+        اگر limit داده نشود همه دروس قابل انتخاب تولید می‌شوند.
         """
-        prerequisites = Prerequisite.objects.filter(course=course)
-        
-        for prereq in prerequisites:
-            # اگر corequisite است، اگر فعلاً انجام شود قابل قبول است
-            if prereq.is_corequisite:
-                continue
-            
-            # پیش‌نیاز باید پاس شده باشد
-            if prereq.prerequisite_course_id not in passed_courses:
-                return False
-        
-        return True
+        passed_mask = self._get_passed_courses()
+        selected_mask = self._get_selected_courses(semester)
+        ranked = self.iter_recommendations(passed_mask, selected_mask)
+        return itertools.islice(ranked, limit) if limit is not None else ranked
+    
+    def _course_payload(self, node: int) -> Dict:
+        """خروجی یک درس توصیه‌شده (برای هر درس یک بار ساخته می‌شود)"""
+        payload = self._payloads.get(node)
+        if payload is None:
+            graph = self.graph
+            course = graph.courses[node]
+            payload = {
+                'id': course.id,
+                'code': course.code,
+                'name': course.name,
+                'credits': course.credits,
+                'unit_type': course.unit_type,
+                'instructor': course.instructor,
+                'importance_score': int(graph.importance[node]),
+                'critical_path_depth': graph.critical_depth[node],
+                # The snapshot holds every edge touching a chart course, so
+                # this matches UnlocksIndex.direct without another lookup
+                'unlocks': sorted(graph.course_ids[dep] for dep in graph.dependents_of(node)),
+                'description': course.description,
+                'start_time': str(course.start_time) if course.start_time else None,
+                'end_time': str(course.end_time) if course.end_time else None,
+            }
+            self._payloads[node] = payload
+        return payload
+    
+    def _get_passed_courses(self) -> int:
+        """
+        دریافت دروسی که دانشجو پاس کرده است
+
+        Returns:
+            bitset روی اندیس‌های گراف (بیت i یعنی درس graph.course_ids[i] پاس شده)
+        """
+        passed = StudentCourseHistory.objects.filter(
+            student=self.student,
+            is_passed=True
+        ).values_list('course_id', flat=True)
+        return self.graph.encode(passed)
+    
+    def _get_selected_courses(self, semester: str) -> int:
+        """دریافت دروسی که دانشجو برای ترم انتخاب کرده است (bitset روی اندیس‌های گراف)"""
+        selected = StudentSelection.objects.filter(
+            student=self.student,
+            semester=semester
+        ).values_list('course_id', flat=True)
+        return self.graph.encode(selected)
     
     def _calculate_importance_score(
         self,
@@ -167,93 +198,101 @@ class RecommendationEngine:
         """
         محاسبه امتیاز اهمیت یک درس
         
-        Score = تعداد دروسی که این درس پیش‌نیاز آن‌ها هستند
+        Score = تعداد دروس نمودار که بطور مستقیم یا غیرمستقیم به این درس وابسته‌اند
         
         منطق:
         - هر درسی که بیشتر دروس دیگر به آن وابسته‌اند، اهمیت بیشتری دارد
         - دروسی که پایه‌ای‌تر هستند (بیشتر دروس به آن‌ها بستگی دارند) پیشنهاد داده می‌شوند
-        """
-        
-        # تعداد دروسی که این درس برای آن‌ها پیش‌نیاز است
-        direct_dependents = Prerequisite.objects.filter(
-            prerequisite_course=course,
-            is_corequisite=False
-        ).count()
-        
-        # تعداد دروسی که بطور غیرمستقیم به این درس وابسته‌اند
-        indirect_dependents = self._count_indirect_dependents(course, available_courses)
-        
-        # امتیاز نهایی: مستقیم + غیرمستقیم
-        return direct_dependents + indirect_dependents
-    
-    def _count_indirect_dependents(
-        self,
-        course: Course,
-        available_courses: List[Course]
-    ) -> int:
-        """
-        محاسبه تعداد دروسی که بطور غیرمستقیم به یک درس وابسته‌اند
         
-        مثال:
-        اگر A → B → C
-        C برای B پیش‌نیاز است
-        B برای A پیش‌نیاز است
-        درنتیجه A به C وابسته است (غیرمستقیم)
+        این عدد از قبل در ChartCourse.importance_score ذخیره شده است
+        (courses.importance) و اینجا فقط خوانده می‌شود.
         """
+        graph = self.graph
+        node = graph.index.get(course.id)
+        if node is None or node >= graph.chart_size:
+            return 0
         
-        # از حداقل 1 استفاده کن تا از دروسی که پایه‌ای نیستند اجتناب شود
-        count = 0
-        available_ids = {c.id for c in available_courses}
-        
-        # دروسی که مستقیماً به این درس وابسته‌اند
-        direct = Prerequisite.objects.filter(
-            prerequisite_course=course,
-            is_corequisite=False
-        ).values_list('course_id', flat=True)
-        
-        for dependent_id in direct:
-            if dependent_id in available_ids:
-                count += 1
-        
-        return count
+        return int(graph.importance[node])
     
     def detect_circular_dependencies(self) -> List[Tuple[int, int]]:
         """
         تشخیص دورهای وابستگی در سیستم
         
+        همه یال‌ها با یک کوئری خوانده می‌شوند و با الگوریتم Tarjan (مؤلفه‌های
+        قویاً همبند) تمام دورها گزارش می‌شوند، نه فقط اولین دور هر مؤلفه.
+        
         Returns:
             لیستی از (course_id, prerequisite_id) هایی که دور تشکیل می‌دهند
         """
+        cycle_of = {}
+        for group_number, group in enumerate(find_prerequisite_cycles()):
+            for course in group:
+                cycle_of[course['id']] = group_number
         
-        cycles = []
-        visited = set()
-        rec_stack = set()
+        if not cycle_of:
+            return []
         
-        def dfs(node: int, path: Set[int]) -> bool:
-            visited.add(node)
-            path.add(node)
-            
-            # دریافت دروسی که این درس برای آن‌ها پیش‌نیاز است
-            dependents = Prerequisite.objects.filter(
-                prerequisite_course_id=node,
-                is_corequisite=False
-            ).values_list('course_id', flat=True)
-            
-            for dependent in dependents:
-                if dependent not in visited:
-                    if dfs(dependent, path):
-                        return True
-                elif dependent in path:
-                    # دور پیدا شد
-                    cycles.append((node, dependent))
-                    return True
-            
-            path.remove(node)
-            return False
+        edges = Prerequisite.objects.filter(
+            is_corequisite=False,
+            course_id__in=cycle_of
+        ).values_list('course_id', 'prerequisite_course_id')
         
-        # شروع DFS از هر درس
-        for course in Course.objects.all():
-            if course.id not in visited:
-                dfs(course.id, set())
-        
-        return cycles
+        return [
+            (course_id, prereq_id)
+            for course_id, prereq_id in edges
+            if cycle_of.get(prereq_id) == cycle_of[course_id]
+        ]
+
+
+def recommend_for_cohort(
+    degree_chart,
+    students,
+    semester: str,
+    limit: int = 10
+) -> Dict[int, List[Dict]]:
+    """
+    محاسبه توصیه‌ها برای گروهی از دانشجویان یک نمودار درجات.
+    
+    گراف یک بار بارگذاری می‌شود و سابقه و انتخاب‌های همه دانشجویان هر کدام
+    با یک کوئری خوانده می‌شوند؛ سپس برای هر دانشجو فقط یک ارزیابی bitset
+    انجام می‌شود.
+    
+    Args:
+        students: QuerySet کاربران دانشجو (به صورت subquery استفاده می‌شود)
+    
+    Returns:
+        دیکشنری student_id -> لیست توصیه‌ها
+    """
+    engine = RecommendationEngine(None, degree_chart)
+    graph = engine.graph
+    student_ids = list(students.values_list('id', flat=True))
+    cohort = students.values('id')
+    
+    passed_masks = dict.fromkeys(student_ids, 0)
+    history = StudentCourseHistory.objects.filter(
+        student__in=cohort,
+        is_passed=True
+    ).values_list('student_id', 'course_id')
+    for student_id, course_id in history:
+        node = graph.index.get(course_id)
+        if node is not None:
+            passed_masks[student_id] |= 1 << node
+    
+    selected_masks = dict.fromkeys(student_ids, 0)
+    selections = StudentSelection.objects.filter(
+        student__in=cohort,
+        semester=semester
+    ).values_list('student_id', 'course_id')
+    for student_id, course_id in selections:
+        node = graph.index.get(course_id)
+        if node is not None:
+            selected_masks[student_id] |= 1 << node
+    
+    return {
+        student_id: engine.recommend_from_masks(
+            passed_masks[student_id],
+            selected_masks[student_id],
+            limit
+        )
+        for student_id in student_ids
+    }
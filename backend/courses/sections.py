@@ -0,0 +1,148 @@
+"""
+Section time clash checks for course selection (PRD 2.2 §2.4, FR-BL-03).
+
+All meeting times of a semester's sections are loaded once per process,
+as minute-of-week intervals (courses.weektime) per section, so the
+selection screen can ask whether any candidate section clashes with a
+student's picks without a query per candidate. Only the picked sections'
+slots go into a static interval tree, so a check costs what the cart holds,
+not how crowded the candidate's time slot is. The index is rebuilt when the
+semester's section version changes, which the Section and SectionTime
+signals bump (see courses.signals).
+
+Overlap follows Schedule.has_conflict: two slots clash unless one ends at
+or before the other starts.
+"""
+
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from courses.cache import section_times_version
+from courses.models import SectionTime
+
+
+class IntervalTree:
+    """
+    Static augmented interval tree.
+
+    The intervals are sorted by start and read as an implicit balanced
+    binary search tree (the middle of every range is its root); each root
+    stores the largest end in its subtree. A query skips every subtree
+    that ends before it starts and every right subtree that starts after it
+    ends, so it costs O(log n + k) for k hits.
+    """
+
+    def __init__(self, intervals: Iterable[Tuple[int, int, object]]):
+        items = sorted(intervals, key=lambda item: (item[0], item[1]))
+        self._starts = [item[0] for item in items]
+        self._ends = [item[1] for item in items]
+        self._values = [item[2] for item in items]
+        self._max_end = list(self._ends)
+        self._fill_max_end(0, len(items))
+
+    def _fill_max_end(self, lo: int, hi: int) -> int:
+        if lo >= hi:
+            return -1
+        mid = (lo + hi) // 2
+        self._max_end[mid] = max(
+            self._ends[mid],
+            self._fill_max_end(lo, mid),
+            self._fill_max_end(mid + 1, hi),
+        )
+        return self._max_end[mid]
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def overlapping(self, start: int, end: int) -> List[object]:
+        """Values of the intervals that overlap [start, end)."""
+        found = []
+        ranges = [(0, len(self._starts))]
+        while ranges:
+            lo, hi = ranges.pop()
+            if lo >= hi:
+                continue
+            mid = (lo + hi) // 2
+            if self._max_end[mid] <= start:
+                continue
+            ranges.append((lo, mid))
+            if self._starts[mid] < end:
+                if self._ends[mid] > start:
+                    found.append(self._values[mid])
+                ranges.append((mid + 1, hi))
+        return found
+
+
+class SectionTimeIndex:
+    """Meeting times of every section of one semester."""
+
+    def __init__(self, semester: str):
+        self.semester = semester
+        self.times: Dict[int, List[Tuple[int, int]]] = {}
+        self.course_of: Dict[int, int] = {}
+        rows = SectionTime.objects.filter(
+            section__semester=semester,
+            week_start_minute__isnull=False,
+        ).values_list('section_id', 'section__course_id', 'week_start_minute', 'week_end_minute')
+        for section_id, course_id, start, end in rows:
+            self.times.setdefault(section_id, []).append((start, end))
+            self.course_of[section_id] = course_id
+
+    def picked_tree(self, picked_section_ids: Iterable[int]) -> IntervalTree:
+        """An interval tree over the meeting times of a student's picked sections."""
+        return IntervalTree(
+            (start, end, section_id)
+            for section_id in set(picked_section_ids)
+            for start, end in self.times.get(section_id, ())
+        )
+
+    def clashing_sections(self, section_id: int, picked) -> List[int]:
+        """
+        The picked sections a section clashes with. Sections of its own
+        course are ignored, since choosing it replaces them.
+
+        Args:
+            picked: Picked section IDs, or their picked_tree() when several
+                sections are checked against the same picks
+        """
+        if not isinstance(picked, IntervalTree):
+            picked = self.picked_tree(picked)
+        course_id = self.course_of.get(section_id)
+        clashes = set()
+        for start, end in self.times.get(section_id, ()):
+            for other in picked.overlapping(start, end):
+                if other != section_id and self.course_of[other] != course_id:
+                    clashes.add(other)
+        return sorted(clashes)
+
+    def clashes_with_intervals(self, section_id: int, intervals: Iterable[Tuple[int, int]]) -> bool:
+        """Whether a section meets during any of a few other weekly slots."""
+        intervals = list(intervals)
+        return any(
+            start < other_end and other_start < end
+            for start, end in self.times.get(section_id, ())
+            for other_start, other_end in intervals
+        )
+
+
+_indexes: Dict[str, Tuple[object, SectionTimeIndex]] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_section_index(semester: str) -> SectionTimeIndex:
+    """The process-wide index of a semester, rebuilt if its sections changed."""
+    version = section_times_version(semester)
+    cached: Optional[Tuple[object, SectionTimeIndex]] = _indexes.get(semester)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    with _indexes_lock:
+        cached = _indexes.get(semester)
+        if cached is None or cached[0] != version:
+            cached = (version, SectionTimeIndex(semester))
+            _indexes[semester] = cached
+        return cached[1]
+
+
+def invalidate_section_index(semester: str) -> None:
+    """Drop this process's index of a semester; the next lookup reloads it."""
+    _indexes.pop(semester, None)
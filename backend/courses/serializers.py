@@ -1,5 +1,6 @@
 from rest_framework import serializers
-from .models import DegreeChart, Course, ChartCourse, Prerequisite, CoRequisite
+from .models import DegreeChart, Course, ChartCourse, Prerequisite, CoRequisite, Section, SectionTime
+from .unlocks import get_unlocks_index
 
 
 class CourseSerializer(serializers.ModelSerializer):
@@ -55,9 +56,13 @@ class CourseDetailSerializer(CourseSerializer):
     """
     prerequisites = serializers.SerializerMethodField()
     corequisites = serializers.SerializerMethodField()
+    unlocks = serializers.SerializerMethodField()
+    unlocks_transitive = serializers.SerializerMethodField()
     
     class Meta(CourseSerializer.Meta):
-        fields = CourseSerializer.Meta.fields + ('prerequisites', 'corequisites')
+        fields = CourseSerializer.Meta.fields + (
+            'prerequisites', 'corequisites', 'unlocks', 'unlocks_transitive'
+        )
     
     def get_prerequisites(self, obj):
         """Get prerequisites for this course."""
@@ -68,6 +73,44 @@ class CourseDetailSerializer(CourseSerializer):
         """Get co-requisites for this course."""
         corequisites = CoRequisite.objects.filter(course=obj)
         return CoRequisiteSerializer(corequisites, many=True).data
+    
+    def get_unlocks(self, obj):
+        """IDs of the courses that list this course as a prerequisite."""
+        return list(get_unlocks_index().direct(obj.id))
+    
+    def get_unlocks_transitive(self, obj):
+        """IDs of every course that depends on this course through a prerequisite chain."""
+        return list(get_unlocks_index().transitive(obj.id))
+
+
+class SectionTimeSerializer(serializers.ModelSerializer):
+    """
+    Serializer for one weekly meeting of a section.
+    """
+    
+    class Meta:
+        model = SectionTime
+        fields = (
+            'id', 'day_of_week', 'start_time', 'end_time', 'location',
+            'week_start_minute', 'week_end_minute'
+        )
+        read_only_fields = ('id', 'week_start_minute', 'week_end_minute')
+
+
+class SectionSerializer(serializers.ModelSerializer):
+    """
+    Serializer for Section with its meeting times.
+    """
+    course_code = serializers.CharField(source='course.code', read_only=True)
+    times = SectionTimeSerializer(many=True, read_only=True)
+    
+    class Meta:
+        model = Section
+        fields = (
+            'id', 'course', 'course_code', 'semester', 'number', 'instructor',
+            'capacity', 'is_offered', 'times', 'created_at', 'updated_at'
+        )
+        read_only_fields = ('id', 'created_at', 'updated_at')
 
 
 class ChartCourseSerializer(serializers.ModelSerializer):
@@ -81,9 +124,10 @@ class ChartCourseSerializer(serializers.ModelSerializer):
         model = ChartCourse
         fields = (
             'id', 'degree_chart', 'course', 'course_id', 'is_mandatory',
-            'recommended_semester', 'importance_score', 'created_at', 'updated_at'
+            'recommended_semester', 'importance_score', 'critical_path_depth',
+            'created_at', 'updated_at'
         )
-        read_only_fields = ('id', 'importance_score', 'created_at', 'updated_at')
+        read_only_fields = ('id', 'importance_score', 'critical_path_depth', 'created_at', 'updated_at')
 
 
 class DegreeChartSerializer(serializers.ModelSerializer):
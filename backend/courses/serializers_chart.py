@@ -1,58 +1,146 @@
 """
 Serializers for Degree Chart API (PRD 3.1)
+
+ChartSchemaBodySerializer loads everything a chart shows in a fixed number
+of queries (see load_chart_context) and hands the nested serializers
+in-memory maps through the serializer context; used on their own, the
+nested serializers fall back to per-object queries.
 """
 
+from collections import defaultdict
+
 from rest_framework import serializers
-from courses.models import ChartSchema, ChartNode, Course, CourseGroup, CourseRequirement
+from courses.models import ChartSchema, ChartNode, CoRequisite, Course, CourseGroup, Prerequisite
+from courses.unlocks import get_unlocks_index
 
 
 class PrerequisiteSerializer(serializers.ModelSerializer):
     """فقط کد درس پیشنیاز"""
     class Meta:
-        model = CourseRequirement
-        fields = ['prerequisite']
+        model = Prerequisite
+        fields = ['prerequisite_course']
+
+
+def _course_ref(course):
+    return {'id': course.id, 'code': course.code, 'name': course.name}
+
+
+def load_chart_context(schema):
+    """
+    Load the nodes of a schema with everything their serializers need, in
+    four queries: nodes (with course and group), elective group members,
+    hard prerequisites and co-requisites of every shown course.
+
+    Returns:
+        Serializer context with the nodes and per-course lookup maps
+    """
+    nodes = list(
+        ChartNode.objects.filter(schema=schema).select_related(
+            'course', 'course_group'
+        ).order_by('semester', 'position')
+    )
+
+    group_ids = {node.course_group_id for node in nodes if node.course_group_id}
+    group_courses = defaultdict(list)
+    memberships = CourseGroup.courses.through.objects.filter(
+        coursegroup_id__in=group_ids
+    ).select_related('course').order_by('course_id')
+    for membership in memberships:
+        group_courses[membership.coursegroup_id].append(membership.course)
+
+    course_ids = {node.course_id for node in nodes if node.course_id}
+    for courses in group_courses.values():
+        course_ids.update(course.id for course in courses)
+
+    prerequisites = defaultdict(list)
+    for req in Prerequisite.objects.filter(
+        course_id__in=course_ids, is_corequisite=False
+    ).select_related('prerequisite_course').order_by('id'):
+        prerequisites[req.course_id].append(_course_ref(req.prerequisite_course))
+
+    corequisites = defaultdict(list)
+    for coreq in CoRequisite.objects.filter(
+        course_id__in=course_ids
+    ).select_related('corequisite_course').order_by('id'):
+        corequisites[coreq.course_id].append(_course_ref(coreq.corequisite_course))
+
+    return {
+        'chart_nodes': nodes,
+        'group_courses': group_courses,
+        'prerequisites_by_course': prerequisites,
+        'corequisites_by_course': corequisites,
+    }
 
 
 class CourseDetailSerializer(serializers.ModelSerializer):
     """جزئیات درس شامل پیشنیازها"""
+    is_elective = serializers.SerializerMethodField()
     prerequisites = serializers.SerializerMethodField()
     corequisites = serializers.SerializerMethodField()
+    unlocks = serializers.SerializerMethodField()
     
     class Meta:
         model = Course
         fields = [
             'id', 'code', 'name', 'credits', 'semester',
-            'is_elective', 'prerequisites', 'corequisites'
+            'is_elective', 'prerequisites', 'corequisites', 'unlocks'
         ]
     
+    def get_is_elective(self, obj):
+        return not obj.is_mandatory
+    
     def get_prerequisites(self, obj):
         """دریافت کد‌های درس‌های پیشنیاز"""
-        reqs = CourseRequirement.objects.filter(course=obj)
+        preloaded = self.context.get('prerequisites_by_course')
+        if preloaded is not None:
+            return preloaded.get(obj.id, [])
+        reqs = Prerequisite.objects.filter(
+            course=obj, is_corequisite=False
+        ).select_related('prerequisite_course')
         return [
             {
-                'id': req.prerequisite_id,
-                'code': req.prerequisite.code,
-                'name': req.prerequisite.name,
+                'id': req.prerequisite_course_id,
+                'code': req.prerequisite_course.code,
+                'name': req.prerequisite_course.name,
             }
             for req in reqs
         ]
     
     def get_corequisites(self, obj):
         """دریافت کد‌های درس‌های همنیاز"""
-        coreqs = obj.corequisites.all()
+        preloaded = self.context.get('corequisites_by_course')
+        if preloaded is not None:
+            return preloaded.get(obj.id, [])
+        coreqs = CoRequisite.objects.filter(course=obj).select_related('corequisite_course')
         return [
-            {'id': c.id, 'code': c.code, 'name': c.name}
+            {
+                'id': c.corequisite_course_id,
+                'code': c.corequisite_course.code,
+                'name': c.corequisite_course.name,
+            }
             for c in coreqs
         ]
+    
+    def get_unlocks(self, obj):
+        """ID‌های درس‌هایی که این درس پیشنیاز آن‌هاست"""
+        return list(get_unlocks_index().direct(obj.id))
 
 
 class CourseGroupDetailSerializer(serializers.ModelSerializer):
     """گروه درس‌های اختیاری"""
-    courses = CourseDetailSerializer(many=True, read_only=True)
+    courses = serializers.SerializerMethodField()
     
     class Meta:
         model = CourseGroup
         fields = ['id', 'name', 'code', 'courses']
+    
+    def get_courses(self, obj):
+        preloaded = self.context.get('group_courses')
+        if preloaded is not None:
+            courses = preloaded.get(obj.id, [])
+        else:
+            courses = obj.courses.all()
+        return CourseDetailSerializer(courses, many=True, context=self.context).data
 
 
 class ChartNodeSerializer(serializers.ModelSerializer):
@@ -94,11 +182,12 @@ class SemesterSerializer(serializers.Serializer):
         )
 
 
-class ChartSchemaDetailSerializer(serializers.ModelSerializer):
-    """جزئیات کامل چارت شامل تمام ترم‌ها"""
+class ChartSchemaBodySerializer(serializers.ModelSerializer):
+    """
+    چارت و تمام ترم‌های آن، بدون اطلاعات دانشجو.
+    برای همه دانشجویان یک چارت یکسان است و به همین دلیل کش می‌شود.
+    """
     semesters = serializers.SerializerMethodField()
-    passed_courses = serializers.SerializerMethodField()
-    completed_semesters = serializers.SerializerMethodField()
     
     class Meta:
         model = ChartSchema
@@ -106,18 +195,16 @@ class ChartSchemaDetailSerializer(serializers.ModelSerializer):
             'id', 'code', 'name', 'major', 'degree',
             'entry_year_start', 'entry_year_end',
             'total_credits', 'is_active',
-            'semesters', 'passed_courses', 'completed_semesters'
+            'semesters',
         ]
     
     def get_semesters(self, obj):
         """سازماندهی نودها به ترم‌ها"""
         semesters_data = {}
         
-        nodes = ChartNode.objects.filter(schema=obj).select_related(
-            'course', 'course_group'
-        ).order_by('semester', 'position')
+        context = load_chart_context(obj)
         
-        for node in nodes:
+        for node in context['chart_nodes']:
             if node.semester not in semesters_data:
                 semesters_data[node.semester] = []
             semesters_data[node.semester].append(node)
@@ -130,28 +217,31 @@ class ChartSchemaDetailSerializer(serializers.ModelSerializer):
                     'number': sem_num,
                     'nodes': ChartNodeSerializer(
                         semesters_data[sem_num],
-                        many=True
+                        many=True,
+                        context=context
                     ).data
                 })
         
         return result
+
+
+class ChartSchemaDetailSerializer(ChartSchemaBodySerializer):
+    """جزئیات کامل چارت شامل تمام ترم‌ها و وضعیت دانشجو"""
+    passed_courses = serializers.SerializerMethodField()
+    completed_semesters = serializers.SerializerMethodField()
+    
+    class Meta(ChartSchemaBodySerializer.Meta):
+        fields = ChartSchemaBodySerializer.Meta.fields + [
+            'passed_courses', 'completed_semesters'
+        ]
     
     def get_passed_courses(self, obj):
         """لیست ID‌های دروس پاس شده توسط کاربر"""
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            passed = request.user.studentprofile.student_courses.filter(
-                is_passed=True
-            ).values_list('course_id', flat=True)
-            return list(passed)
-        return []
+        return list(self.context.get('passed_courses', []))
     
     def get_completed_semesters(self, obj):
         """تعداد ترم‌های تکمیل شده"""
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return request.user.studentprofile.completed_semesters or 0
-        return 0
+        return self.context.get('completed_semesters', 0)
 
 
 class CourseRecommendationSerializer(serializers.Serializer):
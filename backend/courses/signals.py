@@ -0,0 +1,391 @@
+import threading
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import post_save, post_delete, pre_delete, pre_save, m2m_changed
+from django.dispatch import receiver
+
+from accounts.models import Profile
+from students.models import StudentCourseHistory, StudentSelection
+
+from .models import (
+    CatalogChange, ChartCourse, ChartNode, ChartSchema, CoRequisite, Course, CourseGroup,
+    DegreeChart, Prerequisite, RecommendationSnapshot, Section, SectionTime,
+)
+from .importance import (
+    recompute_importance_scores,
+    recompute_schema_depths,
+    refresh_importance_for_courses,
+)
+from .cache import (
+    bump_catalog_version,
+    bump_chart_body_version,
+    bump_chart_schema_version,
+    bump_graph_version,
+    bump_history_version,
+    bump_section_times_version,
+)
+from .changes import record_changes
+from .unlocks import invalidate_unlocks_index
+from .sections import invalidate_section_index
+from .chart_resolver import (
+    ChartSchemaIndex,
+    invalidate_chart_index,
+    profiles_of_major,
+    refresh_profile_schemas,
+    resolve_chart_schema,
+)
+
+
+def _bump_charts_containing(course_ids):
+    """Invalidate cached recommendations for every chart holding these courses."""
+    chart_ids = ChartCourse.objects.filter(
+        course_id__in=course_ids
+    ).values_list('degree_chart_id', flat=True).distinct()
+    for chart_id in chart_ids:
+        bump_graph_version(chart_id)
+
+
+def _schema_content_changed(schema_ids):
+    """
+    Delete precomputed degree-chart recommendations and invalidate the
+    cached my_chart bodies of these schemas.
+    """
+    schema_ids = list(schema_ids)
+    RecommendationSnapshot.objects.filter(chart_schema_id__in=schema_ids).delete()
+    for schema_id in schema_ids:
+        bump_chart_body_version(schema_id)
+
+
+def _schema_courses_changed(course_ids):
+    """
+    Like _schema_content_changed, for every schema that holds these courses
+    directly or through an elective group.
+    """
+    _schema_content_changed(
+        ChartSchema.objects.filter(
+            Q(nodes__course_id__in=course_ids)
+            | Q(nodes__course_group__courses__id__in=course_ids)
+        ).values_list('id', flat=True).distinct()
+    )
+
+
+_bulk_edit = threading.local()
+
+
+@contextmanager
+def bulk_requisite_edit():
+    """
+    Silence the per-row Prerequisite and CoRequisite handlers (derived data
+    and change log) in this thread. The caller logs the rows itself and
+    calls prerequisites_changed / corequisites_changed once afterwards.
+    """
+    previous = getattr(_bulk_edit, 'active', False)
+    _bulk_edit.active = True
+    try:
+        yield
+    finally:
+        _bulk_edit.active = previous
+
+
+def _in_bulk_edit(sender):
+    return sender in (Prerequisite, CoRequisite) and getattr(_bulk_edit, 'active', False)
+
+
+def prerequisites_changed(course_ids):
+    """
+    Refresh everything derived from the prerequisite graph after edges
+    touching these courses changed. Called by the Prerequisite signals and
+    directly after bulk operations, which do not send signals.
+    """
+    course_ids = list(course_ids)
+    refresh_importance_for_courses(course_ids)
+    _bump_charts_containing(course_ids)
+    _schema_courses_changed(course_ids)
+    bump_catalog_version()
+    invalidate_unlocks_index()
+
+
+@receiver(post_save, sender=Prerequisite)
+@receiver(post_delete, sender=Prerequisite)
+def refresh_importance_on_prerequisite_change(sender, instance, **kwargs):
+    """
+    Keep importance scores and critical-path depths current when a
+    prerequisite edge is added, edited or removed.
+    """
+    if _in_bulk_edit(sender):
+        return
+    prerequisites_changed([instance.course_id, instance.prerequisite_course_id])
+
+
+@receiver(post_save, sender=ChartCourse)
+def refresh_importance_on_chart_course_added(sender, instance, created, **kwargs):
+    """
+    A course joining a chart changes the dependent counts of its ancestors.
+    """
+    if created:
+        recompute_importance_scores(instance.degree_chart)
+    bump_graph_version(instance.degree_chart_id)
+
+
+@receiver(post_delete, sender=ChartCourse)
+def refresh_importance_on_chart_course_removed(sender, instance, **kwargs):
+    """
+    A course leaving a chart no longer counts towards its ancestors.
+    """
+    degree_chart = DegreeChart.objects.filter(pk=instance.degree_chart_id).first()
+    if degree_chart is not None:
+        recompute_importance_scores(degree_chart)
+    bump_graph_version(instance.degree_chart_id)
+
+
+@receiver(post_save, sender=ChartNode)
+@receiver(post_delete, sender=ChartNode)
+def refresh_depths_on_chart_node_change(sender, instance, **kwargs):
+    """
+    Adding, moving or removing a slot changes which courses a schema's
+    critical-path depths are computed over, and what its students are
+    recommended.
+    """
+    schema = ChartSchema.objects.filter(pk=instance.schema_id).first()
+    if schema is not None:
+        recompute_schema_depths(schema)
+        _schema_content_changed([schema.id])
+
+
+@receiver(post_save, sender=ChartSchema)
+@receiver(post_delete, sender=ChartSchema)
+def invalidate_chart_index_on_schema_change(sender, instance, **kwargs):
+    """
+    Entry-year ranges decide which students a schema applies to, so every
+    process has to rebuild its interval index and the persisted
+    Profile.chart_schema of the major's students is re-resolved.
+
+    The shared index is only invalidated once the change commits: an index
+    rebuilt inside the transaction would keep a rolled-back schema. The
+    profiles are re-resolved against an index of what this transaction sees.
+    """
+    schema_id = instance.id
+
+    def invalidate():
+        invalidate_chart_index()
+        bump_chart_schema_version()
+        bump_chart_body_version(schema_id)
+
+    transaction.on_commit(invalidate)
+    index = ChartSchemaIndex(ChartSchema.objects.all())
+    refresh_profile_schemas(profiles_of_major(instance.major), index=index)
+    if kwargs.get('created') is False:
+        # Students left behind by a change of major
+        refresh_profile_schemas(Profile.objects.filter(chart_schema_id=schema_id), index=index)
+
+
+@receiver(post_save, sender=Profile)
+def resolve_chart_schema_on_profile_save(sender, instance, **kwargs):
+    """
+    Keep Profile.chart_schema in step with the student number.
+    """
+    schema = resolve_chart_schema(instance.student_number or '')
+    if schema is not None and not ChartSchema.objects.filter(pk=schema.id).exists():
+        # This process's index outlived the schema (deleted by another
+        # worker, or saved in a rolled-back transaction): rebuild it
+        invalidate_chart_index()
+        bump_chart_schema_version()
+        schema = resolve_chart_schema(instance.student_number or '')
+    schema_id = schema.id if schema else None
+    if instance.chart_schema_id != schema_id:
+        instance.chart_schema_id = schema_id
+        Profile.objects.filter(pk=instance.pk).update(chart_schema_id=schema_id)
+
+
+@receiver(post_save, sender=CourseGroup)
+def invalidate_chart_bodies_on_group_change(sender, instance, **kwargs):
+    """
+    Chart bodies and graph exports show each elective slot's group name and
+    fields. Deleting a group cascades to its ChartNodes, whose own signals
+    cover it.
+    """
+    _schema_content_changed(
+        ChartSchema.objects.filter(nodes__course_group=instance).values_list('id', flat=True).distinct()
+    )
+
+
+@receiver(m2m_changed, sender=CourseGroup.courses.through)
+def refresh_depths_on_group_change(sender, instance, action, **kwargs):
+    """
+    Elective slots take the deepest chain of their group's courses.
+    """
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if isinstance(instance, CourseGroup):
+        schemas = ChartSchema.objects.filter(nodes__course_group=instance)
+    else:
+        schemas = ChartSchema.objects.filter(nodes__course_group__courses=instance)
+    for schema in schemas.distinct():
+        recompute_schema_depths(schema)
+        _schema_content_changed([schema.id])
+
+
+@receiver(post_save, sender=Course)
+def invalidate_recommendations_on_course_change(sender, instance, created, **kwargs):
+    """
+    Course details are part of the cached recommendation payload, and of
+    the chart bodies that list the course or require it.
+    """
+    if not created:
+        _bump_charts_containing([instance.id])
+        requiring = set(
+            Prerequisite.objects.filter(prerequisite_course=instance)
+            .values_list('course_id', flat=True)
+        )
+        requiring.update(
+            CoRequisite.objects.filter(corequisite_course=instance)
+            .values_list('course_id', flat=True)
+        )
+        _schema_courses_changed([instance.id, *requiring])
+
+
+@receiver(pre_delete, sender=Course)
+def invalidate_recommendations_on_course_delete(sender, instance, **kwargs):
+    """
+    Deleting a course drops it from elective groups without an m2m signal,
+    so the charts offering it through a group have to be found beforehand.
+    """
+    _schema_courses_changed([instance.id])
+
+
+def corequisites_changed(course_ids):
+    """
+    Refresh the chart bodies listing these courses' co-requisites. Called by
+    the CoRequisite signals and directly after bulk operations.
+    """
+    _schema_courses_changed(list(course_ids))
+
+
+@receiver(post_save, sender=CoRequisite)
+@receiver(post_delete, sender=CoRequisite)
+def invalidate_chart_bodies_on_corequisite_change(sender, instance, **kwargs):
+    """
+    Chart bodies list each course's co-requisites.
+    """
+    if _in_bulk_edit(sender):
+        return
+    corequisites_changed([instance.course_id])
+
+
+_CHANGE_TABLES = {
+    Course: CatalogChange.COURSE,
+    ChartNode: CatalogChange.CHART_NODE,
+    CourseGroup: CatalogChange.COURSE_GROUP,
+    Prerequisite: CatalogChange.PREREQUISITE,
+    CoRequisite: CatalogChange.COREQUISITE,
+}
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_save, sender=ChartNode)
+@receiver(post_save, sender=CourseGroup)
+@receiver(post_save, sender=Prerequisite)
+@receiver(post_save, sender=CoRequisite)
+def log_catalog_save(sender, instance, **kwargs):
+    """
+    Record the row in the catalog change feed.
+    """
+    if _in_bulk_edit(sender):
+        return
+    record_changes(_CHANGE_TABLES[sender], [instance.pk])
+
+
+@receiver(post_delete, sender=Course)
+@receiver(post_delete, sender=ChartNode)
+@receiver(post_delete, sender=CourseGroup)
+@receiver(post_delete, sender=Prerequisite)
+@receiver(post_delete, sender=CoRequisite)
+def log_catalog_delete(sender, instance, **kwargs):
+    """
+    Record a tombstone in the catalog change feed.
+    """
+    if _in_bulk_edit(sender):
+        return
+    record_changes(_CHANGE_TABLES[sender], [instance.pk], CatalogChange.DELETE)
+
+
+@receiver(m2m_changed, sender=CourseGroup.courses.through)
+def log_group_membership_change(sender, instance, action, pk_set, **kwargs):
+    """
+    Synced groups carry their course ids, so a membership change is a
+    change of the group.
+    """
+    if isinstance(instance, CourseGroup):
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            record_changes(CatalogChange.COURSE_GROUP, [instance.pk])
+    elif action in ('post_add', 'post_remove'):
+        record_changes(CatalogChange.COURSE_GROUP, sorted(pk_set))
+    elif action == 'pre_clear':
+        # Clearing from the course side reports no pk_set; read it while it exists
+        record_changes(
+            CatalogChange.COURSE_GROUP,
+            instance.course_groups.values_list('id', flat=True)
+        )
+
+
+@receiver(pre_delete, sender=Course)
+def log_group_membership_on_course_delete(sender, instance, **kwargs):
+    """
+    Deleting a course drops its group memberships without an m2m signal.
+    """
+    record_changes(
+        CatalogChange.COURSE_GROUP,
+        instance.course_groups.values_list('id', flat=True)
+    )
+
+
+def _section_times_changed(semester):
+    invalidate_section_index(semester)
+    bump_section_times_version(semester)
+
+
+@receiver(pre_save, sender=Section)
+def refresh_section_index_on_semester_move(sender, instance, **kwargs):
+    """
+    A section moving to another semester leaves the old semester's index.
+    """
+    if instance.pk:
+        previous = Section.objects.filter(pk=instance.pk).values_list('semester', flat=True).first()
+        if previous is not None and previous != instance.semester:
+            _section_times_changed(previous)
+
+
+@receiver(post_save, sender=Section)
+@receiver(post_delete, sender=Section)
+def refresh_section_index_on_section_change(sender, instance, **kwargs):
+    """
+    Keep the section time index of the section's semester current.
+    """
+    _section_times_changed(instance.semester)
+
+
+@receiver(post_save, sender=SectionTime)
+@receiver(post_delete, sender=SectionTime)
+def refresh_section_index_on_time_change(sender, instance, **kwargs):
+    """
+    Keep the section time index of the section's semester current.
+    """
+    semester = Section.objects.filter(pk=instance.section_id).values_list(
+        'semester', flat=True
+    ).first()
+    if semester is not None:
+        _section_times_changed(semester)
+
+
+@receiver(post_save, sender=StudentCourseHistory)
+@receiver(post_delete, sender=StudentCourseHistory)
+@receiver(post_save, sender=StudentSelection)
+@receiver(post_delete, sender=StudentSelection)
+def invalidate_recommendations_on_history_change(sender, instance, **kwargs):
+    """
+    A student's passed or selected courses changed, so their cached
+    recommendations are stale.
+    """
+    bump_history_version(instance.student_id)
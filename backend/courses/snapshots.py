@@ -0,0 +1,160 @@
+"""
+Precomputed degree-chart recommendations.
+
+RecommendationSnapshot keeps the /api/degrees/recommendations/ response of
+each student for their next semester. The precompute_recommendations command
+fills the table ahead of registration, and the view writes through it on a
+miss.
+
+A snapshot is served only while its history fingerprint (row count and
+latest update of the student's StudentCourseHistory) still matches, so a
+student whose history changed after the snapshot gets a fresh computation
+without anything having to be deleted. Chart changes delete the snapshots of
+the affected schemas instead (see courses.signals).
+"""
+
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Count, Max
+
+from courses.chart_recommendations import PASSING_GRADES, compute_chart_recommendations
+from courses.chart_resolver import schema_for_profile
+from courses.models import RecommendationSnapshot
+from students.models import StudentCourseHistory
+
+User = get_user_model()
+
+
+def _fingerprint(rows: int, latest: Optional[datetime]) -> str:
+    return f"{rows}:{latest.isoformat() if latest else '-'}"
+
+
+def history_states(student_ids: Iterable[int]) -> Dict[int, Tuple[int, str]]:
+    """
+    Next semester number and history fingerprint per student, in one query.
+    Students without history are at semester 1.
+    """
+    student_ids = list(student_ids)
+    states = {student_id: (1, _fingerprint(0, None)) for student_id in student_ids}
+    rows = (
+        StudentCourseHistory.objects.filter(student_id__in=student_ids)
+        .values('student_id')
+        .annotate(
+            rows=Count('id'),
+            semesters=Count('semester', distinct=True),
+            latest=Max('updated_at'),
+        )
+    )
+    for row in rows:
+        states[row['student_id']] = (
+            row['semesters'] + 1,
+            _fingerprint(row['rows'], row['latest']),
+        )
+    return states
+
+
+def passed_courses_by_student(student_ids: Iterable[int]) -> Dict[int, Set[int]]:
+    """Passed course IDs per student, in one query."""
+    student_ids = list(student_ids)
+    passed = {student_id: set() for student_id in student_ids}
+    rows = StudentCourseHistory.objects.filter(
+        student_id__in=student_ids,
+        grade__in=PASSING_GRADES
+    ).values_list('student_id', 'course_id')
+    for student_id, course_id in rows:
+        passed[student_id].add(course_id)
+    return passed
+
+
+def _is_fresh(snapshot, chart, fingerprint, recompute_before=None) -> bool:
+    return (
+        snapshot is not None
+        and snapshot.chart_schema_id == chart.id
+        and snapshot.history_fingerprint == fingerprint
+        and (recompute_before is None or snapshot.computed_at >= recompute_before)
+    )
+
+
+def get_recommendations_payload(student, chart) -> dict:
+    """
+    The recommendations response for a student, served from their snapshot
+    when it is still fresh and recomputed (and stored) otherwise.
+    """
+    next_semester, fingerprint = history_states([student.id])[student.id]
+    snapshot = RecommendationSnapshot.objects.filter(
+        student=student,
+        semester=next_semester
+    ).first()
+    if _is_fresh(snapshot, chart, fingerprint):
+        return snapshot.payload
+
+    passed = passed_courses_by_student([student.id])[student.id]
+    payload = compute_chart_recommendations(chart, passed, next_semester)
+    RecommendationSnapshot.objects.update_or_create(
+        student=student,
+        semester=next_semester,
+        defaults={
+            'chart_schema': chart,
+            'payload': payload,
+            'history_fingerprint': fingerprint,
+        }
+    )
+    return payload
+
+
+def precompute_chunk(student_ids, recompute_before: Optional[datetime] = None) -> Tuple[int, int]:
+    """
+    Compute and store snapshots for one work unit of students.
+
+    Students whose snapshot is still fresh are skipped, which is what lets an
+    interrupted run resume: finished chunks are not recomputed. Snapshots
+    computed before recompute_before are treated as stale.
+
+    Returns:
+        (computed, skipped) counts
+    """
+    student_ids = list(student_ids)
+    students = list(User.objects.filter(id__in=student_ids).select_related('profile'))
+    states = history_states(student_ids)
+    snapshots = {
+        (snapshot.student_id, snapshot.semester): snapshot
+        for snapshot in RecommendationSnapshot.objects.filter(student_id__in=student_ids)
+    }
+
+    pending = []
+    skipped = 0
+    for student in students:
+        chart = schema_for_profile(student.profile)
+        next_semester, fingerprint = states[student.id]
+        snapshot = snapshots.get((student.id, next_semester))
+        if chart is None or _is_fresh(snapshot, chart, fingerprint, recompute_before):
+            skipped += 1
+            continue
+        pending.append((student.id, chart, next_semester, fingerprint))
+
+    passed = passed_courses_by_student(student_id for student_id, *_ in pending)
+    rows = [
+        RecommendationSnapshot(
+            student_id=student_id,
+            chart_schema=chart,
+            semester=next_semester,
+            payload=compute_chart_recommendations(chart, passed[student_id], next_semester),
+            history_fingerprint=fingerprint,
+        )
+        for student_id, chart, next_semester, fingerprint in pending
+    ]
+    # MySQL upserts on any unique key (ON DUPLICATE KEY UPDATE) and rejects
+    # a conflict target
+    target = {}
+    if connection.features.supports_update_conflicts_with_target:
+        target['unique_fields'] = ['student', 'semester']
+    RecommendationSnapshot.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        update_fields=['chart_schema', 'payload', 'history_fingerprint', 'computed_at'],
+        **target,
+    )
+    return len(rows), skipped
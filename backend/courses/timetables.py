@@ -0,0 +1,238 @@
+"""
+Conflict-free timetable enumeration (PRD 2.2 §2.4).
+
+Given a set of courses, every combination of one section per course whose
+meeting times do not overlap is a timetable. The weekly slots of all
+candidate sections (plus the student's other picks, which stay fixed) are
+cut at every distinct start and end minute; each piece is one bit, so a
+section's times become a bitmask and "clashes with what is already placed"
+is a single AND. Overlap is exact and follows Schedule.has_conflict: slots
+that only touch do not clash.
+
+The search is a backtracking walk that places the course with the fewest
+alternatives first, forward-checks that every remaining course still has a
+free section, and keeps the best `limit` timetables in a heap. Preference
+costs only grow as sections are added, so a partial timetable that is
+already worse than the worst kept one is cut off. Node and time caps keep
+the call interactive; a capped search reports `truncated`.
+
+Courses without sections in the semester fall back to the course's own
+weekly slot, as a single alternative with no section id.
+"""
+
+import heapq
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from courses.models import Course, Section
+from courses.sections import get_section_index
+from courses.weektime import MINUTES_PER_DAY
+
+MAX_COURSES = 12
+MAX_RESULTS = 50
+MAX_NODES = 200000
+TIME_BUDGET = 0.5  # seconds
+
+DEFAULT_EARLY_BEFORE = 9 * 60
+
+
+class Alternative:
+    """One way of taking a course: a section, or the course's own slot."""
+
+    __slots__ = ('course_id', 'section_id', 'number', 'instructor', 'slots', 'mask', 'days', 'early')
+
+    def __init__(self, course_id, section_id, number, instructor, slots):
+        self.course_id = course_id
+        self.section_id = section_id
+        self.number = number
+        self.instructor = instructor
+        self.slots = slots
+        self.mask = 0
+        self.days = 0
+        self.early = 0
+
+
+class _SlotGrid:
+    """Maps weekly intervals onto bits between consecutive boundaries."""
+
+    def __init__(self, intervals: Iterable[Tuple[int, int]]):
+        self.bounds = sorted({minute for interval in intervals for minute in interval})
+        self._bit = {minute: i for i, minute in enumerate(self.bounds)}
+
+    def mask(self, start: int, end: int) -> int:
+        first, last = self._bit[start], self._bit[end]
+        if last <= first:
+            return 0
+        return ((1 << (last - first)) - 1) << first
+
+
+def _day_mask(slots) -> int:
+    mask = 0
+    for start, _end in slots:
+        mask |= 1 << (start // MINUTES_PER_DAY)
+    return mask
+
+
+def _early_count(slots, early_before: Optional[int]) -> int:
+    if early_before is None:
+        return 0
+    return sum(1 for start, _end in slots if start % MINUTES_PER_DAY < early_before)
+
+
+def load_alternatives(course_ids: List[int], semester: str) -> Dict[int, List[Alternative]]:
+    """The offered sections of every course, with their weekly slots."""
+    index = get_section_index(semester)
+    alternatives = {course_id: [] for course_id in course_ids}
+    sections = Section.objects.filter(
+        course_id__in=course_ids, semester=semester, is_offered=True
+    ).order_by('number', 'id').values_list('id', 'course_id', 'number', 'instructor')
+    for section_id, course_id, number, instructor in sections:
+        alternatives[course_id].append(
+            Alternative(course_id, section_id, number, instructor, index.times.get(section_id, []))
+        )
+    missing = [course_id for course_id, options in alternatives.items() if not options]
+    if missing:
+        for course in Course.objects.filter(id__in=missing).only(
+            'id', 'instructor', 'week_start_minute', 'week_end_minute'
+        ):
+            slots = []
+            if course.week_start_minute is not None:
+                slots.append((course.week_start_minute, course.week_end_minute))
+            alternatives[course.id].append(Alternative(course.id, None, None, course.instructor, slots))
+    return alternatives
+
+
+def enumerate_timetables(
+    alternatives: Dict[int, List[Alternative]],
+    fixed_slots: Iterable[Tuple[int, int]] = (),
+    avoid_early: bool = True,
+    early_before: int = DEFAULT_EARLY_BEFORE,
+    fewest_days: bool = True,
+    limit: int = 10,
+    max_nodes: int = MAX_NODES,
+    time_budget: float = TIME_BUDGET,
+) -> dict:
+    """
+    The best conflict-free combinations of one alternative per course.
+
+    Args:
+        alternatives: Course ID -> its alternatives (see load_alternatives)
+        fixed_slots: Weekly slots already taken (other picks); they count
+            towards campus days and early sessions but are never moved
+        avoid_early: Rank timetables with fewer sessions starting before
+            `early_before` (minute of day) first
+        fewest_days: Rank timetables on fewer campus days first
+        limit: Number of timetables to return
+        max_nodes, time_budget: Search caps
+
+    Returns:
+        {
+            "timetables": [{"cost": (...), "choice": [Alternative, ...],
+                            "days": [0, 2], "early_sessions": 1}],
+            "unplaceable": [course IDs with no section free of the fixed slots],
+            "truncated": bool,
+        }
+    """
+    fixed_slots = list(fixed_slots)
+    grid = _SlotGrid(
+        fixed_slots
+        + [slot for options in alternatives.values() for option in options for slot in option.slots]
+    )
+    cutoff = early_before if avoid_early else None
+    base_mask = 0
+    for start, end in fixed_slots:
+        base_mask |= grid.mask(start, end)
+    base_days = _day_mask(fixed_slots)
+    base_early = _early_count(fixed_slots, cutoff)
+
+    courses = []
+    unplaceable = []
+    for course_id, options in alternatives.items():
+        usable = []
+        for option in options:
+            option.mask = 0
+            for start, end in option.slots:
+                option.mask |= grid.mask(start, end)
+            option.days = _day_mask(option.slots)
+            option.early = _early_count(option.slots, cutoff)
+            if not option.mask & base_mask:
+                usable.append(option)
+        if usable:
+            # Cheap alternatives first, so good timetables tighten the bound early
+            usable.sort(key=lambda option: (option.early, bin(option.days).count('1')))
+            courses.append(usable)
+        else:
+            unplaceable.append(course_id)
+    if unplaceable:
+        return {'timetables': [], 'unplaceable': sorted(unplaceable), 'truncated': False}
+    courses.sort(key=len)
+
+    def cost(days: int, early: int) -> Tuple[int, ...]:
+        parts = []
+        if fewest_days:
+            parts.append(bin(days).count('1'))
+        if avoid_early:
+            parts.append(early)
+        return tuple(parts)
+
+    best: List[tuple] = []  # max-heap by cost via negation: (-cost..., -serial, choice, days, early)
+    serial = 0
+    nodes = 0
+    deadline = time.monotonic() + time_budget
+    truncated = False
+    choice: List[Alternative] = []
+
+    def worst_kept() -> Optional[Tuple[int, ...]]:
+        if len(best) < limit:
+            return None
+        return tuple(-part for part in best[0][0])
+
+    def search(depth: int, mask: int, days: int, early: int) -> bool:
+        nonlocal serial, nodes, truncated
+        nodes += 1
+        if nodes > max_nodes or (nodes & 1023 == 0 and time.monotonic() > deadline):
+            truncated = True
+            return False
+        current = cost(days, early)
+        bound = worst_kept()
+        if bound is not None and current >= bound:
+            return True
+        if depth == len(courses):
+            serial += 1
+            entry = (tuple(-part for part in current), -serial, list(choice), days, early)
+            if len(best) < limit:
+                heapq.heappush(best, entry)
+            else:
+                heapq.heapreplace(best, entry)
+            return True
+        # Forward check: every later course must still fit somewhere
+        for options in courses[depth + 1:]:
+            if all(option.mask & mask for option in options):
+                return True
+        for option in courses[depth]:
+            if option.mask & mask:
+                continue
+            choice.append(option)
+            carry_on = search(depth + 1, mask | option.mask, days | option.days, early + option.early)
+            choice.pop()
+            if not carry_on:
+                return False
+        return True
+
+    if limit > 0:
+        search(0, base_mask, base_days, base_early)
+
+    ranked = sorted(best, key=lambda entry: (tuple(-part for part in entry[0]), -entry[1]))
+    return {
+        'timetables': [
+            {
+                'cost': tuple(-part for part in entry[0]),
+                'choice': sorted(entry[2], key=lambda option: option.course_id),
+                'days': [day for day in range(7) if entry[3] >> day & 1],
+                'early_sessions': entry[4],
+            }
+            for entry in ranked
+        ],
+        'unplaceable': [],
+        'truncated': truncated,
+    }
@@ -0,0 +1,87 @@
+"""
+Reverse prerequisite index: which courses a course unlocks.
+
+Built once per process from the catalog-wide hard prerequisite adjacency
+(courses.graph.load_catalog_dependents) and rebuilt whenever the catalog
+version changes, which the Prerequisite signals bump on every edge change
+(see courses.signals). Lookups of direct and transitive unlocks are then
+dictionary reads.
+
+Transitive unlocks are computed over the strongly connected components of
+the graph: Tarjan's algorithm emits a component only after everything it
+reaches, so every component's closure is the union of its members' direct
+dependents and their components' closures. Courses on a prerequisite cycle
+unlock each other, themselves included, as in reachable_dependents.
+"""
+
+import threading
+from typing import Dict, Optional, Tuple
+
+from courses.cache import catalog_version
+from courses.graph import load_catalog_dependents, strongly_connected_components
+
+
+class UnlocksIndex:
+    """Direct and transitive dependents of every course with at least one."""
+
+    def __init__(self, adjacency: Dict[int, list]):
+        self._direct: Dict[int, Tuple[int, ...]] = {
+            course_id: tuple(sorted(set(dependents)))
+            for course_id, dependents in adjacency.items()
+        }
+
+        graph = {course_id: list(dependents) for course_id, dependents in self._direct.items()}
+        for dependents in self._direct.values():
+            for dependent in dependents:
+                graph.setdefault(dependent, [])
+
+        component_of: Dict[int, int] = {}
+        closures = []
+        for number, component in enumerate(strongly_connected_components(graph)):
+            for course_id in component:
+                component_of[course_id] = number
+            reach = set()
+            for course_id in component:
+                for dependent in graph[course_id]:
+                    reach.add(dependent)
+                    if component_of[dependent] != number:
+                        reach.update(closures[component_of[dependent]])
+            closures.append(tuple(sorted(reach)))
+
+        self._transitive: Dict[int, Tuple[int, ...]] = {
+            course_id: closures[component_of[course_id]]
+            for course_id in self._direct
+        }
+
+    def direct(self, course_id: int) -> Tuple[int, ...]:
+        """Courses listing course_id as a hard prerequisite."""
+        return self._direct.get(course_id, ())
+
+    def transitive(self, course_id: int) -> Tuple[int, ...]:
+        """Every course that depends on course_id through a prerequisite chain."""
+        return self._transitive.get(course_id, ())
+
+
+_index: Optional[UnlocksIndex] = None
+_index_version = None
+_index_lock = threading.Lock()
+
+
+def get_unlocks_index() -> UnlocksIndex:
+    """The process-wide index, rebuilt if a prerequisite changed since it was built."""
+    global _index, _index_version
+    version = catalog_version()
+    index = _index
+    if index is not None and _index_version == version:
+        return index
+    with _index_lock:
+        if _index is None or _index_version != version:
+            _index = UnlocksIndex(load_catalog_dependents())
+            _index_version = version
+        return _index
+
+
+def invalidate_unlocks_index() -> None:
+    """Drop this process's index; the next lookup reloads it."""
+    global _index
+    _index = None
@@ -10,7 +10,9 @@ router.register(r'degrees', DegreeChartViewSet, basename='degree-chart')
 router.register(r'list', views.CourseViewSet, basename='course')
 router.register(r'prerequisites', views.PrerequisiteViewSet, basename='prerequisite')
 router.register(r'corequisites', views.CoRequisiteViewSet, basename='corequisite')
+router.register(r'sections', views.SectionViewSet, basename='section')
 router.register(r'recommendations', views.RecommendationViewSet, basename='recommendation')
+router.register(r'changes', views.CatalogChangeViewSet, basename='catalog-change')
 
 app_name = 'courses'
 
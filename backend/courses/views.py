@@ -1,11 +1,17 @@
-from rest_framework import viewsets, status, filters
+import json
+import time
+
+from rest_framework import viewsets, status, filters, serializers
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from django_filters.rest_framework import DjangoFilterBackend
 from django.shortcuts import get_object_or_404
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.contrib.auth import get_user_model
 
-from .models import DegreeChart, Course, ChartCourse, Prerequisite, CoRequisite
+from .models import CatalogChange, DegreeChart, Course, ChartCourse, Prerequisite, CoRequisite, Section
 from .serializers import (
     DegreeChartSerializer,
     DegreeChartDetailSerializer,
@@ -14,9 +20,18 @@ from .serializers import (
     ChartCourseSerializer,
     PrerequisiteSerializer,
     CoRequisiteSerializer,
+    SectionSerializer,
 )
 from accounts.permissions import IsAdmin, IsAdminOrHOD, IsAdminOrReadOnly, IsStudent
-from .recommendations import RecommendationEngine
+from .recommendations import MAX_COHORT_LIMIT, RecommendationEngine, recommend_for_cohort
+from .graph import find_prerequisite_cycles, load_catalog_dependents, reachable_dependents
+from .signals import bulk_requisite_edit, corequisites_changed, prerequisites_changed
+from .changes import changes_since, record_changes
+from .sections import get_section_index
+from .timetables import MAX_COURSES, MAX_RESULTS, enumerate_timetables, load_alternatives
+from .weektime import MINUTES_PER_DAY
+
+User = get_user_model()
 
 
 class DegreeChartViewSet(viewsets.ModelViewSet):
@@ -126,114 +141,145 @@ class CourseViewSet(viewsets.ModelViewSet):
             )
         
         course = self.get_object()
-        prerequisites_ids = request.data.get('prerequisites', [])
-        corequisites_ids = request.data.get('corequisites', [])
-        
         try:
-            # Delete existing prerequisites and corequisites
-            Prerequisite.objects.filter(course=course).delete()
-            CoRequisite.objects.filter(course=course).delete()
-            
-            # Add new prerequisites
-            for prereq_id in prerequisites_ids:
-                prereq_course = Course.objects.get(id=prereq_id)
-                
-                # Check for circular dependency
-                if self._has_circular_dependency(course, prereq_course):
-                    return Response(
-                        {'error': f'وابستگی دایره‌ای تشخیص داده شد با درس {prereq_course.code}'},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-                
-                Prerequisite.objects.create(
-                    course=course,
-                    prerequisite_course=prereq_course,
-                    is_corequisite=False
-                )
-            
-            # Add new corequisites
-            for coreq_id in corequisites_ids:
-                coreq_course = Course.objects.get(id=coreq_id)
-                CoRequisite.objects.create(
-                    course=course,
-                    corequisite_course=coreq_course
-                )
-            
-            # Return updated prerequisites
-            prerequisites = Prerequisite.objects.filter(course=course)
-            corequisites = CoRequisite.objects.filter(course=course)
-            
-            return Response({
-                'course_id': course.id,
-                'course_code': course.code,
-                'prerequisites': PrerequisiteSerializer(prerequisites, many=True).data,
-                'corequisites': CoRequisiteSerializer(corequisites, many=True).data,
-                'message': 'پیش‌نیازها با موفقیت بروزرسانی شدند',
-            }, status=status.HTTP_200_OK)
-        
-        except Course.DoesNotExist:
+            prerequisites_ids = {int(i) for i in request.data.get('prerequisites', [])}
+            corequisites_ids = {int(i) for i in request.data.get('corequisites', [])}
+        except (TypeError, ValueError):
             return Response(
-                {'error': 'یکی از دروس پیدا نشد'},
+                {'error': 'شناسه دروس باید عدد باشد'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Validate every referenced course in one query
+        referenced = prerequisites_ids | corequisites_ids
+        courses_by_id = Course.objects.in_bulk(referenced)
+        missing = sorted(referenced - set(courses_by_id))
+        if missing:
+            return Response(
+                {'error': 'یکی از دروس پیدا نشد', 'missing_course_ids': missing},
                 status=status.HTTP_404_NOT_FOUND
             )
-        except Exception as e:
+        
+        # Validate the whole proposed prerequisite set in one reachability pass
+        offending = self._find_circular_prerequisites(course, prerequisites_ids)
+        if offending:
             return Response(
-                {'error': str(e)},
+                {
+                    'error': 'وابستگی دایره‌ای تشخیص داده شد با درس '
+                             + '، '.join(courses_by_id[i].code for i in offending),
+                    'circular_dependencies': [
+                        {
+                            'course_id': course.id,
+                            'course_code': course.code,
+                            'prerequisite_id': prereq_id,
+                            'prerequisite_code': courses_by_id[prereq_id].code,
+                        }
+                        for prereq_id in offending
+                    ],
+                },
                 status=status.HTTP_400_BAD_REQUEST
             )
-    
-    def _has_circular_dependency(self, course, new_prereq):
-        """
-        Check if adding new_prereq as a prerequisite for course would create a circular dependency.
-        """
-        visited = set()
-        
-        def dfs(current):
-            if current.id in visited:
-                return False
-            if current.id == course.id:
-                return True
-            visited.add(current.id)
+        
+        # Apply only the difference, atomically, against rows read inside the transaction
+        with transaction.atomic(), bulk_requisite_edit():
+            existing_prereqs = {
+                prereq_id: (edge_id, is_coreq)
+                for edge_id, prereq_id, is_coreq in Prerequisite.objects.select_for_update().filter(
+                    course=course
+                ).values_list('id', 'prerequisite_course_id', 'is_corequisite')
+            }
+            existing_coreqs = dict(
+                CoRequisite.objects.select_for_update().filter(course=course).values_list(
+                    'corequisite_course_id', 'id'
+                )
+            )
+            removed_prereqs = [
+                edge_id for prereq_id, (edge_id, _) in existing_prereqs.items()
+                if prereq_id not in prerequisites_ids
+            ]
+            flipped_prereqs = [
+                edge_id for prereq_id, (edge_id, is_coreq) in existing_prereqs.items()
+                if is_coreq and prereq_id in prerequisites_ids
+            ]
+            removed_coreqs = [
+                edge_id for coreq_id, edge_id in existing_coreqs.items()
+                if coreq_id not in corequisites_ids
+            ]
             
-            dependents = Prerequisite.objects.filter(
-                prerequisite_course=current,
-                is_corequisite=False
-            ).values_list('course_id', flat=True)
+            # The per-row handlers are silenced; the derived data is
+            # refreshed once below
+            if removed_prereqs:
+                Prerequisite.objects.filter(pk__in=removed_prereqs).delete()
+            if flipped_prereqs:
+                Prerequisite.objects.filter(pk__in=flipped_prereqs).update(is_corequisite=False)
+            added_prereqs = sorted(prerequisites_ids - set(existing_prereqs))
+            Prerequisite.objects.bulk_create([
+                Prerequisite(course=course, prerequisite_course_id=prereq_id, is_corequisite=False)
+                for prereq_id in added_prereqs
+            ])
             
-            for dependent_id in dependents:
-                dependent = Course.objects.get(id=dependent_id)
-                if dfs(dependent):
-                    return True
+            if removed_coreqs:
+                CoRequisite.objects.filter(pk__in=removed_coreqs).delete()
+            added_coreqs = sorted(corequisites_ids - set(existing_coreqs))
+            CoRequisite.objects.bulk_create([
+                CoRequisite(course=course, corequisite_course_id=coreq_id)
+                for coreq_id in added_coreqs
+            ])
             
-            return False
+            # Log the changes here (bulk_create and update send no signals,
+            # and not every backend returns bulk-created ids)
+            if added_prereqs:
+                flipped_prereqs += Prerequisite.objects.filter(
+                    course=course, prerequisite_course_id__in=added_prereqs
+                ).values_list('id', flat=True)
+            record_changes(CatalogChange.PREREQUISITE, flipped_prereqs)
+            record_changes(CatalogChange.PREREQUISITE, removed_prereqs, CatalogChange.DELETE)
+            if added_coreqs:
+                record_changes(
+                    CatalogChange.COREQUISITE,
+                    CoRequisite.objects.filter(
+                        course=course, corequisite_course_id__in=added_coreqs
+                    ).values_list('id', flat=True)
+                )
+            record_changes(CatalogChange.COREQUISITE, removed_coreqs, CatalogChange.DELETE)
         
+        # ... and refresh the derived data once for every touched course
+        changed = set(existing_prereqs) ^ prerequisites_ids
+        changed |= {
+            prereq_id for prereq_id, (_, is_coreq) in existing_prereqs.items()
+            if is_coreq and prereq_id in prerequisites_ids
+        }
+        if changed:
+            prerequisites_changed({course.id} | changed)
+        elif added_coreqs or removed_coreqs:
+            corequisites_changed([course.id])
+        
+        # Return updated prerequisites
+        prerequisites = Prerequisite.objects.filter(course=course).select_related('prerequisite_course')
+        corequisites = CoRequisite.objects.filter(course=course).select_related('corequisite_course')
+        
+        return Response({
+            'course_id': course.id,
+            'course_code': course.code,
+            'prerequisites': PrerequisiteSerializer(prerequisites, many=True).data,
+            'corequisites': CoRequisiteSerializer(corequisites, many=True).data,
+            'message': 'پیش‌نیازها با موفقیت بروزرسانی شدند',
+        }, status=status.HTTP_200_OK)
     
-    def _has_circular_dependency(self, course, new_prereq):
+    def _find_circular_prerequisites(self, course, prerequisite_ids):
         """
-        Check if adding new_prereq as a prerequisite for course would create a circular dependency.
-        """
-        visited = set()
-        
-        def dfs(current):
-            if current.id in visited:
-                return False
-            if current.id == course.id:
-                return True
-            visited.add(current.id)
-            
-            dependents = Prerequisite.objects.filter(
-                prerequisite_course=current,
-                is_corequisite=False
-            ).values_list('course_id', flat=True)
-            
-            for dependent_id in dependents:
-                dependent = Course.objects.get(id=dependent_id)
-                if dfs(dependent):
-                    return True
-            
-            return False
+        Return the proposed prerequisites that would create a circular dependency.
         
-        return dfs(new_prereq)
+        A new edge prereq -> course closes a cycle exactly when prereq already
+        depends on course (directly or transitively), so a single traversal of
+        course's dependents over the cached catalog graph checks every
+        proposed prerequisite at once.
+        """
+        descendants = reachable_dependents(load_catalog_dependents(), course.id)
+        return sorted(
+            prereq_id for prereq_id in prerequisite_ids
+            if prereq_id == course.id or prereq_id in descendants
+        )
 
 
 class PrerequisiteViewSet(viewsets.ModelViewSet):
@@ -274,6 +320,27 @@ class PrerequisiteViewSet(viewsets.ModelViewSet):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated, IsAdminOrHOD])
+    def cycles(self, request):
+        """
+        Report every circular prerequisite group in the catalog (admin/HOD).
+        GET /api/courses/prerequisites/cycles/
+        """
+        started = time.perf_counter()
+        cycles = find_prerequisite_cycles()
+        elapsed = time.perf_counter() - started
+        
+        return Response({
+            'has_cycles': bool(cycles),
+            'total_cycles': len(cycles),
+            'cycles': [
+                {'size': len(group), 'courses': group}
+                for group in cycles
+            ],
+            'elapsed_ms': round(elapsed * 1000, 2),
+        })
+
+
 class CoRequisiteViewSet(viewsets.ModelViewSet):
     """
     ViewSet for CoRequisite management.
@@ -310,6 +377,210 @@ class CoRequisiteViewSet(viewsets.ModelViewSet):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class SectionViewSet(viewsets.ModelViewSet):
+    """
+    ViewSet for course sections (PRD 2.2 §2.4).
+    
+    GET    /api/courses/sections/?course=1&semester=...   - List sections with times
+    POST   /api/courses/sections/                         - Create section (admin)
+    GET    /api/courses/sections/clashes/                 - Clash check against own picks
+    POST   /api/courses/sections/timetables/              - Conflict-free section combinations
+    """
+    
+    queryset = Section.objects.select_related('course').prefetch_related('times')
+    serializer_class = SectionSerializer
+    permission_classes = [IsAdminOrReadOnly]
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['course', 'semester', 'is_offered']
+    
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated, IsStudent])
+    def clashes(self, request):
+        """
+        FR-BL-03: Which candidate sections clash with the student's current
+        picks for a semester.
+        
+        GET /api/courses/sections/clashes/?semester=Spring 1403&sections=4,7,9
+        
+        Picks with a section are checked through the semester's section
+        time index; picks without one by their course's weekly slot. A
+        section never clashes with a pick of its own course.
+        
+        Returns:
+            {
+                "semester": "Spring 1403",
+                "results": [
+                    {"section_id": 4, "clashes": false, "sections": [], "courses": []},
+                    {"section_id": 7, "clashes": true, "sections": [12], "courses": []}
+                ]
+            }
+        """
+        semester = request.query_params.get('semester')
+        if not semester:
+            return Response(
+                {'error': 'semester الزامی است'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            candidates = [
+                int(i) for i in request.query_params.get('sections', '').split(',') if i.strip()
+            ]
+        except ValueError:
+            return Response(
+                {'error': 'شناسه گروه‌های درسی باید عدد باشد'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Imported here: students depends on courses, not the other way round
+        from students.models import StudentSelection
+        picks = StudentSelection.objects.filter(
+            student=request.user, semester=semester
+        ).select_related('course')
+        picked_sections = set()
+        course_slots = {}
+        for pick in picks:
+            if pick.section_id:
+                picked_sections.add(pick.section_id)
+            elif pick.course.week_start_minute is not None:
+                course_slots[pick.course_id] = (
+                    pick.course.week_start_minute, pick.course.week_end_minute
+                )
+        
+        index = get_section_index(semester)
+        picked_tree = index.picked_tree(picked_sections)
+        results = []
+        for section_id in candidates:
+            own_course = index.course_of.get(section_id)
+            sections = index.clashing_sections(section_id, picked_tree)
+            courses = sorted(
+                course_id for course_id, slot in course_slots.items()
+                if course_id != own_course and index.clashes_with_intervals(section_id, [slot])
+            )
+            results.append({
+                'section_id': section_id,
+                'clashes': bool(sections or courses),
+                'sections': sections,
+                'courses': courses,
+            })
+        
+        return Response({'semester': semester, 'results': results})
+    
+    @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated, IsStudent])
+    def timetables(self, request):
+        """
+        Enumerate conflict-free section combinations for a set of courses.
+        
+        POST /api/courses/sections/timetables/
+        {
+            "semester": "Spring 1403",
+            "course_ids": [1, 2, 3],
+            "avoid_early": true,
+            "early_before": "09:00",
+            "fewest_days": true,
+            "limit": 10
+        }
+        
+        The student's picks for other courses in the semester stay where
+        they are; timetables are built around them. Courses without
+        sections use their own weekly slot (section_id null).
+        
+        Returns:
+            {
+                "semester": "Spring 1403",
+                "truncated": false,
+                "unplaceable": [],
+                "timetables": [
+                    {
+                        "campus_days": 2,
+                        "days": [0, 2],
+                        "early_sessions": 0,
+                        "sections": [
+                            {"course_id": 1, "section_id": 4, "number": "1", "instructor": "..."}
+                        ]
+                    }
+                ]
+            }
+        """
+        semester = request.data.get('semester')
+        if not semester:
+            return Response(
+                {'error': 'semester الزامی است'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            course_ids = list(dict.fromkeys(int(i) for i in request.data.get('course_ids') or []))
+            limit = min(int(request.data.get('limit', 10)), MAX_RESULTS)
+            hour, minute = str(request.data.get('early_before', '09:00')).split(':')[:2]
+            early_before = int(hour) * 60 + int(minute)
+            # Form-encoded and JSON clients send "false"/0 as well as false
+            flag = serializers.BooleanField()
+            avoid_early = flag.to_internal_value(request.data.get('avoid_early', True))
+            fewest_days = flag.to_internal_value(request.data.get('fewest_days', True))
+        except (TypeError, ValueError, serializers.ValidationError):
+            return Response(
+                {'error': 'پارامترهای ورودی نامعتبر است'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not course_ids or len(course_ids) > MAX_COURSES:
+            return Response(
+                {'error': f'تعداد دروس باید بین ۱ و {MAX_COURSES} باشد'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not 0 <= early_before <= MINUTES_PER_DAY:
+            return Response(
+                {'error': 'پارامترهای ورودی نامعتبر است'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if Course.objects.filter(id__in=course_ids).count() != len(course_ids):
+            return Response(
+                {'error': 'برخی از دروس یافت نشد'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        # Imported here: students depends on courses, not the other way round
+        from students.models import StudentSelection
+        index = get_section_index(semester)
+        fixed_slots = []
+        picks = StudentSelection.objects.filter(
+            student=request.user, semester=semester
+        ).exclude(course_id__in=course_ids).select_related('course')
+        for pick in picks:
+            if pick.section_id:
+                fixed_slots.extend(index.times.get(pick.section_id, []))
+            elif pick.course.week_start_minute is not None:
+                fixed_slots.append((pick.course.week_start_minute, pick.course.week_end_minute))
+        
+        found = enumerate_timetables(
+            load_alternatives(course_ids, semester),
+            fixed_slots=fixed_slots,
+            avoid_early=avoid_early,
+            early_before=early_before,
+            fewest_days=fewest_days,
+            limit=limit,
+        )
+        return Response({
+            'semester': semester,
+            'truncated': found['truncated'],
+            'unplaceable': found['unplaceable'],
+            'timetables': [
+                {
+                    'campus_days': len(timetable['days']),
+                    'days': timetable['days'],
+                    'early_sessions': timetable['early_sessions'],
+                    'sections': [
+                        {
+                            'course_id': option.course_id,
+                            'section_id': option.section_id,
+                            'number': option.number,
+                            'instructor': option.instructor,
+                        }
+                        for option in timetable['choice']
+                    ],
+                }
+                for timetable in found['timetables']
+            ],
+        })
+
+
 class RecommendationViewSet(viewsets.ViewSet):
     """
     ViewSet for course recommendations.
@@ -328,9 +599,13 @@ class RecommendationViewSet(viewsets.ViewSet):
         {
             "degree_chart_id": 1,
             "semester": "Spring 1403",
-            "limit": 10
+            "limit": 10,
+            "stream": false
         }
         
+        With "stream": true the ranked courses are streamed as NDJSON
+        (application/x-ndjson, one course per line); "limit" is then optional.
+        
         Returns:
             {
                 "success": true,
@@ -363,6 +638,7 @@ class RecommendationViewSet(viewsets.ViewSet):
         degree_chart_id = request.data.get('degree_chart_id')
         semester = request.data.get('semester', 'Spring 1403')
         limit = int(request.data.get('limit', 10))
+        stream = str(request.data.get('stream', '')).lower() in ('1', 'true')
         
         # اعتبارسنجی
         if not degree_chart_id:
@@ -378,6 +654,15 @@ class RecommendationViewSet(viewsets.ViewSet):
             # ایجاد موتور توصیه‌ها
             engine = RecommendationEngine(request.user, degree_chart)
             
+            # خروجی NDJSON: هر خط یک درس به ترتیب رتبه
+            if stream:
+                stream_limit = int(request.data['limit']) if 'limit' in request.data else None
+                lines = (
+                    json.dumps(item, ensure_ascii=False) + '\n'
+                    for item in engine.stream_recommendations(semester, stream_limit)
+                )
+                return StreamingHttpResponse(lines, content_type='application/x-ndjson')
+            
             # دریافت توصیه‌ها
             recommendations = engine.get_recommendations(semester, limit)
             
@@ -399,6 +684,76 @@ class RecommendationViewSet(viewsets.ViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
     
+    @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated, IsAdminOrHOD])
+    def cohort(self, request):
+        """
+        Batch recommendations for an entry cohort (admin/HOD).
+        
+        POST /api/courses/recommendations/cohort/
+        {
+            "degree_chart_id": 1,
+            "student_number_prefix": "02210",
+            "semester": "Spring 1403",
+            "limit": 10
+        }
+        
+        The chart graph is loaded once and all students' history is read in
+        a single query; throughput is reported in students per second.
+        "limit" must be positive and is capped at MAX_COHORT_LIMIT.
+        """
+        degree_chart_id = request.data.get('degree_chart_id')
+        prefix = request.data.get('student_number_prefix')
+        semester = request.data.get('semester', 'Spring 1403')
+        
+        if not degree_chart_id or not prefix:
+            return Response(
+                {'error': 'degree_chart_id و student_number_prefix الزامی هستند'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            limit = int(request.data.get('limit', 10))
+        except (TypeError, ValueError):
+            limit = 0
+        if limit < 1:
+            return Response(
+                {'error': 'limit باید عددی مثبت باشد'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        limit = min(limit, MAX_COHORT_LIMIT)
+        
+        degree_chart = get_object_or_404(DegreeChart, id=degree_chart_id)
+        students = User.objects.filter(
+            role='student',
+            profile__student_number__startswith=prefix
+        )
+        student_numbers = dict(students.values_list('id', 'profile__student_number'))
+        
+        started = time.perf_counter()
+        results = recommend_for_cohort(degree_chart, students, semester, limit)
+        elapsed = time.perf_counter() - started
+        
+        return Response({
+            'success': True,
+            'semester': semester,
+            'degree_chart': {
+                'id': degree_chart.id,
+                'name': degree_chart.name,
+                'code': degree_chart.code,
+            },
+            'total_students': len(results),
+            'elapsed_seconds': round(elapsed, 4),
+            'students_per_second': round(len(results) / elapsed, 1) if elapsed > 0 else None,
+            'results': [
+                {
+                    'student_id': student_id,
+                    'student_number': student_numbers.get(student_id),
+                    'recommendations': recommendations,
+                }
+                for student_id, recommendations in results.items()
+            ],
+        })
+    
     @action(detail=False, methods=['get'])
     def help(self, request):
         """
@@ -412,7 +767,64 @@ class RecommendationViewSet(viewsets.ViewSet):
                     'path': '/api/courses/recommendations/recommend/',
                     'description': 'دریافت توصیه‌های دروس برای دانشجو',
                     'required_fields': ['degree_chart_id'],
+                    'optional_fields': ['semester', 'limit', 'stream'],
+                },
+                'cohort': {
+                    'method': 'POST',
+                    'path': '/api/courses/recommendations/cohort/',
+                    'description': 'توصیه‌های دسته‌ای برای یک ورودی (مدیر/مدیر گروه)',
+                    'required_fields': ['degree_chart_id', 'student_number_prefix'],
                     'optional_fields': ['semester', 'limit'],
-                }
+                },
             }
         })
+
+
+class CatalogChangeViewSet(viewsets.ViewSet):
+    """
+    Incremental sync of the course catalog and degree charts.
+    
+    GET    /api/courses/changes/?since=<version>   - Rows changed since a version
+    """
+    
+    permission_classes = [IsAuthenticated]
+    
+    def list(self, request):
+        """
+        Courses, chart nodes, course groups, prerequisites and co-requisites
+        created, updated or deleted since the client's last sync.
+        
+        GET /api/courses/changes/?since=1520
+        
+        Without since (or since=0) every row is returned. While has_more is
+        true, ask again with the returned version. Changes from the last few
+        seconds are held back until they settle. A version older than the
+        pruned log gets every row again with "expired": true; drop the local
+        copy and keep the new version.
+        
+        Returns:
+            {
+                "version": 1544,
+                "full": false,
+                "has_more": false,
+                "changes": {
+                    "courses": [{"id": 1, "code": "CS101", ...}],
+                    "chart_nodes": [...],
+                    "course_groups": [{"id": 2, ..., "course_ids": [5, 6]}],
+                    "prerequisites": [...],
+                    "corequisites": [...]
+                },
+                "deleted": {"courses": [], "chart_nodes": [17], ...}
+            }
+        """
+        since = request.query_params.get('since', '0')
+        try:
+            since = int(since)
+        except ValueError:
+            since = -1
+        if since < 0:
+            return Response(
+                {'error': 'نسخه همگام‌سازی نامعتبر است'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(changes_since(since))
@@ -4,6 +4,9 @@ API Views for Degree Chart functionality (PRD 3.1)
 - Provide course recommendations with priority scoring
 """
 
+import hashlib
+import json
+
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
@@ -11,11 +14,25 @@ from rest_framework.permissions import IsAuthenticated
 from django.shortcuts import get_object_or_404
 from django.db.models import Count, Q
 from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags, quote_etag
 
-from courses.models import ChartSchema, ChartNode, Course, CourseRequirement
+from courses.cache import chart_body_cache_key, get_cache
+from courses.chart_recommendations import PASSING_GRADES
+from courses.chart_export import get_chart_graph
+from courses.chart_resolver import (
+    MAJOR_MAPPING,
+    get_chart_index,
+    parse_student_number,
+    schema_for_profile,
+)
+from courses.models import Course
+from courses.planner import DEFAULT_BUDGET_SECONDS, DEFAULT_CREDIT_CAP, GraduationPlanner
+from courses.snapshots import get_recommendations_payload
 from students.models import StudentCourseHistory
 from .serializers_chart import (
-    ChartSchemaDetailSerializer,
+    ChartSchemaBodySerializer,
     CourseRecommendationSerializer,
 )
 
@@ -28,13 +45,15 @@ class DegreeChartViewSet(viewsets.ViewSet):
     """
     permission_classes = [IsAuthenticated]
 
-    @action(detail=False, methods=['get'])
-    def my_chart(self, request):
+    def _get_student_chart(self, request):
         """
-        GET /api/degrees/my-chart/
-        
-        Returns the degree chart matching the student's ID.
-        Parses entry_year (first 2 digits) and major_code (digits 2-5).
+        Find the requesting student's ChartSchema, normally the one
+        persisted on Profile.chart_schema. Otherwise the student ID is
+        parsed, entry_year (first 2 digits) and major_code (digits 2-5),
+        to report why no chart matches.
+
+        Returns:
+            (chart, None) on success, (None, error Response) otherwise
         """
         user = request.user
         
@@ -42,14 +61,20 @@ class DegreeChartViewSet(viewsets.ViewSet):
         try:
             profile = user.profile
         except:
-            return Response(
+            return None, Response(
                 {"error": "پروفایل دانشجویی یافت نشد"},
                 status=status.HTTP_404_NOT_FOUND
             )
         
+        # Persisted on the profile (see courses.chart_resolver); the
+        # student number is only parsed when nothing matched, to explain why
+        chart = schema_for_profile(profile)
+        if chart:
+            return chart, None
+        
         student_id = profile.student_number
         if not student_id or len(student_id) < 5:
-            return Response(
+            return None, Response(
                 {"error": "شماره دانشجویی نامعتبر است"},
                 status=status.HTTP_400_BAD_REQUEST
             )
@@ -58,69 +83,94 @@ class DegreeChartViewSet(viewsets.ViewSet):
         # xx = entry year (92-99, 00-14)
         # yyy = major code (210 = CS, etc)
         try:
-            entry_year_str = student_id[:2]
-            major_code_str = student_id[2:5]
-            
-            # Convert to full year (92 -> 1392, 99 -> 1399, 00 -> 1400, etc)
-            entry_year_int = int(entry_year_str)
-            if entry_year_int >= 92:
-                entry_year = 1300 + entry_year_int
-            else:
-                entry_year = 1400 + entry_year_int
-                
-        except (ValueError, IndexError):
-            return Response(
+            entry_year, major_code_str = parse_student_number(student_id)
+        except ValueError:
+            return None, Response(
                 {"error": "خطا در تجزیه شماره دانشجویی"},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Map major code to ChartSchema major field
-        major_mapping = {
-            '210': 'CS',   # کامپیوتر
-            '213': 'EE',   # برق
-            '201': 'CE',   # عمران
-            '211': 'ME',   # مکانیک
-            '220': 'SE',   # نرم‌افزار
-        }
-        
-        major = major_mapping.get(major_code_str)
+        major = MAJOR_MAPPING.get(major_code_str)
         if not major:
-            return Response(
+            return None, Response(
                 {"error": f"رشته {major_code_str} شناخته شده نیست"},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Find matching ChartSchema
-        chart = ChartSchema.objects.filter(
-            major=major,
-            entry_year_start__lte=entry_year,
-            entry_year_end__gte=entry_year
-        ).first()
+        return None, Response(
+            {"error": f"چارت برای رشته {major} سال ورود {entry_year} یافت نشد"},
+            status=status.HTTP_404_NOT_FOUND
+        )
+
+    @action(detail=False, methods=['get'])
+    def my_chart(self, request):
+        """
+        GET /api/degrees/my-chart/
         
-        if not chart:
-            return Response(
-                {"error": f"چارت برای رشته {major} سال ورود {entry_year} یافت نشد"},
-                status=status.HTTP_404_NOT_FOUND
-            )
+        Returns the degree chart matching the student's ID.
+        The chart body is shared by every student on the chart and cached;
+        only the passed-course overlay is computed per request. Responses
+        carry an ETag, and a matching If-None-Match gets 304 Not Modified.
+        """
+        user = request.user
+        chart, error = self._get_student_chart(request)
+        if error:
+            return error
+        
+        body, body_hash = _chart_body(chart)
         
         # Get passed courses for this student
         # Check StudentCourseHistory for passed courses (grade != 'F' and != 'W')
-        passed_courses = StudentCourseHistory.objects.filter(
-            student=user,
-            grade__in=['A', 'A-', 'B+', 'B', 'B-', 'C+', 'C', 'D']
-        ).values_list('course_id', flat=True)
+        overlay = {
+            'passed_courses': sorted(
+                StudentCourseHistory.objects.filter(
+                    student=user,
+                    grade__in=PASSING_GRADES
+                ).values_list('course_id', flat=True)
+            ),
+            'completed_semesters': StudentCourseHistory.objects.filter(
+                student=user
+            ).values('semester').distinct().count(),
+        }
+        etag = quote_etag(f'{body_hash}-{_content_hash(overlay)[:16]}')
         
-        # Serialize
-        serializer = ChartSchemaDetailSerializer(
-            chart,
-            context={
-                'passed_courses': list(passed_courses),
-                'completed_semesters': 0,  # TODO: Calculate from StudentCourseHistory
-                'request': request,
-            }
-        )
+        if _etag_matches(request, etag):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response({**body, **overlay})
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    @action(detail=True, methods=['get'])
+    def graph(self, request, pk=None):
+        """
+        GET /api/degrees/{schema_id}/graph/
+        
+        Returns a compact export of a chart for client-side graph work:
+        column tables for courses, nodes and elective groups, and
+        prerequisite/corequisite edges as parallel arrays of course-table
+        rows. The version hash is also the ETag; If-None-Match is honored.
+        """
+        try:
+            chart = get_chart_index().get(int(pk))
+        except (TypeError, ValueError):
+            chart = None
+        if chart is None:
+            return Response(
+                {"error": "چارت یافت نشد"},
+                status=status.HTTP_404_NOT_FOUND
+            )
         
-        return Response(serializer.data)
+        graph = get_chart_graph(chart)
+        etag = quote_etag(graph['version'])
+        if _etag_matches(request, etag):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(graph)
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
 
     @action(detail=False, methods=['get'])
     def recommendations(self, request):
@@ -134,216 +184,87 @@ class DegreeChartViewSet(viewsets.ViewSet):
         - Prerequisites being met
         """
         user = request.user
+        chart, error = self._get_student_chart(request)
+        if error:
+            return error
         
-        # Get student profile
-        try:
-            profile = user.profile
-        except:
-            return Response(
-                {"error": "پروفایل دانشجویی یافت نشد"},
-                status=status.HTTP_404_NOT_FOUND
-            )
-        
-        # Get passed courses from StudentCourseHistory
-        passed_courses = set(
-            StudentCourseHistory.objects.filter(
-                student=user,
-                grade__in=['A', 'A-', 'B+', 'B', 'B-', 'C+', 'C', 'D']
-            ).values_list('course_id', flat=True)
-        )
-        
-        # Get student's chart
-        student_id = profile.student_number
-        if not student_id or len(student_id) < 5:
-            return Response(
-                {"error": "شماره دانشجویی نامعتبر است"},
-                status=status.HTTP_400_BAD_REQUEST
-            )
+        # Served from the precomputed snapshot unless the student's history
+        # changed since it was taken
+        return Response(get_recommendations_payload(user, chart))
+
+    @action(detail=False, methods=['get'])
+    def plan(self, request):
+        """
+        GET /api/degrees/plan/?credit_cap=20&budget_ms=500
         
-        entry_year_str = student_id[:2]
-        major_code_str = student_id[2:5]
+        Returns a semester-by-semester plan from the student's passed courses
+        to graduation that minimizes the number of remaining semesters.
+        The search stops after budget_ms and returns the best plan so far.
+        """
+        user = request.user
+        chart, error = self._get_student_chart(request)
+        if error:
+            return error
         
         try:
-            entry_year_int = int(entry_year_str)
-            if entry_year_int >= 92:
-                entry_year = 1300 + entry_year_int
-            else:
-                entry_year = 1400 + entry_year_int
-        except (ValueError, IndexError):
+            credit_cap = int(request.query_params.get('credit_cap', DEFAULT_CREDIT_CAP))
+            budget_ms = int(request.query_params.get('budget_ms', DEFAULT_BUDGET_SECONDS * 1000))
+        except ValueError:
             return Response(
-                {"error": "خطا در تجزیه شماره دانشجویی"},
+                {"error": "credit_cap و budget_ms باید عدد صحیح باشند"},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        
-        major_mapping = {
-            '210': 'CS', '213': 'EE', '201': 'CE', '211': 'ME', '220': 'SE',
-        }
-        major = major_mapping.get(major_code_str)
-        
-        if not major:
+        if not 1 <= credit_cap <= 30 or not 1 <= budget_ms <= 5000:
             return Response(
-                {"error": f"رشته {major_code_str} شناخته شده نیست"},
+                {"error": "credit_cap باید بین ۱ و ۳۰ و budget_ms بین ۱ و ۵۰۰۰ باشد"},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        chart = ChartSchema.objects.filter(
-            major=major,
-            entry_year_start__lte=entry_year,
-            entry_year_end__gte=entry_year
-        ).first()
-        
-        if not chart:
-            return Response(
-                {"error": "چارت یافت نشد"},
-                status=status.HTTP_404_NOT_FOUND
-            )
-        
-        # Next semester (calculate from passed courses in StudentCourseHistory)
+        passed = dict(
+            StudentCourseHistory.objects.filter(
+                student=user,
+                grade__in=PASSING_GRADES
+            ).values_list('course_id', 'course__credits')
+        )
         completed_semesters = StudentCourseHistory.objects.filter(
             student=user
         ).values('semester').distinct().count()
-        next_semester = (completed_semesters or 0) + 1
-        
-        if next_semester > 8:
-            return Response({
-                "next_semester": next_semester,
-                "recommendations": [],
-                "message": "دانشجو تمام ترم‌ها را تکمیل کرده است"
-            })
         
-        # Get courses in next semester
-        nodes = ChartNode.objects.filter(
-            schema=chart,
-            semester=next_semester
-        ).select_related('course', 'course_group')
-        
-        recommendations = []
-        
-        for node in nodes:
-            if node.course:
-                course = node.course
-                is_elective = False
-            else:
-                # For elective slots, pick the best elective
-                if not node.course_group:
-                    continue
-                course = node.course_group.courses.first()
-                is_elective = True
-            
-            if not course:
-                continue
-            
-            # Check if already passed
-            if course.id in passed_courses:
-                continue
-            
-            # Calculate priority score
-            score = calculate_priority_score(
-                course=course,
-                passed_courses=passed_courses,
-                target_semester=next_semester,
-                chart=chart
-            )
-            
-            # Get unlocked courses (courses that have this as prerequisite)
-            unlocked = list(
-                CourseRequirement.objects.filter(
-                    prerequisite=course
-                ).values_list('course_id', flat=True)
-            )
-            
-            recommendations.append({
-                'course_id': course.id,
-                'code': course.code,
-                'name': course.name,
-                'credits': course.credits,
-                'priority_score': score['total'],
-                'reason': score['reason'],
-                'unlocks': unlocked,
-                'prerequisites_met': score['prerequisites_met'],
-                'is_mandatory': not is_elective,
-                'is_elective': is_elective,
-            })
-        
-        # Sort by priority score (descending)
-        recommendations.sort(key=lambda x: x['priority_score'], reverse=True)
-        
-        return Response({
-            'next_semester': next_semester,
-            'recommendations': recommendations
-        })
+        planner = GraduationPlanner(
+            chart,
+            passed_course_ids=passed,
+            passed_units=sum(passed.values()),
+            credit_cap=credit_cap,
+        )
+        return Response(planner.plan(
+            start_semester=completed_semesters + 1,
+            budget_seconds=budget_ms / 1000,
+        ))
 
 
-def calculate_priority_score(course, passed_courses, target_semester, chart):
+def _etag_matches(request, etag) -> bool:
+    """True when the request's If-None-Match already names this ETag."""
+    if_none_match = request.headers.get('If-None-Match')
+    if not if_none_match:
+        return False
+    return if_none_match.strip() == '*' or etag in parse_etags(if_none_match)
+
+
+def _content_hash(data) -> str:
+    payload = json.dumps(data, sort_keys=True, ensure_ascii=False, cls=DjangoJSONEncoder)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def _chart_body(chart):
     """
-    Calculate priority score for a course.
-    
-    Score = Base_Weight + Dependency_Weight + Semester_Alignment
-    
-    Base_Weight = 50 (all courses have base importance)
-    Dependency_Weight = (number of courses that require this) × 10
-    Semester_Alignment = (course is in target semester?) ? 25 : 0
-    
-    If prerequisites not met: Score = 0 (blocked)
+    Serialized chart body (without student data) and its content hash,
+    cached per ChartSchema until the schema's content changes.
     """
-    
-    # Check prerequisites
-    prerequisites = CourseRequirement.objects.filter(course=course)
-    prerequisites_met = True
-    
-    for req in prerequisites:
-        if req.prerequisite_id not in passed_courses:
-            prerequisites_met = False
-            break
-    
-    if not prerequisites_met:
-        return {
-            'total': 0,
-            'prerequisites_met': False,
-            'reason': 'پیشنیازهای درس تکمیل نشده است'
-        }
-    
-    # Base weight
-    base_weight = 50
-    
-    # Dependency weight: courses that need this course as prerequisite
-    dependent_count = CourseRequirement.objects.filter(
-        prerequisite=course
-    ).count()
-    dependency_weight = dependent_count * 10
-    
-    # Semester alignment: is this course in the target semester?
-    is_in_target_sem = ChartNode.objects.filter(
-        schema=chart,
-        course=course,
-        semester=target_semester
-    ).exists()
-    semester_weight = 25 if is_in_target_sem else 0
-    
-    # Bonus for elective importance
-    elective_bonus = 0
-    if course.is_elective:
-        elective_bonus = 10
-    
-    total_score = base_weight + dependency_weight + semester_weight + elective_bonus
-    
-    # Cap at 100
-    total_score = min(total_score, 100)
-    
-    reason_parts = []
-    if dependent_count > 0:
-        reason_parts.append(f'پیشنیاز برای {dependent_count} درس')
-    if is_in_target_sem:
-        reason_parts.append('درس مقرر این ترم')
-    
-    reason = ' | '.join(reason_parts) if reason_parts else 'درس مهم'
-    
-    return {
-        'total': total_score,
-        'prerequisites_met': True,
-        'reason': reason,
-        'base': base_weight,
-        'dependency': dependency_weight,
-        'semester': semester_weight,
-        'elective_bonus': elective_bonus,
-    }
+    cache = get_cache()
+    key = chart_body_cache_key(chart.id)
+    cached = cache.get(key)
+    if cached is None:
+        body = ChartSchemaBodySerializer(chart).data
+        cached = {'body': body, 'hash': _content_hash(body)}
+        cache.set(key, cached)
+    return cached['body'], cached['hash']
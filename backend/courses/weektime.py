@@ -0,0 +1,66 @@
+"""
+Minute-of-week encoding of weekly class times.
+
+Course and Schedule keep the human-entered day_of_week and time fields and,
+next to them, the same interval as integers: minutes since Saturday 00:00
+(the first day of the Iranian week). Two weekly slots overlap exactly when
+start_a < end_b and start_b < end_a, which an index on the start column can
+answer without reading times back into Python.
+
+day_of_week has been stored in several spellings over time ('sat', 'Sat',
+'Saturday', '0', 'شنبه'); parse_day accepts all of them.
+"""
+
+from datetime import time
+from typing import Optional, Tuple
+
+MINUTES_PER_DAY = 24 * 60
+
+DAY_NAMES = {
+    0: ('sat', 'saturday', 'شنبه'),
+    1: ('sun', 'sunday', 'یکشنبه', 'یک‌شنبه'),
+    2: ('mon', 'monday', 'دوشنبه', 'دو‌شنبه'),
+    3: ('tue', 'tuesday', 'سه‌شنبه', 'سهشنبه', 'سه شنبه'),
+    4: ('wed', 'wednesday', 'چهارشنبه', 'چهار‌شنبه'),
+    5: ('thu', 'thursday', 'پنجشنبه', 'پنج‌شنبه', 'پنج شنبه'),
+    6: ('fri', 'friday', 'جمعه'),
+}
+
+_DAY_INDEX = {name: day for day, names in DAY_NAMES.items() for name in names}
+
+
+def parse_day(value) -> Optional[int]:
+    """Day index (Saturday = 0) of a stored day_of_week, or None if unrecognised."""
+    if value is None:
+        return None
+    text = str(value).strip().lower()
+    if text.isdigit():
+        day = int(text)
+        return day if day in DAY_NAMES else None
+    return _DAY_INDEX.get(text)
+
+
+def _minute_of_day(value) -> Optional[int]:
+    # Unsaved instances may still hold the raw '08:30' strings they were built with
+    if isinstance(value, str):
+        try:
+            value = time.fromisoformat(value)
+        except ValueError:
+            return None
+    if value is None:
+        return None
+    return value.hour * 60 + value.minute
+
+
+def week_interval(day_of_week, start_time, end_time) -> Tuple[Optional[int], Optional[int]]:
+    """
+    (start, end) minute of week of a weekly slot, or (None, None) when the
+    day is unrecognised or a time is missing.
+    """
+    day = parse_day(day_of_week)
+    start = _minute_of_day(start_time)
+    end = _minute_of_day(end_time)
+    if day is None or start is None or end is None:
+        return None, None
+    base = day * MINUTES_PER_DAY
+    return base + start, base + end
@@ -0,0 +1,211 @@
+"""
+Validation of a student's course selections for one semester (the cart).
+
+The whole cart is checked in one pass with at most seven queries however
+many courses it holds: the cart's courses, the student's passed courses,
+the requirement rows of the cart's courses (prerequisites, co-requisites,
+unit minimums), the chosen sections (only when any are chosen) and the
+seats other students have confirmed. Carts with sections also read the
+semester's section time index, which costs one more query when it has to
+be rebuilt (courses.sections). Requirements are then answered with
+bitsets over the courses involved, and time clashes with one sweep over the
+cart's weekly slots (students.conflicts), so every violation of every course
+is reported at once instead of stopping at the first.
+
+Rules:
+    prerequisite   a hard prerequisite (Prerequisite, is_corequisite=False)
+                   has not been passed; taking both together is not enough
+    corequisite    a co-requisite (CoRequisite, or Prerequisite with
+                   is_corequisite=True) is neither passed nor in the cart
+    min_units      fewer units passed than CourseRequirement.min_passed_units
+    time_clash     a weekly slot overlaps another cart course (section times
+                   when a section is chosen, the course's own slot otherwise)
+    capacity       the course or chosen section is full of confirmed seats
+    not_offered    the course or chosen section is not offered
+    section        the section is not an offering of the course this semester
+    already_passed the course was already passed
+    not_found      the course does not exist
+"""
+
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.db.models import Count
+
+from courses.graph import iter_bits
+from courses.models import CoRequisite, Course, CourseRequirement, Prerequisite, Section
+from courses.sections import get_section_index
+from .conflicts import overlapping_pairs
+from .models import StudentCourseHistory, StudentSelection
+
+MESSAGES = {
+    'prerequisite': 'پیش‌نیاز این درس گذرانده نشده است',
+    'corequisite': 'هم‌نیاز این درس نه گذرانده شده و نه انتخاب شده است',
+    'min_units': 'تعداد واحدهای گذرانده شده برای این درس کافی نیست',
+    'time_clash': 'زمان این درس با درس دیگری تداخل دارد',
+    'capacity': 'ظرفیت این درس تکمیل شده است',
+    'not_offered': 'این درس در این ترم ارائه نمی‌شود',
+    'section': 'این گروه درسی برای این درس و ترم وجود ندارد',
+    'already_passed': 'این درس قبلاً گذرانده شده است',
+    'not_found': 'درس یافت نشد',
+}
+
+
+def _violation(code: str, courses: Iterable[int] = (), **extra) -> dict:
+    violation = {'code': code, 'message': MESSAGES[code], 'courses': sorted(courses)}
+    violation.update(extra)
+    return violation
+
+
+def validate_cart(
+    student_id: int,
+    semester: str,
+    items: Iterable[Tuple[int, Optional[int]]],
+) -> Dict[int, List[dict]]:
+    """
+    Every violation of a semester cart.
+
+    Args:
+        student_id: The student whose passed courses count
+        semester: Semester of the cart (e.g. "Spring 1403")
+        items: (course ID, section ID or None) per course; a course appears
+            at most once
+
+    Returns:
+        Course ID -> its violations, for courses that have any. A violation
+        is {"code", "message", "courses"}, where "courses" names the other
+        courses involved (missing prerequisites, the clashing course, ...).
+    """
+    cart = dict(items)
+    course_ids = list(cart)
+    violations = defaultdict(list)
+    if not course_ids:
+        return {}
+
+    courses = {
+        row['id']: row for row in Course.objects.filter(id__in=course_ids).values(
+            'id', 'credits', 'capacity', 'is_offered', 'week_start_minute', 'week_end_minute'
+        )
+    }
+    for course_id in course_ids:
+        if course_id not in courses:
+            violations[course_id].append(_violation('not_found'))
+    course_ids = [course_id for course_id in course_ids if course_id in courses]
+
+    passed_credits = dict(
+        StudentCourseHistory.objects.filter(student_id=student_id, is_passed=True)
+        .values_list('course_id', 'course__credits')
+    )
+    passed_units = sum(passed_credits.values())
+
+    hard_edges = []
+    soft_edges = []
+    for course_id, other_id, is_corequisite in Prerequisite.objects.filter(
+        course_id__in=course_ids
+    ).values_list('course_id', 'prerequisite_course_id', 'is_corequisite'):
+        (soft_edges if is_corequisite else hard_edges).append((course_id, other_id))
+    soft_edges += CoRequisite.objects.filter(course_id__in=course_ids).values_list(
+        'course_id', 'corequisite_course_id'
+    )
+
+    min_units = {}
+    for course_id, units in CourseRequirement.objects.filter(
+        course_id__in=course_ids
+    ).values_list('course_id', 'min_passed_units'):
+        min_units[course_id] = max(units, min_units.get(course_id, 0))
+
+    # Bitsets over every course the cart's requirements mention
+    involved = sorted(
+        set(course_ids) | {other for edges in (hard_edges, soft_edges) for _c, other in edges}
+    )
+    bit = {course_id: i for i, course_id in enumerate(involved)}
+    passed_mask = 0
+    for course_id in passed_credits:
+        if course_id in bit:
+            passed_mask |= 1 << bit[course_id]
+    cart_mask = 0
+    for course_id in course_ids:
+        cart_mask |= 1 << bit[course_id]
+    hard_masks = defaultdict(int)
+    for course_id, other_id in hard_edges:
+        hard_masks[course_id] |= 1 << bit[other_id]
+    soft_masks = defaultdict(int)
+    for course_id, other_id in soft_edges:
+        soft_masks[course_id] |= 1 << bit[other_id]
+
+    for course_id in course_ids:
+        if passed_mask >> bit[course_id] & 1:
+            violations[course_id].append(_violation('already_passed'))
+        missing = hard_masks[course_id] & ~passed_mask
+        if missing:
+            violations[course_id].append(
+                _violation('prerequisite', (involved[i] for i in iter_bits(missing)))
+            )
+        missing = soft_masks[course_id] & ~(passed_mask | cart_mask)
+        if missing:
+            violations[course_id].append(
+                _violation('corequisite', (involved[i] for i in iter_bits(missing)))
+            )
+        if passed_units < min_units.get(course_id, 0):
+            violations[course_id].append(_violation(
+                'min_units', required=min_units[course_id], passed=passed_units
+            ))
+        if not courses[course_id]['is_offered']:
+            violations[course_id].append(_violation('not_offered'))
+
+    section_ids = [cart[course_id] for course_id in course_ids if cart[course_id]]
+    sections = {}
+    if section_ids:
+        sections = {
+            row['id']: row for row in Section.objects.filter(id__in=section_ids).values(
+                'id', 'course_id', 'semester', 'capacity', 'is_offered'
+            )
+        }
+        for course_id in course_ids:
+            section = sections.get(cart[course_id]) if cart[course_id] else None
+            if cart[course_id] and (
+                section is None or section['course_id'] != course_id or section['semester'] != semester
+            ):
+                violations[course_id].append(_violation('section'))
+                cart[course_id] = None
+            elif section is not None and not section['is_offered']:
+                violations[course_id].append(_violation('not_offered'))
+
+    # Seats: confirmed selections of other students
+    taken_by_course = defaultdict(int)
+    taken_by_section = {}
+    for row in StudentSelection.objects.filter(
+        semester=semester, course_id__in=course_ids, is_confirmed=True
+    ).exclude(student_id=student_id).values('course_id', 'section_id').annotate(taken=Count('id')):
+        taken_by_course[row['course_id']] += row['taken']
+        if row['section_id'] is not None:
+            taken_by_section[row['section_id']] = row['taken']
+    for course_id in course_ids:
+        section = sections.get(cart[course_id]) if cart[course_id] else None
+        if section is not None and section['capacity'] is not None:
+            capacity, taken = section['capacity'], taken_by_section.get(section['id'], 0)
+        else:
+            capacity, taken = courses[course_id]['capacity'], taken_by_course[course_id]
+        if capacity is not None and taken >= capacity:
+            violations[course_id].append(_violation('capacity', capacity=capacity))
+
+    intervals = []
+    index = get_section_index(semester) if any(cart[c] for c in course_ids) else None
+    for course_id in course_ids:
+        if cart[course_id]:
+            slots = index.times.get(cart[course_id], [])
+        elif courses[course_id]['week_start_minute'] is not None:
+            slots = [(courses[course_id]['week_start_minute'], courses[course_id]['week_end_minute'])]
+        else:
+            slots = []
+        intervals += [(None, start, end, course_id) for start, end in slots]
+    partners = defaultdict(set)
+    for first, second in overlapping_pairs(intervals):
+        if first != second:
+            partners[first].add(second)
+            partners[second].add(first)
+    for course_id in course_ids:
+        if partners[course_id]:
+            violations[course_id].append(_violation('time_clash', partners[course_id]))
+
+    return dict(violations)
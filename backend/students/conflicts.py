@@ -0,0 +1,115 @@
+"""
+Schedule conflict detection.
+
+Rows are grouped by student and semester, sorted by start and swept
+once: a min-heap keeps the rows still running, so every row is
+compared only with rows it actually overlaps. That is O(n log n + k) for n
+rows and k conflicting pairs, instead of one Schedule.has_conflict query
+per row.
+
+Two rows conflict under the same rule as Schedule.has_conflict: neither ends
+at or before the other starts. Rows are compared by their minute-of-week
+interval (courses.weektime); rows whose day could not be parsed fall back to
+comparing times among rows with the same day text.
+
+Single-row checks against the database (rooms, instructors) use range
+predicates on the indexed minute-of-week columns instead.
+"""
+
+import heapq
+from collections import defaultdict
+from typing import Dict, Hashable, Iterable, List, Tuple
+
+from courses.models import Course
+from students.models import Schedule
+
+
+def overlapping_pairs(intervals: Iterable[Tuple[Hashable, object, object, int]]) -> List[Tuple[int, int]]:
+    """
+    Every pair of overlapping intervals within the same group.
+
+    Args:
+        intervals: (group, start, end, id) tuples; starts and ends of one
+            group must be comparable
+
+    Returns:
+        (id, id) pairs, the earlier-starting interval first
+    """
+    groups = defaultdict(list)
+    for group, start, end, interval_id in intervals:
+        groups[group].append((start, end, interval_id))
+
+    pairs = []
+    for rows in groups.values():
+        rows.sort(key=lambda row: (row[0], row[1], row[2]))
+        running = []  # heap of (end, start, id)
+        for start, end, interval_id in rows:
+            while running and running[0][0] <= start:
+                heapq.heappop(running)
+            for _other_end, other_start, other_id in running:
+                # Zero-length rows starting together do not overlap
+                if end > other_start:
+                    pairs.append((other_id, interval_id))
+            heapq.heappush(running, (end, start, interval_id))
+    return pairs
+
+
+def _week_intervals(rows, scope):
+    """
+    Overlap-test tuples for overlapping_pairs: minute-of-week intervals,
+    or day and times for rows whose day could not be parsed.
+    """
+    for row in rows:
+        if row.week_start_minute is not None:
+            yield scope(row), row.week_start_minute, row.week_end_minute, row.id
+        else:
+            yield (*scope(row), row.day_of_week), row.start_time, row.end_time, row.id
+
+
+def overlapping(queryset, start_minute: int, end_minute: int):
+    """
+    Rows of a Schedule or Course queryset whose weekly slot overlaps
+    [start_minute, end_minute), as a range predicate on the indexed
+    minute-of-week columns.
+    """
+    return queryset.filter(week_start_minute__lt=end_minute, week_end_minute__gt=start_minute)
+
+
+def room_conflicts(schedule):
+    """Other schedule rows of the semester held in the same room at an overlapping time."""
+    if not schedule.location or schedule.week_start_minute is None:
+        return Schedule.objects.none()
+    return overlapping(
+        Schedule.objects.filter(location=schedule.location, semester=schedule.semester),
+        schedule.week_start_minute,
+        schedule.week_end_minute,
+    ).exclude(pk=schedule.pk)
+
+
+def instructor_conflicts(course):
+    """Other courses of the same instructor at an overlapping time."""
+    if not course.instructor or course.week_start_minute is None:
+        return Course.objects.none()
+    return overlapping(
+        Course.objects.filter(instructor=course.instructor),
+        course.week_start_minute,
+        course.week_end_minute,
+    ).exclude(pk=course.pk)
+
+
+def schedule_conflicts(schedules: Iterable) -> Dict[int, List[int]]:
+    """
+    Conflict partners of every Schedule row that has any.
+
+    The rows are read once; pass all rows of the students and semesters of
+    interest (filtering by semester or day loses no partners).
+
+    Returns:
+        Schedule ID -> sorted IDs of the rows it overlaps
+    """
+    partners = defaultdict(list)
+    pairs = overlapping_pairs(_week_intervals(schedules, lambda row: (row.student_id, row.semester)))
+    for first, second in pairs:
+        partners[first].append(second)
+        partners[second].append(first)
+    return {schedule_id: sorted(ids) for schedule_id, ids in partners.items()}
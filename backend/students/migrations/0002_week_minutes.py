@@ -0,0 +1,45 @@
+# Generated by Django 4.2.11 on 2026-10-17 19:18
+
+from django.db import migrations, models
+
+from courses.weektime import week_interval
+
+
+def backfill_week_minutes(apps, schema_editor):
+    Schedule = apps.get_model('students', 'Schedule')
+    rows = []
+    for row in Schedule.objects.only('id', 'day_of_week', 'start_time', 'end_time').iterator():
+        row.week_start_minute, row.week_end_minute = week_interval(
+            row.day_of_week, row.start_time, row.end_time
+        )
+        rows.append(row)
+    Schedule.objects.bulk_update(rows, ['week_start_minute', 'week_end_minute'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='schedule',
+            name='week_end_minute',
+            field=models.IntegerField(blank=True, editable=False, help_text='End of the weekly slot in minutes since Saturday 00:00', null=True),
+        ),
+        migrations.AddField(
+            model_name='schedule',
+            name='week_start_minute',
+            field=models.IntegerField(blank=True, editable=False, help_text='Start of the weekly slot in minutes since Saturday 00:00', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='schedule',
+            index=models.Index(fields=['student', 'semester', 'week_start_minute'], name='students_sc_student_f7195c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='schedule',
+            index=models.Index(fields=['location', 'semester', 'week_start_minute'], name='students_sc_locatio_6c033e_idx'),
+        ),
+        migrations.RunPython(backfill_week_minutes, migrations.RunPython.noop),
+    ]
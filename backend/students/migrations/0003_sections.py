@@ -0,0 +1,20 @@
+# Generated by Django 4.2.11 on 2026-10-17 19:21
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0008_sections'),
+        ('students', '0002_week_minutes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studentselection',
+            name='section',
+            field=models.ForeignKey(blank=True, help_text='Chosen section of the course, if any', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='student_selections', to='courses.section'),
+        ),
+    ]
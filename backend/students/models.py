@@ -3,6 +3,8 @@ from django.contrib.auth import get_user_model
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import MinValueValidator, MaxValueValidator
 
+from courses.weektime import week_interval
+
 User = get_user_model()
 
 
@@ -110,6 +112,15 @@ class StudentSelection(models.Model):
         help_text=_("Selected course")
     )
     
+    section = models.ForeignKey(
+        'courses.Section',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='student_selections',
+        help_text=_("Chosen section of the course, if any")
+    )
+    
     semester = models.CharField(
         max_length=10,
         help_text=_("Semester for selection (e.g., Spring 1403)")
@@ -204,6 +215,22 @@ class Schedule(models.Model):
         help_text=_("Semester for schedule")
     )
     
+    # day_of_week/start_time/end_time as minutes since Saturday 00:00,
+    # maintained by save() (see courses.weektime)
+    week_start_minute = models.IntegerField(
+        null=True,
+        blank=True,
+        editable=False,
+        help_text=_("Start of the weekly slot in minutes since Saturday 00:00")
+    )
+    
+    week_end_minute = models.IntegerField(
+        null=True,
+        blank=True,
+        editable=False,
+        help_text=_("End of the weekly slot in minutes since Saturday 00:00")
+    )
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -211,13 +238,36 @@ class Schedule(models.Model):
         verbose_name = _("schedule")
         verbose_name_plural = _("schedules")
         ordering = ['semester', 'day_of_week', 'start_time']
+        indexes = [
+            # Student clashes within a semester, and room clashes
+            models.Index(fields=['student', 'semester', 'week_start_minute']),
+            models.Index(fields=['location', 'semester', 'week_start_minute']),
+        ]
     
     def __str__(self):
         return f"{self.course.code} - {self.get_day_of_week_display()}"
     
+    def save(self, *args, **kwargs):
+        self.week_start_minute, self.week_end_minute = week_interval(
+            self.day_of_week, self.start_time, self.end_time
+        )
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'day_of_week', 'start_time', 'end_time'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'week_start_minute', 'week_end_minute'}
+        super().save(*args, **kwargs)
+    
     @property
     def has_conflict(self):
         """Check if this schedule conflicts with other schedules."""
+        if self.week_start_minute is not None:
+            return Schedule.objects.filter(
+                student=self.student,
+                semester=self.semester,
+                week_start_minute__lt=self.week_end_minute,
+                week_end_minute__gt=self.week_start_minute,
+            ).exclude(pk=self.pk).exists()
+        
+        # Unrecognised day: compare rows with the same day text
         conflicts = Schedule.objects.filter(
             student=self.student,
             semester=self.semester,
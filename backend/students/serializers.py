@@ -1,6 +1,8 @@
 from rest_framework import serializers
 from .models import StudentCourseHistory, StudentSelection, Schedule
+from courses.models import Section
 from courses.serializers import CourseSerializer
+from .conflicts import schedule_conflicts
 
 
 class StudentCourseHistorySerializer(serializers.ModelSerializer):
@@ -26,15 +28,30 @@ class StudentSelectionSerializer(serializers.ModelSerializer):
     """
     course = CourseSerializer(read_only=True)
     course_id = serializers.IntegerField(write_only=True)
+    section_id = serializers.IntegerField(required=False, allow_null=True)
     
     class Meta:
         model = StudentSelection
         fields = (
-            'id', 'student', 'course', 'course_id', 'semester',
+            'id', 'student', 'course', 'course_id', 'section_id', 'semester',
             'selected_at', 'is_confirmed', 'confirmed_at', 'notes',
             'created_at', 'updated_at'
         )
         read_only_fields = ('id', 'student', 'selected_at', 'created_at', 'updated_at')
+    
+    def validate(self, attrs):
+        """The section must be an offering of the selected course in the same semester."""
+        section_id = attrs.get('section_id')
+        if section_id is not None:
+            course_id = attrs.get('course_id', getattr(self.instance, 'course_id', None))
+            semester = attrs.get('semester', getattr(self.instance, 'semester', None))
+            if not Section.objects.filter(
+                pk=section_id, course_id=course_id, semester=semester
+            ).exists():
+                raise serializers.ValidationError(
+                    {'section_id': 'این گروه درسی برای این درس و ترم وجود ندارد'}
+                )
+        return attrs
 
 
 class ScheduleSerializer(serializers.ModelSerializer):
@@ -44,16 +61,35 @@ class ScheduleSerializer(serializers.ModelSerializer):
     course = CourseSerializer(read_only=True)
     course_id = serializers.IntegerField(write_only=True)
     has_conflict = serializers.SerializerMethodField()
+    conflicts_with = serializers.SerializerMethodField()
     
     class Meta:
         model = Schedule
         fields = (
             'id', 'student', 'course', 'course_id', 'day_of_week',
             'start_time', 'end_time', 'location', 'semester',
-            'has_conflict', 'created_at', 'updated_at'
+            'has_conflict', 'conflicts_with', 'created_at', 'updated_at'
+        )
+        read_only_fields = (
+            'id', 'student', 'has_conflict', 'conflicts_with', 'created_at', 'updated_at'
         )
-        read_only_fields = ('id', 'student', 'has_conflict', 'created_at', 'updated_at')
+    
+    def _partners(self, obj):
+        """
+        IDs of the rows this one overlaps, from the 'schedule_conflicts' map
+        of students.conflicts.schedule_conflicts when the view provides one.
+        """
+        preloaded = self.context.get('schedule_conflicts')
+        if preloaded is None:
+            preloaded = schedule_conflicts(
+                Schedule.objects.filter(student_id=obj.student_id, semester=obj.semester)
+            )
+        return preloaded.get(obj.id, [])
     
     def get_has_conflict(self, obj):
         """Check if schedule has conflicts."""
-        return obj.has_conflict
+        return bool(self._partners(obj))
+    
+    def get_conflicts_with(self, obj):
+        """IDs of the schedule rows this row overlaps."""
+        return self._partners(obj)
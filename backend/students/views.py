@@ -4,9 +4,14 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
 
 from .models import StudentCourseHistory, StudentSelection, Schedule
 from .serializers import StudentCourseHistorySerializer, StudentSelectionSerializer, ScheduleSerializer
+from .conflicts import schedule_conflicts
+from .cart import validate_cart
+from courses.cache import bump_history_version
 from accounts.permissions import IsStudent, IsAdminOrReadOnly
 
 User = get_user_model()
@@ -231,6 +236,7 @@ class StudentSelectionViewSet(viewsets.ModelViewSet):
     
     GET    /api/students/selections/      - Get own selections
     POST   /api/students/selections/      - Select a course
+    PUT    /api/students/selections/cart/ - Replace the semester's selections
     DELETE /api/students/selections/{id}/ - Remove selection
     """
     
@@ -252,9 +258,21 @@ class StudentSelectionViewSet(viewsets.ModelViewSet):
         
         return StudentSelection.objects.filter(student=user)
     
+    def _cart_rejected(self, violations):
+        return Response(
+            {'error': 'انتخاب واحد با قوانین آموزشی مغایرت دارد', 'violations': violations},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
     def create(self, request, *args, **kwargs):
         """
         Select a course for upcoming semester.
+        
+        The course is checked together with the student's other selections
+        of the semester (students.cart); any violation of the new course
+        rejects it with a 400 listing them. A missing co-requisite does not:
+        mutual co-requisites are added one at a time, and confirm_selections
+        checks them over the whole cart.
         """
         if request.user.role != 'student':
             return Response(
@@ -262,10 +280,111 @@ class StudentSelectionViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        # Add student to request data
-        request.data['student'] = request.user.id
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        course_id = serializer.validated_data['course_id']
+        semester = serializer.validated_data['semester']
         
-        return super().create(request, *args, **kwargs)
+        cart = dict(
+            StudentSelection.objects.filter(student=request.user, semester=semester)
+            .values_list('course_id', 'section_id')
+        )
+        if course_id in cart:
+            return Response(
+                {'error': 'این درس قبلاً انتخاب شده است'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        cart[course_id] = serializer.validated_data.get('section_id')
+        
+        violations = [
+            violation
+            for violation in validate_cart(request.user.id, semester, cart.items()).get(course_id, [])
+            if violation['code'] != 'corequisite'
+        ]
+        if violations:
+            return self._cart_rejected({course_id: violations})
+        
+        serializer.save(student=request.user)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+    
+    @action(detail=False, methods=['put'])
+    def cart(self, request):
+        """
+        Replace all selections of a semester at once.
+        PUT /api/students/selections/cart/
+        {
+            "semester": "Spring 1403",
+            "items": [{"course_id": 1, "section_id": 4}, {"course_id": 2}]
+        }
+        
+        The whole cart is validated first; if any course breaks a rule
+        nothing is changed and every violation is returned per course:
+            {"error": "...", "violations": {"2": [{"code": "prerequisite", ...}]}}
+        Courses kept in the cart keep their confirmation.
+        """
+        if request.user.role != 'student':
+            return Response(
+                {'error': 'فقط دانشجویان می‌توانند دروس را انتخاب کنند'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        semester = request.data.get('semester')
+        if not semester:
+            return Response(
+                {'error': 'semester الزامی است'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            cart = {}
+            for item in request.data.get('items') or []:
+                section_id = item.get('section_id')
+                cart[int(item['course_id'])] = int(section_id) if section_id else None
+        except (AttributeError, KeyError, TypeError, ValueError):
+            return Response(
+                {'error': 'فهرست دروس نامعتبر است'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        violations = validate_cart(request.user.id, semester, cart.items())
+        if violations:
+            return self._cart_rejected(violations)
+        
+        with transaction.atomic():
+            existing = {
+                selection.course_id: selection
+                for selection in StudentSelection.objects.filter(
+                    student=request.user, semester=semester
+                )
+            }
+            removed = [course_id for course_id in existing if course_id not in cart]
+            if removed:
+                StudentSelection.objects.filter(
+                    student=request.user, semester=semester, course_id__in=removed
+                ).delete()
+            moved = []
+            for course_id, section_id in cart.items():
+                selection = existing.get(course_id)
+                if selection is not None and selection.section_id != section_id:
+                    selection.section_id = section_id
+                    moved.append(selection)
+            if moved:
+                StudentSelection.objects.bulk_update(moved, ['section'])
+            added = [
+                StudentSelection(
+                    student=request.user, course_id=course_id, section_id=section_id, semester=semester
+                )
+                for course_id, section_id in cart.items() if course_id not in existing
+            ]
+            if added:
+                StudentSelection.objects.bulk_create(added)
+                # bulk_create sends no post_save
+                bump_history_version(request.user.id)
+        
+        selections = StudentSelection.objects.filter(
+            student=request.user, semester=semester
+        ).select_related('course')
+        serializer = StudentSelectionSerializer(selections, many=True)
+        return Response({'semester': semester, 'selections': serializer.data})
     
     @action(detail=False, methods=['post'])
     def confirm_selections(self, request):
@@ -275,6 +394,9 @@ class StudentSelectionViewSet(viewsets.ModelViewSet):
         {
             "semester": "Spring 1403"
         }
+        
+        The selections are validated as one cart first; nothing is
+        confirmed while any course breaks a rule.
         """
         if request.user.role != 'student':
             return Response(
@@ -294,7 +416,12 @@ class StudentSelectionViewSet(viewsets.ModelViewSet):
             semester=semester
         )
         
-        from django.utils import timezone
+        violations = validate_cart(
+            request.user.id, semester, selections.values_list('course_id', 'section_id')
+        )
+        if violations:
+            return self._cart_rejected(violations)
+        
         selections.update(is_confirmed=True, confirmed_at=timezone.now())
         
         serializer = StudentSelectionSerializer(selections, many=True)
@@ -326,9 +453,36 @@ class ScheduleViewSet(viewsets.ModelViewSet):
         user = self.request.user
         
         if user.role == 'admin':
-            return Schedule.objects.all()
+            return Schedule.objects.select_related('course')
         
-        return Schedule.objects.filter(student=user)
+        return Schedule.objects.filter(student=user).select_related('course')
+    
+    def list(self, request, *args, **kwargs):
+        """
+        List schedule rows, each annotated with its conflict partners.
+        
+        Partners are found in one sweep (students.conflicts) over the rows
+        of the students and semesters on the current page only, so an
+        admin listing does not read every schedule in the system per page.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        rows = list(page if page is not None else queryset)
+        
+        context = self.get_serializer_context()
+        context['schedule_conflicts'] = schedule_conflicts(
+            queryset.filter(
+                student_id__in={row.student_id for row in rows},
+                semester__in={row.semester for row in rows},
+            ).select_related(None).only(
+                'id', 'student_id', 'semester', 'day_of_week', 'start_time', 'end_time',
+                'week_start_minute', 'week_end_minute'
+            )
+        ) if rows else {}
+        serializer = self.get_serializer(rows, many=True, context=context)
+        if page is not None:
+            return self.get_paginated_response(serializer.data)
+        return Response(serializer.data)
     
     def create(self, request, *args, **kwargs):
         """
@@ -358,16 +512,18 @@ class ScheduleViewSet(viewsets.ModelViewSet):
         
         semester = request.query_params.get('semester')
         
-        schedules = Schedule.objects.filter(student=request.user)
+        schedules = Schedule.objects.filter(student=request.user).select_related('course')
         if semester:
             schedules = schedules.filter(semester=semester)
+        schedules = list(schedules)
         
-        conflicts = []
-        for schedule in schedules:
-            if schedule.has_conflict:
-                conflicts.append(ScheduleSerializer(schedule).data)
+        partners = schedule_conflicts(schedules)
+        conflicting = [schedule for schedule in schedules if schedule.id in partners]
+        serializer = ScheduleSerializer(
+            conflicting, many=True, context={'schedule_conflicts': partners}
+        )
         
         return Response({
-            'total_conflicts': len(conflicts),
-            'conflicts': conflicts
+            'total_conflicts': len(conflicting),
+            'conflicts': serializer.data
         })
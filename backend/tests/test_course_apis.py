@@ -0,0 +1,543 @@
+"""
+Course catalog API tests
+
+Tests for prerequisite management endpoints:
+1. update_prerequisites applies the proposed set atomically
+2. Circular dependencies are rejected, reporting every offending edge
+3. The catalog change feed returns rows changed since a version, with tombstones
+4. Section time clash checks through the interval tree index
+5. Conflict-free timetable enumeration over course sections
+"""
+
+import random
+from datetime import time, timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+
+from courses.models import (
+    CatalogChange, ChartNode, ChartSchema, Course, CourseGroup, DegreeChart, ChartCourse, Prerequisite, CoRequisite,
+    Section, SectionTime,
+)
+from courses.sections import IntervalTree, get_section_index
+from courses.timetables import Alternative, enumerate_timetables
+from students.models import StudentSelection
+
+User = get_user_model()
+
+
+class UpdatePrerequisitesTest(APITestCase):
+    """Tests for CourseViewSet.update_prerequisites"""
+
+    def setUp(self):
+        """Set up a small chain: CS101 -> CS201 -> CS301"""
+        self.client = APIClient()
+        self.admin = User.objects.create_user(
+            username='admin1',
+            email='admin@test.com',
+            password='testpass123',
+            role='admin'
+        )
+        self.client.force_authenticate(user=self.admin)
+
+        self.degree_chart = DegreeChart.objects.create(
+            name='CS', code='CS', department='Engineering', total_credits=120
+        )
+        self.courses = {}
+        for code in ['CS101', 'CS201', 'CS301', 'MATH101']:
+            self.courses[code] = Course.objects.create(
+                code=code, name=code, credits=3, unit_type='theory'
+            )
+            ChartCourse.objects.create(
+                degree_chart=self.degree_chart, course=self.courses[code]
+            )
+
+        Prerequisite.objects.create(
+            course=self.courses['CS201'], prerequisite_course=self.courses['CS101']
+        )
+        Prerequisite.objects.create(
+            course=self.courses['CS301'], prerequisite_course=self.courses['CS201']
+        )
+
+    def url(self, code):
+        return f"/api/courses/list/{self.courses[code].id}/update_prerequisites/"
+
+    def test_replace_prerequisites(self):
+        """Test that the proposed set replaces the old one"""
+        response = self.client.put(
+            self.url('CS301'),
+            {
+                'prerequisites': [self.courses['MATH101'].id, self.courses['CS201'].id],
+                'corequisites': [self.courses['CS101'].id],
+            },
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            set(Prerequisite.objects.filter(course=self.courses['CS301'])
+                .values_list('prerequisite_course__code', flat=True)),
+            {'CS201', 'MATH101'}
+        )
+        self.assertTrue(CoRequisite.objects.filter(
+            course=self.courses['CS301'], corequisite_course=self.courses['CS101']
+        ).exists())
+        self.assertEqual(
+            ChartCourse.objects.get(course=self.courses['MATH101']).importance_score, 1
+        )
+
+    def test_circular_dependency_rejected_without_changes(self):
+        """Test that every offending edge is reported and nothing is written"""
+        response = self.client.put(
+            self.url('CS101'),
+            {
+                'prerequisites': [
+                    self.courses['CS201'].id,
+                    self.courses['CS301'].id,
+                    self.courses['MATH101'].id,
+                ],
+            },
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            [edge['prerequisite_code'] for edge in response.data['circular_dependencies']],
+            ['CS201', 'CS301']
+        )
+        self.assertFalse(Prerequisite.objects.filter(course=self.courses['CS101']).exists())
+
+    def test_missing_course(self):
+        """Test that unknown course ids are reported"""
+        response = self.client.put(
+            self.url('CS101'),
+            {'prerequisites': [999999]},
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(response.data['missing_course_ids'], [999999])
+
+    def test_query_count_does_not_grow_with_edges(self):
+        """Test that replacing many edges refreshes derived data once"""
+        others = [
+            Course.objects.create(code=f'X{i}', name=f'X{i}', credits=3) for i in range(30)
+        ]
+
+        def put(ids):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.put(
+                    self.url('MATH101'), {'prerequisites': ids}, format='json'
+                )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return len(queries)
+
+        added = put([course.id for course in others])
+        old_edges = list(
+            Prerequisite.objects.filter(course=self.courses['MATH101']).values_list('id', flat=True)
+        )
+        removed = put([])
+        self.assertLessEqual(removed, added)
+        self.assertLess(removed, 25)
+        self.assertFalse(Prerequisite.objects.filter(course=self.courses['MATH101']).exists())
+        self.assertEqual(
+            sorted(CatalogChange.objects.filter(
+                table=CatalogChange.PREREQUISITE, action=CatalogChange.DELETE
+            ).values_list('object_id', flat=True)),
+            sorted(old_edges)
+        )
+
+
+@override_settings(CATALOG_SYNC_SETTLE_SECONDS=0)
+class CatalogChangeFeedTest(APITestCase):
+    """Tests for /api/courses/changes/"""
+
+    url = '/api/courses/changes/'
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='student1',
+            email='student@test.com',
+            password='testpass123',
+            role='student'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.cs101 = Course.objects.create(code='CS101', name='CS101', credits=3)
+        self.cs201 = Course.objects.create(code='CS201', name='CS201', credits=3)
+        self.edge = Prerequisite.objects.create(course=self.cs201, prerequisite_course=self.cs101)
+
+    def sync(self, since):
+        response = self.client.get(self.url, {'since': since})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_first_sync_returns_everything(self):
+        """Test that without a version every row is returned"""
+        data = self.client.get(self.url).data
+        self.assertTrue(data['full'])
+        self.assertEqual(
+            sorted(row['code'] for row in data['changes']['courses']), ['CS101', 'CS201']
+        )
+        self.assertEqual(data['changes']['prerequisites'][0]['course_id'], self.cs201.id)
+        self.assertGreater(data['version'], 0)
+
+    def test_delta_contains_only_changed_rows(self):
+        """Test that only rows touched after the version are returned"""
+        version = self.sync(0)['version']
+        self.cs101.name = 'Programming'
+        self.cs101.save()
+        group = CourseGroup.objects.create(code='ELEC', name='Electives')
+        group.courses.add(self.cs201)
+
+        data = self.sync(version)
+        self.assertFalse(data['full'])
+        self.assertEqual([row['name'] for row in data['changes']['courses']], ['Programming'])
+        self.assertEqual(data['changes']['course_groups'][0]['course_ids'], [self.cs201.id])
+        self.assertEqual(data['changes']['prerequisites'], [])
+        self.assertEqual(self.sync(data['version'])['changes']['courses'], [])
+
+    def test_deletes_are_tombstones(self):
+        """Test that deleted rows, including cascaded ones, come back as ids"""
+        version = self.sync(0)['version']
+        course_id, edge_id = self.cs101.id, self.edge.id
+        self.cs101.delete()
+
+        data = self.sync(version)
+        self.assertEqual(data['deleted']['courses'], [course_id])
+        self.assertEqual(data['deleted']['prerequisites'], [edge_id])
+        self.assertEqual(data['changes']['courses'], [])
+
+    def test_bulk_prerequisite_update_is_logged(self):
+        """Test that update_prerequisites records the rows it bulk-creates"""
+        admin = User.objects.create_user(
+            username='admin1', email='admin@test.com', password='testpass123', role='admin'
+        )
+        version = self.sync(0)['version']
+        cs301 = Course.objects.create(code='CS301', name='CS301', credits=3)
+        self.client.force_authenticate(user=admin)
+        self.client.put(
+            f'/api/courses/list/{cs301.id}/update_prerequisites/',
+            {'prerequisites': [self.cs201.id], 'corequisites': [self.cs101.id]},
+            format='json'
+        )
+
+        data = self.sync(version)
+        self.assertEqual(
+            [row['prerequisite_course_id'] for row in data['changes']['prerequisites']],
+            [self.cs201.id]
+        )
+        self.assertEqual(
+            [row['corequisite_course_id'] for row in data['changes']['corequisites']],
+            [self.cs101.id]
+        )
+
+    def test_chart_node_depths_are_synced(self):
+        """Test that recomputed critical-path depths reach the feed"""
+        schema = ChartSchema.objects.create(
+            code='CS-BS', name='CS', major='CS', entry_year_start=1400, entry_year_end=1405
+        )
+        ChartNode.objects.create(schema=schema, semester=2, position=0, course=self.cs201)
+        version = self.sync(0)['version']
+        ChartNode.objects.create(schema=schema, semester=1, position=0, course=self.cs101)
+
+        nodes = {row['course_id']: row for row in self.sync(version)['changes']['chart_nodes']}
+        self.assertEqual(nodes[self.cs101.id]['critical_path_depth'], 1)
+
+    def test_pages_and_invalid_version(self):
+        """Test paging with has_more and rejection of a bad version"""
+        from courses import changes
+        version = self.sync(0)['version']
+        for course in (self.cs101, self.cs201):
+            course.save()
+        page = changes.changes_since(version, limit=1)
+        self.assertTrue(page['has_more'])
+        self.assertEqual(page['version'], version + 1)
+        self.assertFalse(changes.changes_since(page['version'], limit=1)['has_more'])
+
+        response = self.client.get(self.url, {'since': 'abc'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_fresh_entries_are_held_back(self):
+        """Test that entries inside the settle window are not handed out yet"""
+        CatalogChange.objects.update(created_at=timezone.now() - timedelta(minutes=5))
+        version = self.sync(0)['version']
+        self.cs101.save()
+        with override_settings(CATALOG_SYNC_SETTLE_SECONDS=60):
+            data = self.sync(version)
+            self.assertEqual(data['version'], version)
+            self.assertEqual(data['changes']['courses'], [])
+            self.assertEqual(self.sync(0)['version'], version)
+
+        CatalogChange.objects.filter(id__gt=version).update(
+            created_at=timezone.now() - timedelta(minutes=5)
+        )
+        with override_settings(CATALOG_SYNC_SETTLE_SECONDS=60):
+            data = self.sync(version)
+        self.assertEqual([row['id'] for row in data['changes']['courses']], [self.cs101.id])
+
+    def test_pruned_version_gets_a_fresh_snapshot(self):
+        """Test that pruning keeps the newest entry and old versions resync"""
+        version = self.sync(0)['version']
+        self.cs101.save()
+        self.cs201.save()
+        CatalogChange.objects.update(created_at=timezone.now() - timedelta(days=100))
+
+        out = StringIO()
+        call_command('prune_catalog_changes', '--days', '90', stdout=out)
+        self.assertIn(f'Pruned {version + 1} catalog change(s)', out.getvalue())
+        self.assertEqual(list(CatalogChange.objects.values_list('id', flat=True)), [version + 2])
+
+        data = self.sync(version)
+        self.assertTrue(data['full'])
+        self.assertTrue(data['expired'])
+        self.assertEqual(data['version'], version + 2)
+        self.assertFalse(self.sync(version + 1).get('expired', False))
+
+
+class SectionClashTest(APITestCase):
+    """Tests for courses.sections and /api/courses/sections/clashes/"""
+
+    semester = 'Fall 1403'
+
+    def setUp(self):
+        self.client = APIClient()
+        self.student = User.objects.create_user(
+            username='student1', email='student@test.com', password='testpass123', role='student'
+        )
+        self.client.force_authenticate(user=self.student)
+        self.sections = {}
+        slots = {
+            'DB-1': [('sat', 8, 10), ('mon', 8, 10)],
+            'DB-2': [('sun', 10, 12)],
+            'OS-1': [('mon', 9, 11)],
+            'OS-2': [('tue', 8, 10)],
+            'AI-1': [('sun', 11, 13)],
+        }
+        for key, times in slots.items():
+            code, number = key.split('-')
+            course, _ = Course.objects.get_or_create(code=code, defaults={'name': code, 'credits': 3})
+            section = Section.objects.create(course=course, semester=self.semester, number=number)
+            for day, start, end in times:
+                SectionTime.objects.create(
+                    section=section, day_of_week=day, start_time=time(start), end_time=time(end)
+                )
+            self.sections[key] = section
+
+    def pick(self, key):
+        section = self.sections[key]
+        StudentSelection.objects.create(
+            student=self.student, course=section.course, section=section, semester=self.semester
+        )
+
+    def clashes(self, *keys):
+        ids = ','.join(str(self.sections[key].id) for key in keys)
+        response = self.client.get(
+            '/api/courses/sections/clashes/', {'semester': self.semester, 'sections': ids}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return {row['section_id']: row['sections'] for row in response.data['results']}
+
+    def test_interval_tree_matches_brute_force(self):
+        """Test the tree against a linear scan on random intervals"""
+        rng = random.Random(7)
+        intervals = []
+        for value in range(300):
+            start = rng.randrange(0, 10000)
+            intervals.append((start, start + rng.randrange(0, 200), value))
+        tree = IntervalTree(intervals)
+        for _ in range(200):
+            start = rng.randrange(0, 10000)
+            end = start + rng.randrange(0, 300)
+            expected = sorted(v for s, e, v in intervals if s < end and e > start)
+            self.assertEqual(sorted(tree.overlapping(start, end)), expected)
+
+    def test_clashes_with_picked_sections(self):
+        """Test candidates against picks, ignoring the candidate's own course"""
+        self.pick('DB-1')
+        self.pick('AI-1')
+        result = self.clashes('OS-1', 'OS-2', 'DB-2')
+        self.assertEqual(result[self.sections['OS-1'].id], [self.sections['DB-1'].id])
+        self.assertEqual(result[self.sections['OS-2'].id], [])
+        # DB-2 would replace DB-1 but still overlaps AI-1 on Sunday
+        self.assertEqual(result[self.sections['DB-2'].id], [self.sections['AI-1'].id])
+
+    def test_only_picked_slots_are_searched(self):
+        """Test that a crowded time slot does not grow the clash check"""
+        crowd = Course.objects.create(code='GEN', name='GEN', credits=2)
+        for number in range(40):
+            section = Section.objects.create(course=crowd, semester=self.semester, number=str(number))
+            SectionTime.objects.create(
+                section=section, day_of_week='mon', start_time=time(8), end_time=time(12)
+            )
+        index = get_section_index(self.semester)
+        picked = index.picked_tree([self.sections['DB-1'].id])
+        self.assertEqual(len(picked), 2)
+        self.assertEqual(
+            index.clashing_sections(self.sections['OS-1'].id, picked), [self.sections['DB-1'].id]
+        )
+        self.assertEqual(
+            index.clashing_sections(self.sections['OS-1'].id, [self.sections['AI-1'].id]), []
+        )
+
+    def test_index_is_reused_and_rebuilt(self):
+        """Test one query per request with a warm index, and rebuild on change"""
+        self.pick('DB-1')
+        get_section_index(self.semester)
+        ids = ','.join(str(section.id) for section in self.sections.values())
+        with self.assertNumQueries(1):
+            self.client.get(
+                '/api/courses/sections/clashes/', {'semester': self.semester, 'sections': ids}
+            )
+
+        SectionTime.objects.filter(section=self.sections['OS-2']).get().delete()
+        SectionTime.objects.create(
+            section=self.sections['OS-2'], day_of_week='sat', start_time=time(9), end_time=time(10)
+        )
+        self.assertEqual(
+            self.clashes('OS-2')[self.sections['OS-2'].id], [self.sections['DB-1'].id]
+        )
+
+
+class TimetableEnumeratorTest(APITestCase):
+    """Tests for courses.timetables and /api/courses/sections/timetables/"""
+
+    semester = 'Fall 1403'
+
+    def setUp(self):
+        self.client = APIClient()
+        self.student = User.objects.create_user(
+            username='student1', email='student@test.com', password='testpass123', role='student'
+        )
+        self.client.force_authenticate(user=self.student)
+        self.db = Course.objects.create(code='DB', name='DB', credits=3)
+        self.os = Course.objects.create(code='OS', name='OS', credits=3)
+        self.ai = Course.objects.create(code='AI', name='AI', credits=3)
+        self.sections = {}
+        for key, course, day, start, end in [
+            ('DB-1', self.db, 'sat', 8, 10),
+            ('DB-2', self.db, 'sun', 10, 12),
+            ('OS-1', self.os, 'sat', 9, 11),
+            ('OS-2', self.os, 'sun', 14, 16),
+            ('AI-1', self.ai, 'sun', 11, 13),
+        ]:
+            section = Section.objects.create(
+                course=course, semester=self.semester, number=key.split('-')[1]
+            )
+            SectionTime.objects.create(
+                section=section, day_of_week=day, start_time=time(start), end_time=time(end)
+            )
+            self.sections[key] = section
+
+    def enumerate(self, **data):
+        data.setdefault('semester', self.semester)
+        data.setdefault('course_ids', [self.db.id, self.os.id])
+        response = self.client.post('/api/courses/sections/timetables/', data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def picked(self, timetable):
+        return [row['section_id'] for row in timetable['sections']]
+
+    def test_ranked_by_days_then_early_sessions(self):
+        """Test every clash-free combination, fewest campus days first"""
+        data = self.enumerate()
+        self.assertFalse(data['truncated'])
+        s = self.sections
+        self.assertEqual([self.picked(t) for t in data['timetables']], [
+            [s['DB-2'].id, s['OS-2'].id],
+            [s['DB-2'].id, s['OS-1'].id],
+            [s['DB-1'].id, s['OS-2'].id],
+        ])
+        self.assertEqual(data['timetables'][0]['campus_days'], 1)
+        self.assertEqual(data['timetables'][2]['early_sessions'], 1)
+
+    def test_other_picks_stay_fixed(self):
+        """Test timetables are built around the student's other picks"""
+        StudentSelection.objects.create(
+            student=self.student, course=self.ai, section=self.sections['AI-1'], semester=self.semester
+        )
+        data = self.enumerate()
+        self.assertEqual(
+            [self.picked(t) for t in data['timetables']],
+            [[self.sections['DB-1'].id, self.sections['OS-2'].id]],
+        )
+        self.assertEqual(data['timetables'][0]['days'], [0, 1])
+
+        data = self.enumerate(course_ids=[self.db.id])
+        self.assertEqual(len(data['timetables']), 1)
+        SectionTime.objects.create(
+            section=self.sections['OS-1'], day_of_week='sat', start_time=time(7), end_time=time(8)
+        )
+        StudentSelection.objects.create(
+            student=self.student, course=self.os, section=self.sections['OS-1'], semester=self.semester
+        )
+        data = self.enumerate(course_ids=[self.db.id])
+        self.assertEqual(data['unplaceable'], [self.db.id])
+        self.assertEqual(data['timetables'], [])
+
+    def test_preference_flags_parse_strings(self):
+        """Test "false" turns a preference off instead of counting as true"""
+        data = self.enumerate(avoid_early='false', fewest_days='0')
+        self.assertEqual([t['early_sessions'] for t in data['timetables']], [0, 0, 0])
+        data = self.enumerate(avoid_early='true')
+        self.assertEqual(data['timetables'][2]['early_sessions'], 1)
+
+        response = self.client.post('/api/courses/sections/timetables/', {
+            'semester': self.semester, 'course_ids': [self.db.id], 'avoid_early': 'maybe',
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_invalid_requests(self):
+        """Test missing semester and unknown courses"""
+        url = '/api/courses/sections/timetables/'
+        response = self.client.post(url, {'course_ids': [self.db.id]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(
+            url, {'semester': self.semester, 'course_ids': [self.db.id, 99999]}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_matches_brute_force_and_respects_caps(self):
+        """Test the pruned search against trying every combination"""
+        rng = random.Random(11)
+        alternatives = {}
+        for course_id in range(5):
+            alternatives[course_id] = []
+            for section_id in range(4):
+                slots = []
+                for _ in range(2):
+                    start = rng.randrange(7) * 1440 + rng.randrange(8, 17) * 60
+                    slots.append((start, start + 90))
+                alternatives[course_id].append(
+                    Alternative(course_id, course_id * 10 + section_id, str(section_id), '', slots)
+                )
+
+        def clash(a, b):
+            return any(s1 < e2 and s2 < e1 for s1, e1 in a.slots for s2, e2 in b.slots)
+
+        expected = 0
+        combos = [[]]
+        for options in alternatives.values():
+            combos = [combo + [option] for combo in combos for option in options]
+        for combo in combos:
+            if not any(clash(a, b) for i, a in enumerate(combo) for b in combo[i + 1:]):
+                expected += 1
+
+        found = enumerate_timetables(alternatives, limit=10000)
+        self.assertEqual(len(found['timetables']), expected)
+        costs = [timetable['cost'] for timetable in found['timetables']]
+        self.assertEqual(costs, sorted(costs))
+
+        top = enumerate_timetables(alternatives, limit=3)
+        self.assertEqual([t['cost'] for t in top['timetables']], costs[:3])
+
+        capped = enumerate_timetables(alternatives, limit=10000, max_nodes=5)
+        self.assertTrue(capped['truncated'])
@@ -0,0 +1,810 @@
+"""
+Degree chart (PRD 3.1) tests
+
+Tests for:
+1. Graduation planner: prerequisites, unit requirements and credit cap
+2. Planner speed on a full 140-credit chart
+3. The plan endpoint for the requesting student's chart
+4. Precomputed recommendation snapshots and their freshness
+5. Student number to ChartSchema resolution and Profile.chart_schema
+6. Cached my_chart bodies with ETag validation
+7. Query count of chart serialization
+8. Compact chart graph export
+9. Batch priority scoring of a semester's recommendations
+10. Best-elective resolution of elective slots
+11. Direct and transitive unlocks index
+12. Recomputing chart node depths from the command line
+"""
+
+from io import StringIO
+
+from django.core.management import call_command
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.test import TestCase
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+
+from accounts.models import Profile
+from courses.models import (
+    ChartNode, ChartSchema, CoRequisite, Course, CourseGroup, CourseRequirement, Prerequisite,
+    RecommendationSnapshot,
+)
+from courses.chart_recommendations import calculate_priority_score, compute_chart_recommendations
+from courses.chart_resolver import get_chart_index, resolve_chart_schema, resolve_many
+from courses.importance import schema_course_depths
+from courses.planner import GraduationPlanner
+from courses.serializers_chart import ChartSchemaBodySerializer
+from courses.snapshots import precompute_chunk
+from courses.unlocks import UnlocksIndex, get_unlocks_index
+from students.models import StudentCourseHistory
+
+User = get_user_model()
+
+
+def make_schema(code='CS-BS-00-05', major='CS'):
+    # Committed, as far as the chart index is concerned
+    with TestCase.captureOnCommitCallbacks(execute=True):
+        return ChartSchema.objects.create(
+            name=code, code=code, major=major, degree='12',
+            entry_year_start=1400, entry_year_end=1405, total_credits=140,
+        )
+
+
+class GraduationPlannerTest(APITestCase):
+    """Tests for courses.planner.GraduationPlanner"""
+
+    def setUp(self):
+        """Chain MATH1 -> MATH2 -> MATH3, a capstone behind 12 units, one elective slot"""
+        self.schema = make_schema()
+        self.courses = {}
+        for semester, code in enumerate(['MATH1', 'MATH2', 'MATH3', 'PHYS', 'CAPSTONE'], 1):
+            self.courses[code] = Course.objects.create(
+                code=code, name=code, credits=3, unit_type='theory'
+            )
+            ChartNode.objects.create(
+                schema=self.schema, semester=min(semester, 8), course=self.courses[code]
+            )
+        Prerequisite.objects.create(
+            course=self.courses['MATH2'], prerequisite_course=self.courses['MATH1']
+        )
+        Prerequisite.objects.create(
+            course=self.courses['MATH3'], prerequisite_course=self.courses['MATH2']
+        )
+        CourseRequirement.objects.create(course=self.courses['CAPSTONE'], min_passed_units=12)
+
+        group = CourseGroup.objects.create(name='Technical Electives', code='TECH')
+        for code in ['AI', 'DB']:
+            self.courses[code] = Course.objects.create(
+                code=code, name=code, credits=3, unit_type='theory'
+            )
+            group.courses.add(self.courses[code])
+        Prerequisite.objects.create(
+            course=self.courses['AI'], prerequisite_course=self.courses['MATH3']
+        )
+        ChartNode.objects.create(schema=self.schema, semester=6, course_group=group)
+
+    def test_plan_respects_prerequisites_units_and_cap(self):
+        """Test a minimal plan that keeps every constraint"""
+        result = GraduationPlanner(self.schema, [], credit_cap=6).plan()
+
+        self.assertTrue(result['optimal'])
+        self.assertEqual(result['total_semesters'], 3)
+        self.assertEqual(result['unschedulable'], [])
+
+        semester_of = {}
+        for semester in result['semesters']:
+            self.assertLessEqual(semester['credits'], 6)
+            for course in semester['courses']:
+                semester_of[course['code']] = semester['semester']
+        self.assertEqual(set(semester_of), {'MATH1', 'MATH2', 'MATH3', 'PHYS', 'CAPSTONE', 'DB'})
+        self.assertLess(semester_of['MATH1'], semester_of['MATH2'])
+        self.assertLess(semester_of['MATH2'], semester_of['MATH3'])
+        # 12 units are only passed after four courses
+        self.assertEqual(semester_of['CAPSTONE'], 3)
+
+    def test_passed_courses_are_skipped(self):
+        """Test that passed courses and filled elective slots are not planned"""
+        passed = [self.courses[code].id for code in ['MATH1', 'MATH2', 'PHYS', 'AI']]
+        result = GraduationPlanner(self.schema, passed, credit_cap=20).plan(start_semester=3)
+
+        planned = [c['code'] for s in result['semesters'] for c in s['courses']]
+        self.assertEqual(sorted(planned), ['CAPSTONE', 'MATH3'])
+        self.assertEqual(result['total_semesters'], 1)
+        self.assertEqual(result['semesters'][0]['semester'], 3)
+
+    def test_missing_prerequisite_is_unschedulable(self):
+        """Test that courses behind a prerequisite outside the chart are reported"""
+        outside = Course.objects.create(code='EXT', name='EXT', credits=3, unit_type='theory')
+        Prerequisite.objects.create(course=self.courses['PHYS'], prerequisite_course=outside)
+
+        result = GraduationPlanner(self.schema, [], credit_cap=20).plan()
+
+        self.assertEqual([c['code'] for c in result['unschedulable']], ['PHYS'])
+
+    def test_full_chart_is_interactive(self):
+        """Test that a 140-credit chart is planned without extra queries or timing out"""
+        schema = make_schema('EE-BS-00-05', major='EE')
+        previous = []
+        for i in range(47):
+            course = Course.objects.create(
+                code=f'L{i:03d}', name=f'L{i}', credits=3, unit_type='theory'
+            )
+            ChartNode.objects.create(
+                schema=schema, semester=i // 6 + 1, position=i % 6, course=course
+            )
+            # Six parallel chains of prerequisites
+            if i >= 6:
+                Prerequisite.objects.create(course=course, prerequisite_course=previous[i - 6])
+            previous.append(course)
+
+        # Graph, edges, chart nodes and unit requirements, whatever the
+        # chart's size; the search itself never touches the database
+        with self.assertNumQueries(4):
+            planner = GraduationPlanner(schema, [], credit_cap=20)
+        with self.assertNumQueries(0):
+            result = planner.plan(budget_seconds=10)
+
+        self.assertFalse(result['timed_out'])
+        self.assertEqual(sum(s['credits'] for s in result['semesters']), 141)
+        self.assertEqual(result['total_semesters'], result['lower_bound'])
+
+
+class GraduationPlanEndpointTest(APITestCase):
+    """Tests for DegreeChartViewSet.plan"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.student = User.objects.create_user(
+            username='student1', password='testpass123', role='student'
+        )
+        self.student.profile.student_number = '0021012345'
+        self.student.profile.save()
+        self.client.force_authenticate(user=self.student)
+
+        self.schema = make_schema()
+        self.intro = Course.objects.create(code='INTRO', name='INTRO', credits=3, unit_type='theory')
+        self.advanced = Course.objects.create(code='ADV', name='ADV', credits=3, unit_type='theory')
+        ChartNode.objects.create(schema=self.schema, semester=1, course=self.intro)
+        ChartNode.objects.create(schema=self.schema, semester=2, course=self.advanced)
+        Prerequisite.objects.create(course=self.advanced, prerequisite_course=self.intro)
+
+    def test_plan(self):
+        """Test the plan for a student with one passed semester"""
+        StudentCourseHistory.objects.create(
+            student=self.student, course=self.intro, grade='A', grade_points=4.0,
+            credits_earned=3, semester='Fall 1400', is_passed=True
+        )
+
+        response = self.client.get('/api/courses/degrees/plan/')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['schema_id'], self.schema.id)
+        self.assertEqual(response.data['semesters'][0]['semester'], 2)
+        self.assertEqual(
+            [c['code'] for c in response.data['semesters'][0]['courses']], ['ADV']
+        )
+
+    def test_invalid_credit_cap(self):
+        """Test that an out-of-range credit cap is rejected"""
+        response = self.client.get('/api/courses/degrees/plan/', {'credit_cap': 0})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class RecommendationSnapshotTest(APITestCase):
+    """Tests for precomputed /degrees/recommendations/ responses"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.schema = make_schema()
+        self.intro = Course.objects.create(code='INTRO', name='INTRO', credits=3, unit_type='theory')
+        self.advanced = Course.objects.create(code='ADV', name='ADV', credits=3, unit_type='theory')
+        self.physics = Course.objects.create(code='PHYS', name='PHYS', credits=3, unit_type='theory')
+        ChartNode.objects.create(schema=self.schema, semester=1, position=1, course=self.intro)
+        ChartNode.objects.create(schema=self.schema, semester=1, position=2, course=self.physics)
+        ChartNode.objects.create(schema=self.schema, semester=2, course=self.advanced)
+        Prerequisite.objects.create(course=self.advanced, prerequisite_course=self.intro)
+
+        self.students = []
+        for i in range(3):
+            student = User.objects.create_user(
+                username=f'student{i}', password='testpass123', role='student'
+            )
+            student.profile.student_number = f'002101000{i}'
+            student.profile.save()
+            self.students.append(student)
+
+    def test_command_fills_snapshots_and_resumes(self):
+        """Test that a second run skips the students that are already fresh"""
+        call_command('precompute_recommendations', workers=1, chunk_size=2, stdout=StringIO())
+
+        snapshot = RecommendationSnapshot.objects.get(student=self.students[0])
+        self.assertEqual(snapshot.semester, 1)
+        self.assertEqual(
+            [r['code'] for r in snapshot.payload['recommendations']], ['INTRO', 'PHYS']
+        )
+        self.assertEqual(
+            snapshot.payload['recommendations'][0]['unlocks'], [self.advanced.id]
+        )
+
+        ids = [student.id for student in self.students]
+        self.assertEqual(precompute_chunk(ids), (0, 3))
+
+    def test_view_serves_snapshot(self):
+        """Test that the view answers from the table without recomputing"""
+        precompute_chunk([self.students[0].id])
+        snapshot = RecommendationSnapshot.objects.get(student=self.students[0])
+        snapshot.payload = {'next_semester': 1, 'recommendations': [], 'marker': True}
+        snapshot.save()
+
+        self.client.force_authenticate(user=self.students[0])
+        response = self.client.get('/api/courses/degrees/recommendations/')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['marker'])
+
+    def test_history_change_recomputes(self):
+        """Test that a snapshot older than the student's history is not served"""
+        student = self.students[0]
+        precompute_chunk([student.id])
+        StudentCourseHistory.objects.create(
+            student=student, course=self.intro, grade='A', grade_points=4.0,
+            credits_earned=3, semester='Fall 1400', is_passed=True
+        )
+
+        self.client.force_authenticate(user=student)
+        response = self.client.get('/api/courses/degrees/recommendations/')
+
+        self.assertEqual(response.data['next_semester'], 2)
+        self.assertEqual([r['code'] for r in response.data['recommendations']], ['ADV'])
+        self.assertTrue(
+            RecommendationSnapshot.objects.filter(student=student, semester=2).exists()
+        )
+
+    def test_chart_change_drops_snapshots(self):
+        """Test that editing the chart deletes its snapshots"""
+        precompute_chunk([student.id for student in self.students])
+
+        ChartNode.objects.create(schema=self.schema, semester=1, position=3, course=self.advanced)
+
+        self.assertFalse(RecommendationSnapshot.objects.exists())
+
+
+class ChartResolverTest(APITestCase):
+    """Tests for the in-process ChartSchema interval index"""
+
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.old = ChartSchema.objects.create(
+                name='CS old', code='CS-92-99', major='CS',
+                entry_year_start=1392, entry_year_end=1399,
+            )
+            self.new = ChartSchema.objects.create(
+                name='CS new', code='CS-98-05', major='CS',
+                entry_year_start=1398, entry_year_end=1405,
+            )
+            self.electrical = ChartSchema.objects.create(
+                name='EE', code='EE-00-05', major='EE',
+                entry_year_start=1400, entry_year_end=1405,
+            )
+
+    def test_resolve_many(self):
+        """Test overlapping ranges, other majors and unknown numbers in one batch"""
+        get_chart_index()
+
+        with self.assertNumQueries(0):
+            resolved = resolve_many(['9521012345', '9921012345', '0321312345', '0921012345', 'x'])
+
+        self.assertEqual(resolved['9521012345'], self.old)
+        # The later-starting range wins where ranges overlap
+        self.assertEqual(resolved['9921012345'], self.new)
+        self.assertEqual(resolved['0321312345'], self.electrical)
+        self.assertIsNone(resolved['0921012345'])
+        self.assertIsNone(resolved['x'])
+
+    def test_schema_save_invalidates_index(self):
+        """Test that a changed year range is visible to the next lookup"""
+        self.assertIsNone(resolve_chart_schema('0921012345'))
+
+        self.new.entry_year_end = 1410
+        with self.captureOnCommitCallbacks(execute=True):
+            self.new.save()
+
+        self.assertEqual(resolve_chart_schema('0921012345'), self.new)
+
+    def test_rolled_back_schema_is_not_indexed(self):
+        """Test that a schema saved in a rolled-back transaction never resolves"""
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    ChartSchema.objects.create(
+                        name='CS next', code='CS-06-10', major='CS',
+                        entry_year_start=1406, entry_year_end=1410,
+                    )
+                    raise RuntimeError('rolled back')
+            except RuntimeError:
+                pass
+
+        self.assertEqual(callbacks, [])
+        self.assertIsNone(resolve_chart_schema('0821012345'))
+        self.assertEqual(resolve_chart_schema('0321012345'), self.new)
+
+
+class ProfileChartSchemaTest(APITestCase):
+    """Tests for the persisted Profile.chart_schema"""
+
+    def setUp(self):
+        self.schema = make_schema()
+        self.student = User.objects.create_user(
+            username='student1', password='testpass123', role='student'
+        )
+
+    def test_student_number_change_resolves_schema(self):
+        """Test that saving a student number stores the matching schema"""
+        profile = self.student.profile
+        profile.student_number = '0121012345'
+        profile.save()
+
+        profile.refresh_from_db()
+        self.assertEqual(profile.chart_schema, self.schema)
+
+    def test_stale_index_entry_is_not_stored(self):
+        """Test that a schema deleted behind the index is never written to a profile"""
+        get_chart_index()
+        # Deleted without the commit that would invalidate the index
+        ChartSchema.objects.filter(pk=self.schema.pk).delete()
+        self.assertEqual(resolve_chart_schema('0121012345'), self.schema)
+
+        profile = self.student.profile
+        profile.student_number = '0121012345'
+        profile.save()
+
+        profile.refresh_from_db()
+        self.assertIsNone(profile.chart_schema)
+        self.assertIsNone(resolve_chart_schema('0121012345'))
+
+    def test_year_range_change_updates_profiles(self):
+        """Test that students follow a schema's year range"""
+        profile = self.student.profile
+        profile.student_number = '0921012345'
+        profile.save()
+        profile.refresh_from_db()
+        self.assertIsNone(profile.chart_schema)
+
+        self.schema.entry_year_end = 1410
+        self.schema.save()
+
+        profile.refresh_from_db()
+        self.assertEqual(profile.chart_schema, self.schema)
+
+    def test_backfill_command(self):
+        """Test that rows written without signals are filled in bulk"""
+        Profile.objects.filter(user=self.student).update(student_number='0221012345')
+
+        call_command('backfill_chart_schemas', stdout=StringIO())
+
+        self.assertEqual(Profile.objects.get(user=self.student).chart_schema, self.schema)
+
+
+class MyChartCacheTest(APITestCase):
+    """Tests for the cached, ETag-validated my_chart response"""
+
+    url = '/api/courses/degrees/my_chart/'
+
+    def setUp(self):
+        self.client = APIClient()
+        self.schema = make_schema()
+        self.intro = Course.objects.create(code='INTRO', name='INTRO', credits=3, unit_type='theory')
+        self.advanced = Course.objects.create(code='ADV', name='ADV', credits=3, unit_type='theory')
+        ChartNode.objects.create(schema=self.schema, semester=1, course=self.intro)
+        ChartNode.objects.create(schema=self.schema, semester=2, course=self.advanced)
+        Prerequisite.objects.create(course=self.advanced, prerequisite_course=self.intro)
+
+        self.student = User.objects.create_user(
+            username='student1', password='testpass123', role='student'
+        )
+        self.student.profile.student_number = '0021012345'
+        self.student.profile.save()
+        self.client.force_authenticate(user=self.student)
+
+    def test_body_and_overlay(self):
+        """Test the chart body with the student's passed courses"""
+        StudentCourseHistory.objects.create(
+            student=self.student, course=self.intro, grade='A', grade_points=4.0,
+            credits_earned=3, semester='Fall 1400', is_passed=True
+        )
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['passed_courses'], [self.intro.id])
+        self.assertEqual(response.data['completed_semesters'], 1)
+        advanced = response.data['semesters'][1]['nodes'][0]['course']
+        self.assertEqual([p['code'] for p in advanced['prerequisites']], ['INTRO'])
+
+    def test_if_none_match(self):
+        """Test 304 for an unchanged chart and a new ETag after changes"""
+        first = self.client.get(self.url)
+        etag = first['ETag']
+
+        # The body comes from the cache; only the overlay is queried
+        with self.assertNumQueries(2):
+            second = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(second.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(second['ETag'], etag)
+
+        StudentCourseHistory.objects.create(
+            student=self.student, course=self.intro, grade='A', grade_points=4.0,
+            credits_earned=3, semester='Fall 1400', is_passed=True
+        )
+        third = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(third.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(third['ETag'], etag)
+
+    def test_chart_change_rebuilds_body(self):
+        """Test that a new node shows up in the cached body"""
+        self.client.get(self.url)
+        physics = Course.objects.create(code='PHYS', name='PHYS', credits=3, unit_type='theory')
+        ChartNode.objects.create(schema=self.schema, semester=3, course=physics)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(
+            [s['number'] for s in response.data['semesters']], [1, 2, 3]
+        )
+
+    def test_group_rename_rebuilds_body(self):
+        """Test that renaming an elective slot's group changes the ETag"""
+        group = CourseGroup.objects.create(name='Labs', code='LABS')
+        ChartNode.objects.create(schema=self.schema, semester=2, position=1, course_group=group)
+        first = self.client.get(self.url)
+
+        group.name = 'Laboratories'
+        group.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], first['ETag'])
+        self.assertEqual(
+            response.data['semesters'][1]['nodes'][1]['course_group']['name'], 'Laboratories'
+        )
+
+
+class ChartSerializerQueryCountTest(APITestCase):
+    """Tests that chart serialization does not issue per-course queries"""
+
+    def setUp(self):
+        self.schema = make_schema()
+        self.position = 0
+
+    def add_semester(self, semester):
+        """Two courses with requisites and an elective group of three"""
+        codes = [f'S{semester}C{i}' for i in range(2)]
+        courses = [
+            Course.objects.create(code=code, name=code, credits=3, unit_type='theory')
+            for code in codes
+        ]
+        for course in courses:
+            self.position += 1
+            ChartNode.objects.create(
+                schema=self.schema, semester=semester, position=self.position, course=course
+            )
+        Prerequisite.objects.create(course=courses[1], prerequisite_course=courses[0])
+        CoRequisite.objects.create(course=courses[0], corequisite_course=courses[1])
+
+        group = CourseGroup.objects.create(name=f'G{semester}', code=f'G{semester}')
+        for i in range(3):
+            member = Course.objects.create(
+                code=f'S{semester}E{i}', name=f'E{i}', credits=3, unit_type='theory'
+            )
+            group.courses.add(member)
+            Prerequisite.objects.create(course=member, prerequisite_course=courses[0])
+        self.position += 1
+        ChartNode.objects.create(
+            schema=self.schema, semester=semester, position=self.position, course_group=group
+        )
+
+    def test_query_count_does_not_grow_with_chart(self):
+        """Test four queries for the chart body, for one semester or eight"""
+        self.add_semester(1)
+        get_unlocks_index()  # built once per prerequisite change, not per request
+        with self.assertNumQueries(4):
+            data = ChartSchemaBodySerializer(self.schema).data
+        group = data['semesters'][0]['nodes'][2]['course_group']
+        self.assertEqual(len(group['courses']), 3)
+        self.assertEqual(
+            [p['code'] for p in group['courses'][0]['prerequisites']], ['S1C0']
+        )
+        self.assertEqual(
+            [c['code'] for c in data['semesters'][0]['nodes'][0]['course']['corequisites']],
+            ['S1C1']
+        )
+
+        for semester in range(2, 9):
+            self.add_semester(semester)
+        get_unlocks_index()
+        with self.assertNumQueries(4):
+            data = ChartSchemaBodySerializer(self.schema).data
+        self.assertEqual(len(data['semesters']), 8)
+
+
+class ChartGraphExportTest(APITestCase):
+    """Tests for the compact chart graph export"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.student = User.objects.create_user(
+            username='student1', password='testpass123', role='student'
+        )
+        self.client.force_authenticate(user=self.student)
+
+        self.schema = make_schema()
+        self.math = Course.objects.create(code='MATH', name='MATH', credits=3, unit_type='theory')
+        self.algo = Course.objects.create(code='ALGO', name='ALGO', credits=3, unit_type='theory')
+        self.lab = Course.objects.create(code='LAB', name='LAB', credits=1, unit_type='practical')
+        self.outside = Course.objects.create(code='EXT', name='EXT', credits=2, unit_type='theory')
+        ChartNode.objects.create(schema=self.schema, semester=1, course=self.math)
+        ChartNode.objects.create(schema=self.schema, semester=2, position=1, course=self.algo)
+        self.group = CourseGroup.objects.create(name='Labs', code='LABS')
+        self.group.courses.add(self.lab)
+        ChartNode.objects.create(schema=self.schema, semester=2, position=2, course_group=self.group)
+        Prerequisite.objects.create(course=self.algo, prerequisite_course=self.math)
+        Prerequisite.objects.create(course=self.math, prerequisite_course=self.outside)
+        CoRequisite.objects.create(course=self.algo, corequisite_course=self.lab)
+
+        self.url = f'/api/courses/degrees/{self.schema.id}/graph/'
+
+    def test_tables_and_edges(self):
+        """Test that edges and nodes resolve through the course table"""
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.data
+        codes = data['courses']['code']
+        self.assertEqual(codes, ['ALGO', 'EXT', 'LAB', 'MATH'])
+        self.assertEqual(data['courses']['in_chart'], [1, 0, 1, 1])
+
+        edges = {
+            (codes[c], codes[p])
+            for c, p in zip(data['prerequisites']['course'], data['prerequisites']['prerequisite'])
+        }
+        self.assertEqual(edges, {('ALGO', 'MATH'), ('MATH', 'EXT')})
+        self.assertEqual(
+            [codes[i] for i in data['corequisites']['corequisite']], ['LAB']
+        )
+
+        nodes = data['nodes']
+        self.assertEqual([codes[i] if i >= 0 else None for i in nodes['course']],
+                         ['MATH', 'ALGO', None])
+        group = nodes['group'][2]
+        offsets = data['groups']['offsets']
+        members = data['groups']['courses'][offsets[group]:offsets[group + 1]]
+        self.assertEqual([codes[i] for i in members], ['LAB'])
+
+    def test_version_and_if_none_match(self):
+        """Test 304 while unchanged and a new version after an edit"""
+        first = self.client.get(self.url)
+        self.assertEqual(first['ETag'], f'"{first.data["version"]}"')
+
+        second = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.algo.name = 'Algorithms'
+        self.algo.save()
+        third = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(third.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(third.data['version'], first.data['version'])
+
+    def test_group_rename_changes_version(self):
+        """Test that renaming an elective group is not served from the cache"""
+        first = self.client.get(self.url)
+
+        self.group.name = 'Laboratories'
+        self.group.save()
+        second = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(second.data['version'], first.data['version'])
+        self.assertIn('Laboratories', second.data['groups']['name'])
+
+    def test_unknown_schema(self):
+        """Test 404 for a schema that does not exist"""
+        response = self.client.get('/api/courses/degrees/999999/graph/')
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class BatchPriorityScoringTest(APITestCase):
+    """Tests for courses.chart_recommendations.compute_chart_recommendations"""
+
+    def setUp(self):
+        """Semester 2 holds DS (needs PROG), OS (needs DS) and an elective slot"""
+        self.schema = make_schema()
+        self.courses = {}
+        for code in ['PROG', 'DS', 'OS', 'AI', 'DB']:
+            self.courses[code] = Course.objects.create(code=code, name=code, credits=3)
+        Prerequisite.objects.create(course=self.courses['DS'], prerequisite_course=self.courses['PROG'])
+        Prerequisite.objects.create(course=self.courses['OS'], prerequisite_course=self.courses['DS'])
+        group = CourseGroup.objects.create(name='Electives', code='ELEC')
+        group.courses.add(self.courses['DB'], self.courses['AI'])
+        ChartNode.objects.create(schema=self.schema, semester=1, course=self.courses['PROG'])
+        ChartNode.objects.create(schema=self.schema, semester=2, position=0, course=self.courses['DS'])
+        ChartNode.objects.create(schema=self.schema, semester=2, position=1, course=self.courses['OS'])
+        ChartNode.objects.create(schema=self.schema, semester=2, position=2, course_group=group)
+
+    def test_matches_single_course_scoring(self):
+        """Test that batch scores equal the per-course scores"""
+        passed = {self.courses['PROG'].id}
+        result = compute_chart_recommendations(self.schema, passed, 2)
+
+        by_code = {rec['code']: rec for rec in result['recommendations']}
+        self.assertEqual(set(by_code), {'DS', 'OS', 'AI'})
+        for node in ChartNode.objects.filter(schema=self.schema, semester=2):
+            course = node.course or self.courses['AI']
+            expected = calculate_priority_score(
+                course, passed, 2, self.schema,
+                critical_depth=(
+                    node.critical_path_depth if node.course
+                    else schema_course_depths(self.schema)[course.id]
+                ),
+                is_elective=node.course is None
+            )
+            self.assertEqual(by_code[course.code]['priority_score'], expected['total'])
+            self.assertEqual(by_code[course.code]['reason'], expected['reason'])
+        self.assertEqual(by_code['DS']['unlocks'], [self.courses['OS'].id])
+        self.assertFalse(by_code['OS']['prerequisites_met'])
+
+    def test_query_count_is_flat(self):
+        """Test that a semester is scored in three queries"""
+        # Built once per prerequisite or chart change, not per request
+        get_unlocks_index()
+        schema_course_depths(self.schema)
+        with self.assertNumQueries(3):
+            compute_chart_recommendations(self.schema, set(), 2)
+        for position, code in enumerate(['NET', 'SEC', 'ML'], start=3):
+            course = Course.objects.create(code=code, name=code, credits=3)
+            Prerequisite.objects.create(course=course, prerequisite_course=self.courses['DS'])
+            ChartNode.objects.create(
+                schema=self.schema, semester=2, position=position, course=course
+            )
+        get_unlocks_index()
+        schema_course_depths(self.schema)
+        with self.assertNumQueries(3):
+            compute_chart_recommendations(self.schema, set(), 2)
+
+    def test_recompute_command_repairs_depths(self):
+        """Test that recompute_importance also rebuilds chart node depths"""
+        ChartNode.objects.filter(schema=self.schema).update(critical_path_depth=0)
+        student = User.objects.create_user(username='student1', password='testpass123', role='student')
+        RecommendationSnapshot.objects.create(
+            student=student, chart_schema=self.schema, semester=2, payload={}, history_fingerprint='0'
+        )
+
+        def ds_score():
+            result = compute_chart_recommendations(self.schema, {self.courses['PROG'].id}, 2)
+            return {rec['code']: rec for rec in result['recommendations']}['DS']['priority_score']
+
+        stale = ds_score()
+        out = StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('recompute_importance', stdout=out)
+        # Cached scores and snapshots are dropped along with the old depths
+        self.assertGreater(ds_score(), stale)
+        self.assertFalse(RecommendationSnapshot.objects.filter(chart_schema=self.schema).exists())
+        depths = dict(
+            ChartNode.objects.filter(schema=self.schema, course__isnull=False)
+            .values_list('course__code', 'critical_path_depth')
+        )
+        self.assertEqual(depths, {'PROG': 2, 'DS': 1, 'OS': 0})
+        self.assertIn(f'{self.schema.code}: 2 chart node(s) updated', out.getvalue())
+        self.assertIn('0 chart course(s) and 2 chart node(s) updated', out.getvalue())
+
+        out = StringIO()
+        call_command('recompute_importance', schema_codes=[self.schema.code], stdout=out)
+        self.assertIn('0 chart course(s) and 0 chart node(s) updated', out.getvalue())
+
+
+class BestElectiveTest(APITestCase):
+    """Tests for courses.chart_recommendations.resolve_electives"""
+
+    def setUp(self):
+        """Two slots of one group; ML unlocks DL, so it ranks above AI and DB"""
+        self.schema = make_schema()
+        self.courses = {}
+        group = CourseGroup.objects.create(name='Electives', code='ELEC')
+        for code in ['AI', 'DB', 'ML', 'DL']:
+            self.courses[code] = Course.objects.create(code=code, name=code, credits=3)
+        group.courses.add(self.courses['AI'], self.courses['DB'], self.courses['ML'])
+        Prerequisite.objects.create(course=self.courses['DL'], prerequisite_course=self.courses['ML'])
+        for position in range(2):
+            ChartNode.objects.create(
+                schema=self.schema, semester=3, position=position, course_group=group
+            )
+
+    def picked(self, passed):
+        result = compute_chart_recommendations(
+            self.schema, {self.courses[code].id for code in passed}, 3
+        )
+        return [rec['code'] for rec in result['recommendations']]
+
+    def test_best_distinct_candidates(self):
+        """Test that slots get the best-scoring distinct courses"""
+        self.assertEqual(self.picked([]), ['ML', 'AI'])
+
+    def test_passed_courses_are_skipped(self):
+        """Test that passed group courses are not recommended again"""
+        self.assertEqual(self.picked(['ML']), ['AI', 'DB'])
+        self.assertEqual(self.picked(['ML', 'AI', 'DB']), [])
+
+    def test_cached_per_passed_set(self):
+        """Test that a repeated passed set is served from the cache"""
+        self.picked(['AI'])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.picked(['AI']), ['ML', 'DB'])
+        self.courses['DB'].delete()
+        self.assertEqual(self.picked(['AI']), ['ML'])
+
+    def test_members_ranked_by_their_own_depth(self):
+        """Test that the slot's group-wide depth does not hide member depths"""
+        group = CourseGroup.objects.create(name='Systems', code='SYS')
+        for code in ['ARCH', 'NETW', 'COMP', 'DIST', 'CLOUD']:
+            self.courses[code] = Course.objects.create(code=code, name=code, credits=3)
+        # Both unlock one course; only NETW heads a longer chain
+        group.courses.add(self.courses['ARCH'], self.courses['NETW'])
+        for course, prereq in [('COMP', 'ARCH'), ('DIST', 'NETW'), ('CLOUD', 'DIST')]:
+            Prerequisite.objects.create(
+                course=self.courses[course], prerequisite_course=self.courses[prereq]
+            )
+        ChartNode.objects.create(schema=self.schema, semester=4, position=0, course_group=group)
+        for position, code in enumerate(['COMP', 'DIST', 'CLOUD']):
+            ChartNode.objects.create(
+                schema=self.schema, semester=5 + position, course=self.courses[code]
+            )
+
+        result = compute_chart_recommendations(self.schema, set(), 4)
+
+        self.assertEqual([rec['code'] for rec in result['recommendations']], ['NETW'])
+        self.assertIn('(2', result['recommendations'][0]['reason'])
+
+
+class UnlocksIndexTest(APITestCase):
+    """Tests for courses.unlocks"""
+
+    def setUp(self):
+        """Chain PROG -> DS -> OS and DS -> DB"""
+        self.courses = {}
+        for code in ['PROG', 'DS', 'OS', 'DB']:
+            self.courses[code] = Course.objects.create(code=code, name=code, credits=3)
+        for course, prereq in [('DS', 'PROG'), ('OS', 'DS'), ('DB', 'DS')]:
+            Prerequisite.objects.create(
+                course=self.courses[course], prerequisite_course=self.courses[prereq]
+            )
+
+    def ids(self, *codes):
+        return sorted(self.courses[code].id for code in codes)
+
+    def test_direct_and_transitive(self):
+        """Test direct and transitive unlocks, and a prerequisite cycle"""
+        index = get_unlocks_index()
+        self.assertEqual(list(index.direct(self.courses['PROG'].id)), self.ids('DS'))
+        self.assertEqual(list(index.transitive(self.courses['PROG'].id)), self.ids('DS', 'OS', 'DB'))
+        self.assertEqual(index.transitive(self.courses['OS'].id), ())
+
+        cyclic = UnlocksIndex({1: [2], 2: [3], 3: [1], 4: [1]})
+        self.assertEqual(cyclic.transitive(4), (1, 2, 3))
+        self.assertEqual(cyclic.transitive(2), (1, 2, 3))
+
+    def test_signals_keep_index_current(self):
+        """Test that edge changes rebuild the index and reach course detail"""
+        get_unlocks_index()
+        Prerequisite.objects.filter(course=self.courses['DB']).delete()
+        self.assertEqual(list(get_unlocks_index().direct(self.courses['DS'].id)), self.ids('OS'))
+
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(
+            username='student1', email='s@test.com', password='testpass123', role='student'
+        ))
+        response = client.get(f"/api/courses/list/{self.courses['PROG'].id}/")
+        self.assertEqual(response.data['unlocks'], self.ids('DS'))
+        self.assertEqual(response.data['unlocks_transitive'], self.ids('DS', 'OS'))
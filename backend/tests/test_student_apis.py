@@ -6,19 +6,38 @@ Tests for:
 2. Course selection workflow
 3. Schedule management and conflict detection
 4. Recommendation algorithm accuracy
+5. Semester cart validation
 """
 
 import json
+import os
+import tempfile
 from datetime import time
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.test import TestCase, Client
 from django.contrib.auth import get_user_model
 from django.utils import timezone
+from rest_framework.pagination import PageNumberPagination
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
 
-from courses.models import Course, DegreeChart, ChartCourse, Prerequisite
+from courses.models import (
+    Course, DegreeChart, ChartCourse, Prerequisite, CoRequisite, CourseRequirement, Section, SectionTime,
+)
 from students.models import StudentCourseHistory, StudentSelection, Schedule
-from courses.recommendations import RecommendationEngine
+from courses.cache import get_cache
+from courses.chart_resolver import invalidate_chart_index
+from courses.recommendations import RecommendationEngine, recommend_for_cohort
+from courses.graph import PrerequisiteGraph, find_prerequisite_cycles
+from courses.weektime import parse_day, week_interval
+from students.conflicts import (
+    instructor_conflicts, overlapping_pairs, room_conflicts, schedule_conflicts,
+)
+from students.cart import validate_cart
 
 User = get_user_model()
 
@@ -313,6 +332,39 @@ class RecommendationEngineTest(TestCase):
         self.assertIn('CS202', rec_codes)
         self.assertNotIn('CS301', rec_codes)  # Requires CS202
     
+    def test_graph_bitsets(self):
+        """Test encode, eligible_mask and prerequisites_met on the chart graph"""
+        math = Course.objects.create(code='MATH', name='Math', credits=3)
+        Prerequisite.objects.create(course=self.cs302, prerequisite_course=math)
+        graph = PrerequisiteGraph.load(self.degree_chart)
+
+        def bits(*courses):
+            return sum(1 << graph.index[course.id] for course in courses)
+
+        # Unknown ids are ignored; a prerequisite outside the chart gets a
+        # bit past the chart courses
+        self.assertEqual(graph.encode([self.cs101.id, 999999]), bits(self.cs101))
+        self.assertGreaterEqual(graph.index[math.id], graph.chart_size)
+        self.assertEqual(graph.encode([math.id]), bits(math))
+
+        self.assertEqual(graph.eligible_mask(0), bits(self.cs101))
+        passed = graph.encode([self.cs101.id, self.cs202.id])
+        self.assertEqual(
+            graph.eligible_mask(passed),
+            bits(self.cs101, self.cs201, self.cs202, self.cs301),
+        )
+        self.assertEqual(
+            graph.eligible_mask(passed, excluded_mask=bits(self.cs101, self.cs201)),
+            bits(self.cs202, self.cs301),
+        )
+
+        # Passing the outside course unlocks CS302 but is never eligible itself
+        passed |= bits(math)
+        self.assertFalse(graph.eligible_mask(passed) & bits(math))
+        self.assertTrue(graph.eligible_mask(passed) & bits(self.cs302))
+        self.assertFalse(graph.prerequisites_met(graph.index[self.cs302.id], passed & ~bits(math)))
+        self.assertTrue(graph.prerequisites_met(graph.index[self.cs302.id], passed))
+
     def test_importance_score_calculation(self):
         """Test that importance score correctly weights courses"""
         engine = RecommendationEngine(self.student, self.degree_chart)
@@ -331,6 +383,113 @@ class RecommendationEngineTest(TestCase):
         
         self.assertGreater(cs101_score, cs201_score)
     
+    def test_importance_score_is_materialized(self):
+        """Test that stored importance counts transitive dependents"""
+        def stored(course):
+            return ChartCourse.objects.get(
+                degree_chart=self.degree_chart, course=course
+            ).importance_score
+        
+        self.assertEqual(stored(self.cs101), 4)
+        self.assertEqual(stored(self.cs202), 2)
+        self.assertEqual(stored(self.cs301), 0)
+        self.assertEqual(
+            ChartCourse.objects.get(degree_chart=self.degree_chart, course=self.cs101).critical_path_depth,
+            2
+        )
+        
+        # Removing CS202 -> CS301 drops it from both ancestors
+        Prerequisite.objects.filter(course=self.cs301).delete()
+        self.assertEqual(stored(self.cs101), 3)
+        self.assertEqual(stored(self.cs202), 1)
+    
+    def test_recompute_invalidates_cached_recommendations(self):
+        """Test that recompute_importance refreshes cached recommendations"""
+        def cs101_score():
+            engine = RecommendationEngine(self.student, self.degree_chart)
+            recommendations = engine.get_recommendations('Spring 1403', limit=5)
+            return {r['code']: r for r in recommendations}['CS101']['importance_score']
+
+        # Written without signals, then cached
+        ChartCourse.objects.filter(course=self.cs101).update(importance_score=0)
+        self.assertEqual(cs101_score(), 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('recompute_importance', stdout=StringIO())
+        self.assertEqual(cs101_score(), 4)
+
+    def test_cohort_recommendations(self):
+        """Test batch recommendations for several students at once"""
+        other = User.objects.create_user(
+            username='test_student2',
+            email='test2@test.com',
+            password='testpass',
+            role='student'
+        )
+        StudentCourseHistory.objects.create(
+            student=other,
+            course=self.cs101,
+            grade='A',
+            grade_points=4.0,
+            credits_earned=3,
+            semester='Fall 1402',
+            is_passed=True
+        )
+        students = User.objects.filter(id__in=[self.student.id, other.id])
+        
+        # chart courses + prerequisite edges + student ids + history + selections
+        with self.assertNumQueries(5):
+            results = recommend_for_cohort(self.degree_chart, students, 'Spring 1403', 5)
+        
+        self.assertEqual(
+            results[self.student.id],
+            RecommendationEngine(self.student, self.degree_chart).get_recommendations('Spring 1403', 5)
+        )
+        self.assertIn('CS202', [r['code'] for r in results[other.id]])
+        self.assertNotIn('CS202', [r['code'] for r in results[self.student.id]])
+    
+    def test_recommendations_cached_until_history_changes(self):
+        """Test that cached recommendations are invalidated by new history"""
+        engine = RecommendationEngine(self.student, self.degree_chart)
+        first = engine.get_recommendations('Spring 1403', limit=5)
+        
+        with self.assertNumQueries(0):
+            engine.get_recommendations('Spring 1403', limit=5)
+        
+        StudentCourseHistory.objects.create(
+            student=self.student,
+            course=self.cs101,
+            grade='A',
+            grade_points=4.0,
+            credits_earned=3,
+            semester='Fall 1402',
+            is_passed=True
+        )
+        second = RecommendationEngine(self.student, self.degree_chart).get_recommendations(
+            'Spring 1403', limit=5
+        )
+        self.assertNotIn('CS202', [r['code'] for r in first])
+        self.assertIn('CS202', [r['code'] for r in second])
+    
+    def test_streamed_ranking_matches_top_k(self):
+        """Test that the lazy ranked stream agrees with top-k selection"""
+        StudentCourseHistory.objects.create(
+            student=self.student,
+            course=self.cs101,
+            grade='A',
+            grade_points=4.0,
+            credits_earned=3,
+            semester='Fall 1402',
+            is_passed=True
+        )
+        engine = RecommendationEngine(self.student, self.degree_chart)
+        top = engine.get_recommendations('Spring 1403', limit=2)
+        streamed = list(engine.stream_recommendations('Spring 1403'))
+        
+        self.assertEqual([r['code'] for r in top], ['CS101', 'CS202'])
+        self.assertEqual(streamed[:2], top)
+        self.assertEqual(len(streamed), 3)
+    
     def test_exclude_already_selected(self):
         """Test that already-selected courses are not recommended"""
         # Select CS101
@@ -346,6 +505,23 @@ class RecommendationEngineTest(TestCase):
         rec_ids = [r['id'] for r in recommendations]
         self.assertNotIn(self.cs101.id, rec_ids)
     
+    def test_recommendation_query_count_is_constant(self):
+        """Test that recommendations use a fixed number of queries"""
+        StudentCourseHistory.objects.create(
+            student=self.student,
+            course=self.cs101,
+            grade='A',
+            grade_points=4.0,
+            credits_earned=3,
+            semester='Fall 1402',
+            is_passed=True
+        )
+        
+        engine = RecommendationEngine(self.student, self.degree_chart)
+        # passed + selected + chart courses + prerequisite edges
+        with self.assertNumQueries(4):
+            engine.get_recommendations('Spring 1403', limit=5)
+    
     def test_circular_dependency_detection(self):
         """Test circular dependency detection"""
         # Create circular dependency
@@ -360,6 +536,105 @@ class RecommendationEngineTest(TestCase):
         # Should detect cycle
         self.assertGreater(len(cycles), 0)
 
+    
+    def test_every_cycle_group_reported(self):
+        """Test that independent cycles are all reported with course codes"""
+        Prerequisite.objects.create(course=self.cs101, prerequisite_course=self.cs301)
+        Prerequisite.objects.create(course=self.cs201, prerequisite_course=self.cs302)
+        Prerequisite.objects.create(course=self.cs302, prerequisite_course=self.cs201)
+        
+        with self.assertNumQueries(1):
+            cycles = find_prerequisite_cycles()
+        
+        self.assertEqual(
+            [[c['code'] for c in group] for group in cycles],
+            [['CS101', 'CS202', 'CS301'], ['CS201', 'CS302']]
+        )
+
+class CohortRecommendationTest(APITestCase):
+    """Tests for /api/courses/recommendations/cohort/ and recommend_cohort"""
+
+    url = '/api/courses/recommendations/cohort/'
+
+    def setUp(self):
+        # Chart schemas and cached results of earlier tests were rolled back
+        invalidate_chart_index()
+        get_cache().clear()
+        self.client = APIClient()
+        self.admin = User.objects.create_user(
+            username='admin1', email='admin@test.com', password='testpass', role='admin'
+        )
+        self.degree_chart = DegreeChart.objects.create(
+            name='CS', code='CS', department='Engineering', total_credits=120
+        )
+        self.courses = [
+            Course.objects.create(code=f'CS10{i}', name=f'CS10{i}', credits=3) for i in range(3)
+        ]
+        for course in self.courses:
+            ChartCourse.objects.create(degree_chart=self.degree_chart, course=course)
+        self.students = []
+        for i in range(2):
+            student = User.objects.create_user(
+                username=f'student{i}', email=f's{i}@test.com', password='testpass', role='student'
+            )
+            student.profile.student_number = f'022101234{i}'
+            student.profile.save()
+            self.students.append(student)
+
+    def post(self, **data):
+        payload = {'degree_chart_id': self.degree_chart.id, 'student_number_prefix': '02210'}
+        payload.update(data)
+        return self.client.post(self.url, payload, format='json')
+
+    def test_permissions(self):
+        """Test that only admins and HODs may run a cohort"""
+        self.client.force_authenticate(user=self.students[0])
+        self.assertEqual(self.post().status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(user=self.admin)
+        response = self.post(limit=2)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total_students'], 2)
+        self.assertEqual(
+            sorted(row['student_number'] for row in response.data['results']),
+            ['0221012340', '0221012341'],
+        )
+        self.assertEqual(len(response.data['results'][0]['recommendations']), 2)
+
+    def test_missing_chart(self):
+        """Test 400 without a chart id and 404 for an unknown one"""
+        self.client.force_authenticate(user=self.admin)
+        self.assertEqual(self.post(degree_chart_id=None).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.post(degree_chart_id=999999).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_limit_handling(self):
+        """Test that bad limits are rejected and large ones capped"""
+        self.client.force_authenticate(user=self.admin)
+        for limit in ['abc', 0, -3, None]:
+            self.assertEqual(self.post(limit=limit).status_code, status.HTTP_400_BAD_REQUEST)
+        with mock.patch('courses.views.MAX_COHORT_LIMIT', 1):
+            response = self.post(limit=1000)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results'][0]['recommendations']), 1)
+
+    def test_management_command(self):
+        """Test that recommend_cohort writes one entry per student"""
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'cohort.json')
+            call_command(
+                'recommend_cohort', chart='CS', prefix='02210', limit=2,
+                output=output, stdout=StringIO()
+            )
+            with open(output, encoding='utf-8') as handle:
+                payload = json.load(handle)
+        self.assertEqual(sorted(payload), ['0221012340', '0221012341'])
+        self.assertEqual(len(payload['0221012340']), 2)
+
+        with self.assertRaises(CommandError):
+            call_command('recommend_cohort', chart='NOPE', prefix='02210', output='x.json')
+        with self.assertRaises(CommandError):
+            call_command('recommend_cohort', chart='CS', prefix='02210', limit=0, output='x.json')
+
 
 class ScheduleConflictTest(TestCase):
     """Tests for schedule conflict detection"""
@@ -453,3 +728,293 @@ class ScheduleConflictTest(TestCase):
         
         self.assertFalse(schedule1.has_conflict)
         self.assertFalse(schedule2.has_conflict)
+    
+    def test_sweep_reports_every_overlapping_pair(self):
+        """Test the sweep against a nested, a chained and a touching interval"""
+        pairs = overlapping_pairs([
+            ('sat', 0, 100, 1),
+            ('sat', 10, 20, 2),
+            ('sat', 90, 120, 3),
+            ('sat', 120, 130, 4),   # touches 3 only
+            ('sun', 0, 100, 5),
+        ])
+        self.assertEqual(sorted(pairs), [(1, 2), (1, 3)])
+    
+    def test_conflicts_endpoint_lists_partners(self):
+        """Test the conflicts action and list annotate rows in a fixed number of queries"""
+        client = APIClient()
+        client.force_authenticate(user=self.student)
+        rows = [
+            Schedule.objects.create(
+                student=self.student, course=course, day_of_week='sat',
+                start_time=time(start, 0), end_time=time(start + 2, 0),
+                semester='Spring 1403'
+            )
+            for course, start in [(self.course1, 8), (self.course2, 9)]
+        ]
+        Schedule.objects.create(
+            student=self.student, course=self.course1, day_of_week='sun',
+            start_time=time(8, 0), end_time=time(10, 0), semester='Spring 1403'
+        )
+        
+        # One query for the rows with their courses, however many there are
+        with self.assertNumQueries(1):
+            response = client.get('/api/students/schedule/conflicts/')
+        self.assertEqual(response.data['total_conflicts'], 2)
+        self.assertEqual(
+            {row['id']: row['conflicts_with'] for row in response.data['conflicts']},
+            {rows[0].id: [rows[1].id], rows[1].id: [rows[0].id]}
+        )
+        
+        response = client.get('/api/students/schedule/')
+        listed = {row['id']: row['has_conflict'] for row in response.data['results']}
+        self.assertEqual(sorted(listed.values()), [False, True, True])
+    
+    def test_list_checks_only_the_page(self):
+        """Test that a listing page sweeps only its own students' rows for conflicts"""
+        admin = User.objects.create_user(
+            username='admin', email='admin@test.com', password='pass', role='admin'
+        )
+        client = APIClient()
+        client.force_authenticate(user=admin)
+        for i in range(3):
+            other = User.objects.create_user(
+                username=f'other{i}', email=f'o{i}@test.com', password='pass', role='student'
+            )
+            for course, start in [(self.course1, 8), (self.course2, 9)]:
+                Schedule.objects.create(
+                    student=other, course=course, day_of_week='sun',
+                    start_time=time(start, 0), end_time=time(start + 2, 0),
+                    semester='Spring 1403'
+                )
+        own = Schedule.objects.create(
+            student=self.student, course=self.course1, day_of_week='sat',
+            start_time=time(8, 0), end_time=time(10, 0), semester='Spring 1403'
+        )
+        
+        swept = []
+        
+        def sweep(rows):
+            rows = list(rows)
+            swept.extend(rows)
+            return schedule_conflicts(rows)
+        
+        with mock.patch.object(PageNumberPagination, 'page_size', 2), \
+                mock.patch('students.views.schedule_conflicts', side_effect=sweep):
+            response = client.get('/api/students/schedule/')
+        self.assertEqual(response.data['count'], 7)
+        page = response.data['results']
+        self.assertEqual(page[0]['id'], own.id)
+        # The other row's partner is on a later page but still reported
+        self.assertEqual([row['has_conflict'] for row in page], [False, True])
+        self.assertEqual(
+            {row.student_id for row in swept},
+            {row['student'] for row in page}
+        )
+        self.assertEqual(len(swept), 3)
+    
+    def test_minute_of_week_encoding(self):
+        """Test day parsing and the minutes stored on save"""
+        for value in ['sat', 'Saturday', '0', 0, 'شنبه']:
+            self.assertEqual(parse_day(value), 0)
+        self.assertEqual(parse_day('thu'), 5)
+        self.assertIsNone(parse_day('someday'))
+        self.assertEqual(week_interval('mon', time(8, 0), time(9, 30)), (2 * 1440 + 480, 2 * 1440 + 570))
+        
+        schedule = Schedule.objects.create(
+            student=self.student, course=self.course1, day_of_week='sun',
+            start_time=time(10, 0), end_time=time(11, 0), semester='Spring 1403'
+        )
+        self.assertEqual((schedule.week_start_minute, schedule.week_end_minute), (2040, 2100))
+        schedule.day_of_week = 'sat'
+        schedule.save(update_fields=['day_of_week'])
+        schedule.refresh_from_db()
+        self.assertEqual(schedule.week_start_minute, 600)
+    
+    def test_room_and_instructor_conflicts(self):
+        """Test the indexed range checks for rooms and instructors"""
+        other = User.objects.create_user(
+            username='other', email='other@test.com', password='pass', role='student'
+        )
+        first = Schedule.objects.create(
+            student=self.student, course=self.course1, day_of_week='sat', location='A101',
+            start_time=time(8, 0), end_time=time(10, 0), semester='Spring 1403'
+        )
+        second = Schedule.objects.create(
+            student=other, course=self.course2, day_of_week='sat', location='A101',
+            start_time=time(9, 0), end_time=time(11, 0), semester='Spring 1403'
+        )
+        Schedule.objects.create(
+            student=other, course=self.course2, day_of_week='sat', location='A101',
+            start_time=time(10, 0), end_time=time(12, 0), semester='Spring 1403'
+        )
+        self.assertEqual(list(room_conflicts(first)), [second])
+        
+        for course in (self.course1, self.course2):
+            course.instructor = 'Dr.A'
+            course.day_of_week = 'Sun'
+            course.start_time, course.end_time = time(8, 0), time(10, 0)
+            course.save()
+        self.assertEqual(list(instructor_conflicts(self.course1)), [self.course2])
+
+
+class CartValidationTest(APITestCase):
+    """Tests for students.cart and the selection endpoints that use it"""
+
+    semester = '1403-2'
+
+    def setUp(self):
+        self.client = APIClient()
+        self.student = User.objects.create_user(
+            username='student1', email='student@test.com', password='testpass123', role='student'
+        )
+        self.other = User.objects.create_user(
+            username='student2', email='student2@test.com', password='testpass123', role='student'
+        )
+        self.client.force_authenticate(user=self.student)
+
+        def course(code, day='', start=None, capacity=30):
+            return Course.objects.create(
+                code=code, name=code, credits=3, capacity=capacity, day_of_week=day,
+                start_time=time(start) if start else None, end_time=time(start + 2) if start else None,
+            )
+
+        self.basics = course('BASICS')
+        self.algo = course('ALGO', 'sat', 8)
+        self.lab = course('LAB', 'sat', 9)
+        self.math = course('MATH', 'sun', 8)
+        self.project = course('PROJECT', 'mon', 8, capacity=1)
+        Prerequisite.objects.create(course=self.algo, prerequisite_course=self.basics)
+        CoRequisite.objects.create(course=self.lab, corequisite_course=self.math)
+        CourseRequirement.objects.create(course=self.project, min_passed_units=6)
+        StudentSelection.objects.create(
+            student=self.other, course=self.project, semester=self.semester, is_confirmed=True
+        )
+
+    def test_reports_every_violation_per_course(self):
+        """Test one pass finds all rule breaks of every cart course"""
+        violations = validate_cart(
+            self.student.id, self.semester,
+            [(self.algo.id, None), (self.lab.id, None), (self.project.id, None), (99999, None)],
+        )
+        codes = {course_id: sorted(v['code'] for v in found) for course_id, found in violations.items()}
+        self.assertEqual(codes, {
+            self.algo.id: ['prerequisite', 'time_clash'],
+            self.lab.id: ['corequisite', 'time_clash'],
+            self.project.id: ['capacity', 'min_units'],
+            99999: ['not_found'],
+        })
+        prerequisite = next(v for v in violations[self.algo.id] if v['code'] == 'prerequisite')
+        self.assertEqual(prerequisite['courses'], [self.basics.id])
+
+        StudentCourseHistory.objects.create(
+            student=self.student, course=self.basics, semester='Fall 1402',
+            grade='A', grade_points=4.0, credits_earned=3,
+        )
+        violations = validate_cart(
+            self.student.id, self.semester, [(self.algo.id, None), (self.math.id, None)]
+        )
+        self.assertEqual(violations, {})
+
+    def test_section_times_and_capacity(self):
+        """Test chosen sections replace the course slot and seat count"""
+        section = Section.objects.create(course=self.algo, semester=self.semester, number='2')
+        SectionTime.objects.create(
+            section=section, day_of_week='wed', start_time=time(8), end_time=time(10)
+        )
+        full = Section.objects.create(course=self.math, semester=self.semester, number='1', capacity=0)
+        violations = validate_cart(
+            self.student.id, self.semester, [(self.algo.id, section.id), (self.lab.id, None)]
+        )
+        self.assertNotIn('time_clash', [v['code'] for v in violations.get(self.lab.id, [])])
+        violations = validate_cart(self.student.id, self.semester, [(self.math.id, full.id)])
+        self.assertEqual([v['code'] for v in violations[self.math.id]], ['capacity'])
+        violations = validate_cart(self.student.id, self.semester, [(self.lab.id, section.id)])
+        self.assertIn('section', [v['code'] for v in violations[self.lab.id]])
+
+    def test_query_count_does_not_grow_with_cart(self):
+        """Test a fixed number of queries for small and large carts"""
+        extra = [
+            Course.objects.create(code=f'X{i}', name=f'X{i}', credits=1, day_of_week='thu',
+                                  start_time=time(8 + i), end_time=time(9 + i))
+            for i in range(8)
+        ]
+        with self.assertNumQueries(6):
+            validate_cart(self.student.id, self.semester, [(self.math.id, None)])
+        with self.assertNumQueries(6):
+            validate_cart(
+                self.student.id, self.semester,
+                [(course.id, None) for course in extra + [self.algo, self.lab, self.project]],
+            )
+
+    def test_create_blocks_course_without_prerequisite(self):
+        """Test POST /api/students/selections/ rejects a rule-breaking course"""
+        url = '/api/students/selections/'
+        response = self.client.post(
+            url, {'course_id': self.algo.id, 'semester': self.semester}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            [v['code'] for v in response.data['violations'][self.algo.id]], ['prerequisite']
+        )
+        response = self.client.post(
+            url, {'course_id': self.math.id, 'semester': self.semester}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            StudentSelection.objects.get(student=self.student).course_id, self.math.id
+        )
+
+    def test_create_allows_mutual_corequisites_one_at_a_time(self):
+        """Test co-requisites are enforced on confirmation, not on create"""
+        CoRequisite.objects.create(course=self.math, corequisite_course=self.lab)
+        url = '/api/students/selections/'
+        response = self.client.post(
+            url, {'course_id': self.lab.id, 'semester': self.semester}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        confirm = '/api/students/selections/confirm_selections/'
+        response = self.client.post(confirm, {'semester': self.semester}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            [v['code'] for v in response.data['violations'][self.lab.id]], ['corequisite']
+        )
+
+        response = self.client.post(
+            url, {'course_id': self.math.id, 'semester': self.semester}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.client.post(confirm, {'semester': self.semester}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_cart_replace_and_confirm(self):
+        """Test PUT cart/ is all-or-nothing and confirm_selections validates"""
+        url = '/api/students/selections/cart/'
+        response = self.client.put(url, {
+            'semester': self.semester,
+            'items': [{'course_id': self.lab.id}, {'course_id': self.algo.id}],
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(response.data['violations']), {self.lab.id, self.algo.id})
+        self.assertFalse(StudentSelection.objects.filter(student=self.student).exists())
+
+        response = self.client.put(url, {
+            'semester': self.semester,
+            'items': [{'course_id': self.lab.id}, {'course_id': self.math.id}],
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['selections']), 2)
+
+        response = self.client.post(
+            '/api/students/selections/confirm_selections/', {'semester': self.semester}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        # A selection that slipped past validation blocks confirmation
+        StudentSelection.objects.create(student=self.student, course=self.algo, semester=self.semester)
+        response = self.client.post(
+            '/api/students/selections/confirm_selections/', {'semester': self.semester}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn(self.algo.id, response.data['violations'])
@@ -21,6 +21,7 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 
 # SECURITY WARNING: keep the secret key used in production secret!
 import os
+import sys
 from decouple import config
 
 SECRET_KEY = config('SECRET_KEY', default='django-insecure-n%7apbdsn*8sz83#ihoq3a+3+#((dgxikr-)3%-o4ed=dyxldj')
@@ -116,6 +117,49 @@ else:
     }
 
 
+# Cache Configuration
+# The recommendations cache holds RecommendationEngine results and the
+# invalidation version counters of every cached index (see courses/cache.py).
+# The versions must be shared by all worker processes, or a change made in
+# one worker never reaches the others, so the default is the file backend.
+# A process-local backend (LocMemCache) is only safe with a single worker.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'recommendations': {
+        'BACKEND': config(
+            'RECOMMENDATION_CACHE_BACKEND',
+            default='django.core.cache.backends.filebased.FileBasedCache'
+        ),
+        'LOCATION': config(
+            'RECOMMENDATION_CACHE_LOCATION',
+            default=str(BASE_DIR / '.cache' / 'recommendations')
+        ),
+        'TIMEOUT': 60 * 60 * 24,
+        'OPTIONS': {
+            'MAX_ENTRIES': config('RECOMMENDATION_CACHE_MAX_ENTRIES', default=20000, cast=int),
+        },
+    },
+}
+
+# Test runs get a private in-memory cache: file entries would outlive the
+# throwaway test database, whose ids are reused by the next run
+if sys.argv[1:2] == ['test']:
+    CACHES['recommendations'] = {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'unipath-recommendations-test',
+        'TIMEOUT': 60 * 60 * 24,
+    }
+
+
+# Catalog change feed (see courses/changes.py). Entries younger than the
+# settle window are held back, so a change whose transaction commits after a
+# later one is not skipped by clients; entries older than the retention are
+# pruned by the prune_catalog_changes command.
+CATALOG_SYNC_SETTLE_SECONDS = config('CATALOG_SYNC_SETTLE_SECONDS', default=5, cast=int)
+CATALOG_CHANGE_RETENTION_DAYS = config('CATALOG_CHANGE_RETENTION_DAYS', default=90, cast=int)
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 